@@ -10,10 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
 from datetime import timedelta
 from os import getenv
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,9 +27,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "django-insecure-x%0tid0jzce)@#^ds#zgjaoai$shz+=i1!2zpj05pr*le^1hk!"
 
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
 PRODUCTION = getenv("PRODUCTION", "False") == "True"
+TESTING = sys.argv[1:2] == ["test"]
+# SECURITY WARNING: don't run with debug turned on in production!
+# DEBUG also keeps every executed query in memory; use SQL_INSTRUMENTATION.
+DEBUG = getenv("DEBUG", str(not PRODUCTION)) == "True"
 AWS_ACCESS_KEY_ID = getenv("AWS_ACCESS_KEY_ID", "test")
 AWS_SECRET_ACCESS_KEY = getenv("AWS_SECRET_ACCESS_KEY", "test")
 AWS_REGION = getenv("AWS_REGION", "eu-central-1")
@@ -39,6 +44,8 @@ ALLOWED_HOSTS = ["*"]
 
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "traceparent", "x-primary-until")
+CORS_EXPOSE_HEADERS = ["traceparent", "x-primary-until"]
 # Application definition
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -56,6 +63,16 @@ SWAGGER_SETTINGS = {
         }
     },
     "DEFAULT_AUTO_SCHEMA_CLASS": "common.swagger_utils.CustomAutoSchema",
+    # the UI loads the pre-generated file rather than introspecting again
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+
+# The OpenAPI schema is generated into DIR by `manage.py generate_schema`
+# (at image build; common/openapi.py) and served from there with a
+# max-age of MAX_AGE seconds and an ETag.
+OPENAPI_SCHEMA = {
+    "DIR": getenv("OPENAPI_SCHEMA_DIR", str(BASE_DIR / "schema")),
+    "MAX_AGE": int(getenv("OPENAPI_SCHEMA_MAX_AGE", "3600")),
 }
 
 
@@ -82,6 +99,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.traffic.TrafficCaptureMiddleware",
+    "common.metrics.MetricsMiddleware",
+    "common.tracing.TracingMiddleware",
+    "common.sqlstats.SQLInstrumentationMiddleware",
+    "common.replicas.ReplicaMiddleware",
+    "common.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -90,6 +113,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "common.profiling.ProfilingMiddleware",
 ]
 AUTH_USER_MODEL = "user.User"
 ROOT_URLCONF = "backend.urls"
@@ -115,6 +139,8 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+DB_POOL = getenv("DB_POOL", "False") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -123,14 +149,49 @@ DATABASES = {
         "PASSWORD": getenv("DB_PASSWORD", "postgres"),
         "HOST": getenv("DB_HOST", "localhost"),
         "PORT": getenv("DB_PORT", "5432"),
-        # keep DB connections open for reuse (good for prod)
-        "CONN_MAX_AGE": None,
+        # keep DB connections open for reuse (good for prod); blank for forever.
+        # ASGI serves every request from a new thread, and so a new
+        # connection, so asgi.py turns persistence off.
+        "CONN_MAX_AGE": (
+            int(getenv("DB_CONN_MAX_AGE")) if getenv("DB_CONN_MAX_AGE") else None
+        ),
         "OPTIONS": {
             # SSL mode is important on many managed PG providers
             "sslmode": getenv("DB_SSLMODE", "prefer"),
         },
     }
 }
+if DB_POOL:
+    # psycopg_pool, per process and alias; size it so that workers x
+    # max_size stays under the server's max_connections. Replaces
+    # persistent connections, which Django refuses to combine with it.
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": float(getenv("DB_POOL_MAX_IDLE", "600")),
+    }
+
+# Read replica (common/replicas.py): safe requests read from it, writes and
+# everything after them go to default. Point DB_REPLICA_HOST at the primary
+# itself to exercise the routing locally.
+if getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": getenv("DB_REPLICA_HOST"),
+        "PORT": getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["common.replicas.ReplicaRouter"]
+DATABASE_REPLICA = {
+    "ALIAS": "replica",
+    # how long a client reads from the primary after a write; keep it above
+    # the replica lag
+    "STICKY_SECONDS": float(getenv("DB_REPLICA_STICKY_SECONDS", "5")),
+    "EXCLUDE": ["/admin/"],
+}
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
@@ -171,13 +232,169 @@ USE_TZ = True
 STATIC_URL = "static/"
 # settings.py
 
+# API JSON goes through orjson (common/fastjson.py); JSON_BACKEND=stdlib
+# switches back to DRF's own renderer and parser.
+if getenv("JSON_BACKEND", "orjson") == "orjson":
+    JSON_RENDERER = "common.fastjson.ORJSONRenderer"
+    JSON_PARSER = "common.fastjson.ORJSONParser"
+else:
+    JSON_RENDERER = "rest_framework.renderers.JSONRenderer"
+    JSON_PARSER = "rest_framework.parsers.JSONParser"
 REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
     (
-        "rest_framework.renderers.JSONRenderer",
+        JSON_RENDERER,
         "rest_framework.renderers.BrowsableAPIRenderer",
     )
     if not PRODUCTION
-    else ("rest_framework.renderers.JSONRenderer",)
+    else (JSON_RENDERER,)
 )
+REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = (
+    JSON_PARSER,
+    "rest_framework.parsers.FormParser",
+    "rest_framework.parsers.MultiPartParser",
+)
+SIMPLE_JWT = {
+    "TOKEN_REFRESH_SERIALIZER": "user.tokens.CachedTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "user.tokens.CachedTokenBlacklistSerializer",
+}
 if not PRODUCTION:
-    SIMPLE_JWT = {"ACCESS_TOKEN_LIFETIME": timedelta(hours=24)}
+    SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"] = timedelta(hours=24)
+
+# Revoked refresh tokens are mirrored in each worker's memory (user/tokens.py).
+# REFRESH_INTERVAL bounds how long a token revoked on another worker may still
+# be accepted here.
+TOKEN_BLACKLIST_CACHE = {
+    "REFRESH_INTERVAL": int(getenv("TOKEN_BLACKLIST_REFRESH_INTERVAL", "5")),
+    "FULL_RELOAD_INTERVAL": int(getenv("TOKEN_BLACKLIST_FULL_RELOAD_INTERVAL", "3600")),
+    "BLOOM_FILTER": getenv("TOKEN_BLACKLIST_BLOOM_FILTER", "False") == "True",
+    "BLOOM_CAPACITY": 100_000,
+    "BLOOM_ERROR_RATE": 0.001,
+}
+
+# Opt-in request recorder for load testing (common/traffic.py); replay the
+# file with `manage.py replay_traffic`.
+TRAFFIC_CAPTURE = {
+    "ENABLED": getenv("TRAFFIC_CAPTURE", "False") == "True",
+    "PATH": getenv("TRAFFIC_CAPTURE_PATH", str(BASE_DIR / "traffic.jsonl")),
+    "SAMPLE_RATE": float(getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0")),
+    "EXCLUDE": ["/admin/", "/swagger", "/health/", "/static/"],
+}
+
+# Per-request query count, DB time, slowest and repeated statements
+# (common/sqlstats.py). Slow requests and requests repeating a statement
+# DUPLICATE_THRESHOLD times are always logged, others at SAMPLE_RATE.
+SQL_INSTRUMENTATION = {
+    "ENABLED": getenv("SQL_INSTRUMENTATION", "True") == "True",
+    # "all", "staff" or "off"
+    "SERVER_TIMING": getenv("SQL_INSTRUMENTATION_SERVER_TIMING", "staff"),
+    "SLOW_REQUEST_MS": float(getenv("SQL_INSTRUMENTATION_SLOW_MS", "500")),
+    "SAMPLE_RATE": float(getenv("SQL_INSTRUMENTATION_SAMPLE_RATE", "0.0")),
+    "DUPLICATE_THRESHOLD": int(getenv("SQL_INSTRUMENTATION_DUPLICATES", "3")),
+    "SLOWEST": 5,
+}
+
+# Prometheus scrape target at /metrics (common/metrics.py), for TOKEN as a
+# bearer token or for staff users. Set DIR to a directory shared by the
+# workers of a prefork server, emptied on start.
+METRICS = {
+    "ENABLED": getenv("METRICS", "True") == "True",
+    "DIR": getenv("METRICS_DIR", ""),
+    "FLUSH_INTERVAL": float(getenv("METRICS_FLUSH_INTERVAL", "1.0")),
+    "TOKEN": getenv("METRICS_TOKEN", ""),
+}
+
+# In-place request profiling (common/profiling.py): staff send
+# `X-Profile: cpu|memory|all`; SAMPLE_RATE profiles random requests.
+# Saved profiles are listed at /api/admin/profiles/. Off unless PROFILING=True.
+PROFILING = {
+    "ENABLED": getenv("PROFILING", "False") == "True",
+    "DIR": getenv("PROFILING_DIR", str(BASE_DIR / "profiles")),
+    "SAMPLE_RATE": float(getenv("PROFILING_SAMPLE_RATE", "0.0")),
+    "SAMPLE_MODE": getenv("PROFILING_SAMPLE_MODE", "cpu"),
+    "ROUTES": [route for route in getenv("PROFILING_ROUTES", "").split(",") if route],
+    "INTERVAL": 0.005,
+    "MEMORY_FRAMES": 25,
+    "KEEP": 200,
+}
+
+# Response compression (common/compression.py): zstd and brotli when the
+# zstandard and brotli packages are installed, gzip always. ENCODINGS is the
+# server's preference among what a client accepts equally; bodies under
+# MIN_SIZE bytes and EXCLUDE path prefixes are not compressed.
+COMPRESSION = {
+    "ENABLED": getenv("COMPRESSION", "True") == "True",
+    "MIN_SIZE": int(getenv("COMPRESSION_MIN_SIZE", "1024")),
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "LEVELS": {"gzip": 6, "br": 4, "zstd": 3},
+    "EXCLUDE": [
+        path for path in getenv("COMPRESSION_EXCLUDE", "").split(",") if path
+    ],
+}
+
+# Request tracing (common/tracing.py), off unless TRACING=True. A sampled
+# W3C traceparent from the frontend starts a trace, at most
+# FORCED_PER_SECOND a second per process; other requests are traced at
+# SAMPLE_RATE. EXPORTER "file" appends OTLP/JSON to PATH, rotated to PATH.1
+# past MAX_BYTES; "memory" keeps traces in the process (tests).
+TRACING = {
+    "ENABLED": getenv("TRACING", "False") == "True",
+    "SAMPLE_RATE": float(getenv("TRACING_SAMPLE_RATE", "0.0")),
+    "FORCED_PER_SECOND": float(getenv("TRACING_FORCED_PER_SECOND", "1.0")),
+    "EXPORTER": getenv("TRACING_EXPORTER", "file"),
+    "PATH": getenv("TRACING_PATH", str(BASE_DIR / "traces.jsonl")),
+    "MAX_BYTES": int(getenv("TRACING_MAX_BYTES", str(50 * 1024 * 1024))),
+    "SERVICE_NAME": getenv("TRACING_SERVICE_NAME", "backend"),
+}
+
+# Full-text search (course/search.py). Courses and modules are indexed
+# under every one of CONFIGS; run `manage.py rebuild_search_index` after
+# changing them. The "polish" configuration is created as a copy of
+# "simple" (no stemming) unless the database already has one, e.g. with an
+# ispell dictionary installed. HEADLINE_CONFIG picks out the passages.
+SEARCH = {
+    "CONFIGS": ["polish", "english"],
+    "HEADLINE_CONFIG": "english",
+}
+
+# Module content revisions (module/revisions.py): one revision in
+# SNAPSHOT_EVERY is stored whole, the others as deltas; revisions superseded
+# for ARCHIVE_AFTER_DAYS are moved to S3 under ARCHIVE_PREFIX by
+# `manage.py archive_module_revisions`.
+MODULE_REVISIONS = {
+    "SNAPSHOT_EVERY": 20,
+    "ARCHIVE_AFTER_DAYS": int(getenv("MODULE_REVISIONS_ARCHIVE_AFTER_DAYS", "90")),
+    "ARCHIVE_PREFIX": "module-revisions/",
+}
+
+# Answers autosaved while a quiz is taken (quiz/autosave.py) are buffered
+# per worker and written together every FLUSH_INTERVAL seconds, or once
+# MAX_PENDING are waiting; 0 writes each autosave through.
+QUIZ_AUTOSAVE = {
+    "FLUSH_INTERVAL": float(getenv("QUIZ_AUTOSAVE_FLUSH_INTERVAL", "2.0")),
+    "MAX_PENDING": int(getenv("QUIZ_AUTOSAVE_MAX_PENDING", "1000")),
+}
+
+# Quiz time limits (quiz/attempts.py): answers are taken until GRACE_SECONDS
+# after the deadline; `close_expired_attempts --loop` seals the rest.
+QUIZ_ATTEMPTS = {
+    "GRACE_SECONDS": float(getenv("QUIZ_ATTEMPTS_GRACE_SECONDS", "30")),
+    # how long workers keep a copy of an attempt in the cache
+    "CACHE_TIMEOUT": int(getenv("QUIZ_ATTEMPTS_CACHE_TIMEOUT", "3600")),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "common.sqlstats": {
+            "handlers": ["console"],
+            # test requests are slow next to production ones; keep their
+            # reports out of the test output
+            "level": getenv(
+                "SQL_INSTRUMENTATION_LOG_LEVEL", "ERROR" if TESTING else "INFO"
+            ),
+            "propagate": False,
+        },
+    },
+}
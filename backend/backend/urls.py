@@ -17,43 +17,45 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, re_path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenRefreshView,
 )
 from django.http import HttpResponse
-from course.views import CourseViewSet, UserInfoView
+from common.compression import contains_secrets
+from common.metrics import metrics
+from common.openapi import schema_view, swagger_ui
+from common.profiling import ProfileDownloadView, ProfileListView
+from course.views import CourseViewSet, SearchView, UserInfoView
 from module.views import ModuleImageView, ModuleViewSet
 from questionbank.views import QuestionBankViewSet
+from quiz import async_views
 from quiz.views import QuizViewSet
 from question.views import QuestionViewSet
 from user.views import CustomTokenObtainPairView, EmailValidationView, RegisterView
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Your API",
-        default_version="v1",
-        description="API documentation",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="you@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-    authentication_classes=[],
-)
 def health(request):
     return HttpResponse("ok")
 urlpatterns = [
     path("health/", health ),
+    path("metrics", metrics),
+    path("api/admin/profiles/", ProfileListView.as_view(), name="profile-list"),
+    path(
+        "api/admin/profiles/<str:name>",
+        ProfileDownloadView.as_view(),
+        name="profile-download",
+    ),
     path("admin/", admin.site.urls),
     path(
-        "accounts/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"
+        "accounts/token/",
+        contains_secrets(CustomTokenObtainPairView.as_view()),
+        name="token_obtain_pair",
+    ),
+    path(
+        "accounts/token/refresh/",
+        contains_secrets(TokenRefreshView.as_view()),
+        name="token_refresh",
     ),
-    path("accounts/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("accounts/logout/", TokenBlacklistView.as_view(), name="token_blacklist"),
     path("accounts/register/", RegisterView.as_view(), name="register"),
     path("accounts/validate/", EmailValidationView.as_view(), name="email-validate"),
@@ -64,14 +66,15 @@ urlpatterns = [
     ),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        schema_view,
         name="schema-json",
     ),
     path(
         "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        swagger_ui,
         name="schema-swagger-ui",
     ),
+    path("api/search/", SearchView.as_view(), name="search"),
     path(
         "api/courses/<int:course_id>/modules/",
         ModuleViewSet.as_view({"get": "list", "post": "create"}),
@@ -94,6 +97,17 @@ urlpatterns = [
         ModuleImageView.as_view(),
         name="module-image-by-course",
     ),
+    path(
+        "api/courses/<int:course_id>/modules/<int:module_id>/content/",
+        ModuleViewSet.as_view({"get": "content"}),
+        name="module-content",
+    ),
+    path(
+        "api/courses/<int:course_id>/modules/<int:module_id>/revisions/",
+        # with the action's own permission_classes
+        ModuleViewSet.as_view({"get": "revisions"}, **ModuleViewSet.revisions.kwargs),
+        name="module-revisions",
+    ),
     path(
         "api/courses/<int:course_id>/modules/<int:pk>/mark_completed/",
         ModuleViewSet.as_view({"post": "mark_completed"}),
@@ -147,6 +161,15 @@ urlpatterns = [
         ),
         name="course-enroll-student",
     ),
+    path(
+        "api/courses/<int:course_id>/bulk-enroll/",
+        CourseViewSet.as_view(
+            {
+                "post": "bulk_enroll",
+            }
+        ),
+        name="course-bulk-enroll",
+    ),
     path(
         "api/courses/<int:course_id>/unenroll/<int:student_id>/",
         CourseViewSet.as_view(
@@ -195,11 +218,21 @@ urlpatterns = [
         QuestionBankViewSet.as_view({"get": "questions"}),
         name="question-banks-questions",
     ),
+    path(
+        "api/quizzes/<int:pk>/start/",
+        QuizViewSet.as_view({"post": "start"}),
+        name="quiz-start",
+    ),
     path(
         "api/quizzes/<int:pk>/questions/",
         QuizViewSet.as_view({"get": "questions"}),
         name="quiz-questions",
     ),
+    path(
+        "api/quizzes/<int:pk>/autosave/",
+        QuizViewSet.as_view({"post": "autosave"}),
+        name="quiz-autosave",
+    ),
     path(
         "api/quizzes/<int:pk>/submit/",
         QuizViewSet.as_view({"post": "submit"}),
@@ -225,6 +258,27 @@ urlpatterns = [
         QuizViewSet.as_view({"post": "grade_response"}),
         name="quiz-grade-response",
     ),
+    # Quiz-taking endpoints on the async ORM, for ASGI deployments
+    path(
+        "api/async/quizzes/<int:pk>/questions/",
+        async_views.questions,
+        name="async-quiz-questions",
+    ),
+    path(
+        "api/async/quizzes/<int:pk>/autosave/",
+        async_views.autosave,
+        name="async-quiz-autosave",
+    ),
+    path(
+        "api/async/quizzes/<int:pk>/submit/",
+        async_views.submit,
+        name="async-quiz-submit",
+    ),
+    path(
+        "api/async/quizzes/<int:pk>/review/",
+        async_views.review,
+        name="async-quiz-review",
+    ),
     path(
         "api/questions/",
         QuestionViewSet.as_view({"get": "list", "post": "create"}),
@@ -0,0 +1,247 @@
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# no body, and partial content whose ranges refer to the uncompressed one
+SKIPPED_STATUSES = (204, 206, 304)
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|xml|yaml|x-yaml|openapi|problem)\b"
+    r"|application/[\w.-]+\+(json|xml)\b|image/svg\+xml\b)"
+)
+ACCEPT_ENCODING = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def no_compression(view):
+    """Marks a view whose responses always go out uncompressed."""
+    view.no_compression = True
+    return view
+
+
+def contains_secrets(view):
+    """
+    Marks a view whose responses carry secrets (tokens, keys). They are
+    not compressed for requests that carry input the response could echo.
+    """
+    view.contains_secrets = True
+    return view
+
+
+class _Gzip:
+    level = 6
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    # brotli's own default, 11, is meant for static files.
+    level = 4
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    level = 3
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def available_encodings():
+    """{content coding: compressor class} for what is installed."""
+    encodings = {"gzip": _Gzip}
+    if brotli is not None:
+        encodings["br"] = _Brotli
+    if zstandard is not None:
+        encodings["zstd"] = _Zstd
+    return encodings
+
+
+def negotiate(accept_encoding, preference):
+    """
+    The coding from `preference` the client accepts with the highest
+    q-value, ties going to the earlier one; None if it accepts none.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        match = ACCEPT_ENCODING.fullmatch(part)
+        if not match:
+            continue
+        try:
+            accepted[match[1]] = float(match[2] or 1)
+        except ValueError:
+            continue
+    best, best_q = None, 0
+    for coding in preference:
+        q = accepted.get(coding, accepted.get("*", 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_sequence(chunks, compressor):
+    # Flushed after every chunk, so a streamed response is not held back.
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_sequence(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses text and JSON responses with the best coding the client
+    accepts: zstd and brotli when their packages are installed, gzip
+    otherwise. Bodies under MIN_SIZE bytes stay as they are, as do those
+    of views marked with no_compression and of EXCLUDE paths. Streaming
+    responses, sync or async, are compressed chunk by chunk.
+
+    BREACH: compressed sizes leak what a body shares with attacker-chosen
+    input, so a response is sent uncompressed when it holds a secret (a
+    CSRF token rendered into the page, or a view marked contains_secrets)
+    and the request carries input (a query string or a body).
+    Configured by settings.COMPRESSION.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "COMPRESSION", {})
+        if not config.get("ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.min_size = config.get("MIN_SIZE", 1024)
+        self.exclude = tuple(config.get("EXCLUDE", ()))
+        levels = config.get("LEVELS", {})
+        installed = available_encodings()
+        self.encodings = {
+            coding: (installed[coding], levels.get(coding, installed[coding].level))
+            for coding in config.get("ENCODINGS", ("zstd", "br", "gzip"))
+            if coding in installed
+        }
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not self._compressible(request, response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if self._breach_prone(request):
+            return response
+        coding = negotiate(request.headers.get("Accept-Encoding", ""), self.encodings)
+        if coding is None:
+            return response
+        compressor_class, level = self.encodings[coding]
+        compressor = compressor_class(level)
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(
+                    response.streaming_content, compressor
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, compressor
+                )
+            response.headers.pop("Content-Length", None)
+        else:
+            content = compressor.compress(response.content) + compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # The body is no longer byte-for-byte the one a strong ETag names.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = coding
+        return response
+
+    def _compressible(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return False
+        if response.status_code in SKIPPED_STATUSES:
+            return False
+        if "no-transform" in response.get("Cache-Control", ""):
+            return False
+        if not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+            return False
+        if request.path.startswith(self.exclude):
+            return False
+        view = getattr(request.resolver_match, "func", None)
+        if getattr(view, "no_compression", False):
+            return False
+        if response.streaming:
+            length = response.get("Content-Length")
+            return length is None or int(length) >= self.min_size
+        return len(response.content) >= self.min_size
+
+    def _breach_prone(self, request):
+        view = getattr(request.resolver_match, "func", None)
+        secret = request.META.get("CSRF_COOKIE_NEEDS_UPDATE") or getattr(
+            view, "contains_secrets", False
+        )
+        user_input = bool(request.META.get("QUERY_STRING")) or (
+            request.method not in SAFE_METHODS
+        )
+        return bool(secret) and user_input
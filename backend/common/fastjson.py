@@ -0,0 +1,80 @@
+"""
+orjson-backed drop-ins for DRF's JSONRenderer and JSONParser.
+
+orjson encodes the big payloads (quiz reviews, gradebooks) several times
+faster than json.dumps, with the same output as JSONRenderer: orjson
+writes datetimes the way DRF's encoder does once told to use "Z" for UTC,
+Decimals become floats as in DRF, and anything else orjson does not know
+goes through DRF's encoder. Without orjson installed, or for requests it cannot serve (indented output,
+ASCII-only or non-UTF-8 bodies), both classes behave exactly like DRF's.
+Selected with the JSON_BACKEND setting.
+"""
+
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+_encoder_default = JSONEncoder().default
+
+
+def _default(obj):
+    # Scores are Decimals; spare them DRF's chain of isinstance checks.
+    if type(obj) is Decimal:
+        return float(obj)
+    return _encoder_default(obj)
+
+
+def dumps(data):
+    """`data` as compact UTF-8 JSON, like JSONRenderer renders it."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    # JSONRenderer escapes these two so the output is valid JavaScript too.
+    return (
+        orjson.dumps(data, default=_default, option=OPTIONS)
+        .replace(b"\xe2\x80\xa8", b"\\u2028")
+        .replace(b"\xe2\x80\xa9", b"\\u2029")
+    )
+
+
+def loads(content):
+    return json.loads(content) if orjson is None else orjson.loads(content)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or indent
+            or not api_settings.COMPACT_JSON
+            or not api_settings.UNICODE_JSON
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+from course.models import Course, CourseProgress
+from module import revisions
+from module.models import Module, ModuleProgress
+from question.models import MultipleChoiceOption, Question
+from questionbank.models import QuestionBank
+from questionresponse.models import QuestionResponse
+from quiz.models import Quiz
+from user.models import User
+
+
+def build_course_fixture(
+    students=30,
+    modules=5,
+    quizzes=3,
+    banks_per_quiz=3,
+    questions_per_bank=8,
+    teacher=None,
+    prefix="perf",
+    password="!",
+    response_rate=1.0,
+):
+    """
+    Populate one course the way real ones look: a teacher, enrolled
+    students with partial module progress, quizzes drawing on several banks
+    of mixed open and multiple choice questions, and responses to every
+    question from the first `response_rate` share of the students. Returns
+    the created objects.
+
+    `password` is stored as is, so pass an already hashed one; the default
+    is unusable, so authenticate with force_authenticate.
+    """
+    teacher = teacher or User.objects.create(
+        username=f"{prefix}-teacher@test.com",
+        email=f"{prefix}-teacher@test.com",
+        password=password,
+        is_teacher=True,
+    )
+    course = Course.objects.create(
+        title=f"{prefix} course", description="", instructor=teacher
+    )
+    student_users = User.objects.bulk_create(
+        User(
+            username=f"{prefix}-student{i}@test.com",
+            email=f"{prefix}-student{i}@test.com",
+            password=password,
+            name=f"Name{i}",
+            surname=f"Surname{i:05}",
+        )
+        for i in range(students)
+    )
+    CourseProgress.objects.bulk_create(
+        CourseProgress(user=student, course=course) for student in student_users
+    )
+    module_objs = Module.objects.bulk_create(
+        Module(name=f"Module {i}", course=course) for i in range(modules)
+    )
+    for module in module_objs:
+        # also indexes the module for search
+        revisions.commit(module, "Lorem ipsum " * 50)
+    ModuleProgress.objects.bulk_create(
+        ModuleProgress(user=student, module=module, completed=True)
+        for i, student in enumerate(student_users)
+        for module in module_objs[: i % (modules + 1)]
+    )
+
+    banks, questions, quiz_objs = [], [], []
+    for q in range(quizzes):
+        quiz = Quiz.objects.create(
+            title=f"Quiz {q}",
+            description="",
+            time_limit_in_minutes=30,
+            course=course,
+            module=module_objs[q % modules] if modules else None,
+        )
+        for b in range(banks_per_quiz):
+            bank = QuestionBank.objects.create(title=f"Bank {q}.{b}", user=teacher)
+            bank_questions = Question.objects.bulk_create(
+                Question(text=f"Question {q}.{b}.{n}", is_open_ended=not n % 2)
+                for n in range(questions_per_bank)
+            )
+            MultipleChoiceOption.objects.bulk_create(
+                MultipleChoiceOption(
+                    question=question,
+                    option1="a",
+                    option2="b",
+                    option3="c",
+                    option4="d",
+                    correct_option=n % 4 + 1,
+                )
+                for n, question in enumerate(bank_questions)
+                if not question.is_open_ended
+            )
+            bank.questions.add(*bank_questions)
+            quiz.question_banks.add(bank)
+            banks.append(bank)
+            questions.extend(bank_questions)
+        quiz_objs.append(quiz)
+
+    QuestionResponse.objects.bulk_create(
+        QuestionResponse(
+            user=student,
+            question=question,
+            response_text="-" if question.is_open_ended else None,
+            selected_option=None if question.is_open_ended else i % 4 + 1,
+        )
+        for i, student in enumerate(student_users[: round(students * response_rate)])
+        for question in questions
+    )
+    return SimpleNamespace(
+        teacher=teacher,
+        course=course,
+        students=student_users,
+        modules=module_objs,
+        quizzes=quiz_objs,
+        banks=banks,
+        questions=questions,
+    )
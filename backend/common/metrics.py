@@ -0,0 +1,391 @@
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+UNMATCHED_ROUTE = "<unmatched>"
+# totals of exited workers, see `retire`
+RETIRED_FILENAME = "metrics-retired.json"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, registry, name, help, labels):
+        self.registry, self.name, self.help, self.labels = registry, name, help, labels
+        self.samples = {}
+
+    def inc(self, *labels, amount=1):
+        with self.registry.lock:
+            self.samples[labels] = self.samples.get(labels, 0) + amount
+
+    def dump(self):
+        return {"type": self.type, "help": self.help, "labels": self.labels}
+
+
+class Histogram(Counter):
+    """
+    Samples are [count per bucket..., count above the last bucket, sum];
+    buckets are made cumulative only when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(self, registry, name, help, labels, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self.registry.lock:
+            sample = self.samples.get(labels)
+            if sample is None:
+                sample = self.samples[labels] = [0] * (len(self.buckets) + 2)
+            sample[bisect_left(self.buckets, value)] += 1
+            sample[-1] += value
+
+    def dump(self):
+        return super().dump() | {"buckets": self.buckets}
+
+
+class Registry:
+    """
+    Process-local metrics. Under prefork servers every worker writes its
+    snapshot to its own file in a shared directory (see `write`), and a
+    scrape served by any worker sums all of them (see `collect`). When a
+    worker exits its file is folded into one of retired totals (see
+    `retire`), so counters neither go backwards nor pile up files; clear
+    the directory when the server starts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # A forked worker must not report what its parent already counted.
+        for metric in self.metrics.values():
+            metric.samples = {}
+        self.filename = f"metrics-{os.getpid()}-{time.time_ns()}.json"
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(self, name, help, tuple(labels)))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help, tuple(labels), buckets))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: metric.dump()
+                | {
+                    "samples": [
+                        [list(labels), value if metric.type == "counter" else value[:]]
+                        for labels, value in metric.samples.items()
+                    ]
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def write(self, directory):
+        _write_json(Path(directory) / self.filename, self.snapshot())
+
+
+def _write_json(path, data):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def merge(snapshots):
+    """Sum snapshots of the same metrics taken in different processes."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, metric | {"samples": {}})
+            samples = target["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if key not in samples:
+                    samples[key] = value
+                elif metric["type"] == "counter":
+                    samples[key] += value
+                else:
+                    samples[key] = [a + b for a, b in zip(samples[key], value)]
+    return merged
+
+
+def _as_snapshot(merged):
+    return {
+        name: metric | {"samples": [[list(k), v] for k, v in metric["samples"].items()]}
+        for name, metric in merged.items()
+    }
+
+
+def _read_retired(directory):
+    try:
+        return json.loads((directory / RETIRED_FILENAME).read_text())
+    except (OSError, ValueError):
+        return {"metrics": {}, "files": []}
+
+
+def retire(directory, pid):
+    """
+    Folds the snapshots of the exited worker `pid` into the retired totals
+    and removes them. Runs in the gunicorn master (child_exit), so it never
+    races another retire.
+    """
+    directory = Path(directory)
+    paths = list(directory.glob(f"metrics-{pid}-*.json"))
+    if not paths:
+        return
+    retired = _read_retired(directory)
+    snapshots = [retired["metrics"]]
+    for path in paths:
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    # Files listed here are skipped by collect from the moment the totals
+    # include them, until they are gone.
+    files = [name for name in retired["files"] if (directory / name).exists()]
+    _write_json(
+        directory / RETIRED_FILENAME,
+        {
+            "metrics": _as_snapshot(merge(snapshots)),
+            "files": files + [path.name for path in paths],
+        },
+    )
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def collect(directory):
+    directory = Path(directory)
+    for _ in range(3):
+        paths = list(directory.glob("metrics-*.json"))
+        retired = _read_retired(directory)
+        skipped = {RETIRED_FILENAME, *retired["files"]}
+        snapshots, vanished = [retired["metrics"]], False
+        for path in paths:
+            if path.name in skipped:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except FileNotFoundError:
+                # retired since the totals were read; read them again
+                vanished = True
+                break
+            except (OSError, ValueError):
+                continue
+        if not vanished:
+            break
+    return merge(snapshots)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render(merged):
+    """Prometheus text exposition format (0.0.4) of a merged snapshot."""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_labels(metric['labels'], labels)} {value}")
+                continue
+            cumulative = 0
+            bounds = [*metric["buckets"], "+Inf"]
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                le = _labels(metric["labels"], labels, [("le", bound)])
+                lines.append(f"{name}_bucket{le} {cumulative}")
+            labelled = _labels(metric["labels"], labels)
+            lines.append(f"{name}_sum{labelled} {value[-1]}")
+            lines.append(f"{name}_count{labelled} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total",
+    "Requests served, by URL route and status.",
+    ("method", "route", "status"),
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by URL route.",
+    ("method", "route"),
+)
+db_queries = registry.histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request, by URL route.",
+    ("route",),
+    QUERY_COUNT_BUCKETS,
+)
+db_time = registry.histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL per request, by URL route.",
+    ("route",),
+)
+s3_latency = registry.histogram(
+    "s3_request_duration_seconds",
+    "S3 API call latency, by operation and outcome.",
+    ("operation", "outcome"),
+)
+cache_lookups = registry.counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result; hit rate is hit / (hit + miss).",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache, hit):
+    cache_lookups.inc(cache, "hit" if hit else "miss")
+
+
+def instrument_boto3(session):
+    """Time every S3 API call of clients created from `session` afterwards."""
+
+    def before_call(model, context, **kwargs):
+        context["metrics_call"] = (model.name, time.perf_counter())
+
+    def after_call(context, http_response=None, exception=None, **kwargs):
+        # after-call-error (connection failures) carries no operation model.
+        call = context.pop("metrics_call", None)
+        if call is None:
+            return
+        operation, started = call
+        failed = exception is not None or http_response.status_code >= 400
+        s3_latency.observe(
+            time.perf_counter() - started, operation, "error" if failed else "ok"
+        )
+
+    # before-call handlers can be skipped by one answering the call (as
+    # botocore's Stubber does); parameter building always happens.
+    session.events.register("before-parameter-build.s3", before_call)
+    session.events.register("after-call.s3", after_call)
+    session.events.register("after-call-error.s3", after_call)
+
+
+class MetricsMiddleware:
+    """
+    Counts and times every request by its URL route (never the concrete
+    path, which would explode the number of series). Per-request query
+    metrics come from SQLInstrumentationMiddleware, which has to run
+    inside this one. Configured by settings.METRICS; removed from the stack
+    when disabled.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "METRICS", {})
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.directory = config.get("DIR")
+        self.flush_interval = config.get("FLUSH_INTERVAL", 1.0)
+        self._flushed = 0.0
+        if self.directory:
+            Path(self.directory).mkdir(parents=True, exist_ok=True)
+            atexit.register(registry.write, self.directory)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    def _record(self, request, response, started):
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.route if match else UNMATCHED_ROUTE
+        http_requests.inc(request.method, route, str(response.status_code))
+        http_latency.observe(duration, request.method, route)
+        stats = getattr(request, "sql_stats", None)
+        if stats is not None:
+            db_queries.observe(stats.count, route)
+            db_time.observe(stats.duration, route)
+
+        if self.directory and started - self._flushed >= self.flush_interval:
+            self._flushed = started
+            registry.write(self.directory)
+
+
+def _authorized(request, token):
+    if token and hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return True
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+def metrics(request):
+    """
+    Prometheus scrape target, for the TOKEN as a bearer token or for staff;
+    other workers' numbers lag by FLUSH_INTERVAL.
+    """
+    config = getattr(settings, "METRICS", {})
+    if not config.get("ENABLED"):
+        raise Http404
+    if not _authorized(request, config.get("TOKEN")):
+        response = HttpResponse(status=401)
+        response["WWW-Authenticate"] = "Bearer"
+        return response
+    if config.get("DIR"):
+        registry.write(config["DIR"])
+        merged = collect(config["DIR"])
+    else:
+        merged = merge([registry.snapshot()])
+    return HttpResponse(
+        render(merged), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
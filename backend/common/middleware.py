@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject, empty
+
+_query_wrappers = ContextVar("query_wrappers", default=())
+_installed = False
+
+
+def request_user(request):
+    """
+    The user behind `request` if authentication already resolved it (DRF
+    copies its user back onto the request), else None. Never triggers the
+    session lookup itself, which async middleware must not run.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+def _execute(execute, sql, params, many, context):
+    for wrapper in reversed(_query_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def _add_execute(connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+def install_query_wrappers():
+    """
+    Hook query_wrapper into every connection. Connections are per thread and
+    the hook reaches those of other threads only as they connect, so this
+    runs at startup (CourseConfig.ready), before any of them do.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_execute)
+    for connection in connections.all(initialized_only=True):
+        _add_execute(connection)
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """
+    Run `wrapper` around every statement executed inside the block, like
+    `connection.execute_wrapper` but on all connections. It follows the
+    context rather than the thread, so it also sees the queries of an async
+    request, which Django runs in a worker thread with its own connections.
+    """
+    install_query_wrappers()
+    token = _query_wrappers.set((*_query_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        _query_wrappers.reset(token)
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+# format in the URL: (file name, content type)
+FORMATS = {
+    ".json": ("swagger.json", "application/json"),
+    ".yaml": ("swagger.yaml", "application/yaml"),
+}
+
+_lock = threading.Lock()
+# format: (mtime_ns, body, etag) of the file last read
+_loaded = {}
+_ui_view = None
+
+
+def _config():
+    return getattr(settings, "OPENAPI_SCHEMA", {})
+
+
+def schema_dir():
+    return Path(_config().get("DIR", settings.BASE_DIR / "schema"))
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Your API",
+        default_version="v1",
+        description="API documentation",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="you@example.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def generate(directory=None):
+    """
+    Introspects every view and writes the schema to `directory` (the
+    configured DIR by default) as swagger.json and swagger.yaml. Returns
+    the paths written.
+    """
+    from drf_yasg.app_settings import swagger_settings
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    # Views look at request.user; they see an anonymous client, as the
+    # public schema view did. An empty url leaves host and scheme out, so
+    # the file is right for whichever host serves it.
+    request = APIView().initialize_request(APIRequestFactory().get("/swagger.json"))
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(api_info(), url="")
+    schema = generator.get_schema(request=request, public=True)
+
+    directory = Path(directory or schema_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for (name, _), codec in zip(
+        FORMATS.values(),
+        (OpenAPICodecJson(validators=[]), OpenAPICodecYaml(validators=[])),
+    ):
+        paths.append(_write(directory / name, codec.encode(schema)))
+    return paths
+
+
+def _write(path, content):
+    # Workers reading the file meanwhile see the old one or the new one whole.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def _load(format):
+    path = schema_dir() / FORMATS[format][0]
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        # Not generated at startup (a dev server); the first fetch does it.
+        with _lock:
+            if not path.exists():
+                generate()
+        stat = path.stat()
+    loaded = _loaded.get(format)
+    if loaded is None or loaded[0] != stat.st_mtime_ns:
+        body = path.read_bytes()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        loaded = _loaded[format] = (stat.st_mtime_ns, body, etag)
+    return loaded
+
+
+def schema_view(request, format):
+    """
+    The pre-generated schema file, read once per worker and again only
+    when generate_schema has rewritten it. Clients and proxies may cache
+    it for MAX_AGE seconds and revalidate with its ETag after that.
+    """
+    if format not in FORMATS:
+        raise Http404
+    _, body, etag = _load(format)
+    response = HttpResponse(body, content_type=FORMATS[format][1])
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=_config().get("MAX_AGE", 3600))
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def swagger_ui(request):
+    """Swagger UI; its page loads the schema from schema_view (SPEC_URL)."""
+    global _ui_view
+    if _ui_view is None:
+        from drf_yasg.views import get_schema_view
+        from rest_framework import permissions
+
+        _ui_view = get_schema_view(
+            api_info(),
+            public=True,
+            permission_classes=[permissions.AllowAny],
+            authentication_classes=[],
+        ).with_ui("swagger", cache_timeout=_config().get("MAX_AGE", 3600))
+    return _ui_view(request)
@@ -0,0 +1,300 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .middleware import request_user
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_NAME = re.compile(r"^[\w-]+\.(cpu\.folded|mem\.folded|json)$")
+
+
+def _config():
+    return getattr(settings, "PROFILING", {})
+
+
+class StackSampler:
+    """
+    Statistical CPU profiler: a daemon thread snapshots the stack of one
+    thread every `interval` seconds. `folded()` returns the samples in the
+    collapsed-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame):
+        names = []
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}.{frame.f_code.co_qualname}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def _folded_allocations(snapshot, baseline=None):
+    """Live allocations as collapsed stacks weighted by bytes."""
+    if baseline is None:
+        stats = [(s.traceback, s.size) for s in snapshot.statistics("traceback")]
+    else:
+        stats = [
+            (s.traceback, s.size_diff)
+            for s in snapshot.compare_to(baseline, "traceback")
+            if s.size_diff > 0
+        ]
+    lines = []
+    for traceback, size in stats:
+        # Oldest frame first, as the format expects.
+        stack = ";".join(
+            f"{Path(frame.filename).name}:{frame.lineno}" for frame in traceback
+        )
+        lines.append(f"{stack} {size}\n")
+    return "".join(lines)
+
+
+def _is_staff(request):
+    user = request_user(request)
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+def _has_valid_token(request):
+    """Whether `request` carries a valid JWT; checks the signature, no query."""
+    authentication = JWTAuthentication()
+    raw_token = authentication.get_raw_token(authentication.get_header(request) or b"")
+    if raw_token is None:
+        return False
+    try:
+        authentication.get_validated_token(raw_token)
+    except (InvalidToken, AuthenticationFailed):
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests in place: CPU with StackSampler and memory
+    with tracemalloc. A request is profiled when a staff user sends
+    `X-Profile: cpu`, `memory` or `all`, or in SAMPLE_MODE when it falls
+    into SAMPLE_RATE (optionally only for ROUTES). Results land in DIR and
+    are served by ProfileListView / ProfileDownloadView.
+
+    Users are only known once the view has authenticated them, so a
+    requested profile is taken for any request with a valid access token
+    and dropped afterwards unless the user turned out to be staff.
+
+    tracemalloc slows down every thread of the process, so one request per
+    process is profiled at a time; others pass through untouched.
+    Configured by settings.PROFILING; removed from the stack when disabled.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = _config()
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.directory = Path(config["DIR"])
+        self.sample_rate = config.get("SAMPLE_RATE", 0.0)
+        self.sample_mode = config.get("SAMPLE_MODE", "cpu")
+        self.routes = set(config.get("ROUTES", ()))
+        self.interval = config.get("INTERVAL", 0.005)
+        self.memory_frames = config.get("MEMORY_FRAMES", 25)
+        self.keep = config.get("KEEP", 200)
+        self._busy = threading.Lock()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self._mode(request)
+        if mode is None or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            with self._profiling(mode) as profile:
+                response = self.get_response(request)
+            return self._save(request, response, profile)
+        finally:
+            self._busy.release()
+
+    async def __acall__(self, request):
+        mode = self._mode(request)
+        if mode is None or not self._busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            with self._profiling(mode) as profile:
+                response = await self.get_response(request)
+            return self._save(request, response, profile)
+        finally:
+            self._busy.release()
+
+    def _mode(self, request):
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested:
+            if requested not in ("cpu", "memory", "all"):
+                return None
+            if not _has_valid_token(request):
+                return None
+            return requested
+        if self.sample_rate and random.random() < self.sample_rate:
+            if self.routes and self._route(request) not in self.routes:
+                return None
+            return self.sample_mode
+        return None
+
+    @staticmethod
+    def _route(request):
+        # Middleware runs before URL resolution.
+        try:
+            return resolve(request.path_info).route
+        except Resolver404:
+            return None
+
+    @contextmanager
+    def _profiling(self, mode):
+        """
+        Profile the block. The sampler watches the calling thread: for an
+        async request that is the event loop, so time spent awaiting the
+        database shows up as the loop waiting, not as the query.
+        """
+        cpu, memory = mode in ("cpu", "all"), mode in ("memory", "all")
+        profile = {"cpu": cpu, "memory": memory}
+        started_tracing = baseline = None
+        if memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(self.memory_frames)
+            else:
+                baseline = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+
+        sampler = profile["sampler"] = StackSampler(
+            threading.get_ident(), self.interval
+        )
+        started = time.perf_counter()
+        try:
+            if cpu:
+                with sampler:
+                    yield profile
+            else:
+                yield profile
+        finally:
+            profile["duration"] = time.perf_counter() - started
+            if memory:
+                profile["allocations"] = _folded_allocations(
+                    tracemalloc.take_snapshot(), baseline
+                )
+                profile["peak"] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def _save(self, request, response, profile):
+        if request.headers.get(PROFILE_HEADER) and not _is_staff(request):
+            return response
+        cpu, memory, sampler = profile["cpu"], profile["memory"], profile["sampler"]
+        match = request.resolver_match
+        route = match.route if match else request.path
+        slug = re.sub(r"\W+", "-", route).strip("-")[:60] or "root"
+        name = f"{time.time_ns() // 1_000_000}-{os.getpid()}-{slug}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        if cpu:
+            files.append(f"{name}.cpu.folded")
+            (self.directory / files[-1]).write_text(sampler.folded())
+        if memory:
+            files.append(f"{name}.mem.folded")
+            (self.directory / files[-1]).write_text(profile["allocations"])
+        user = request_user(request)
+        meta = {
+            "id": name,
+            "method": request.method,
+            "route": match.route if match else None,
+            "path": request.path,
+            "user_id": user.pk if user and user.is_authenticated else None,
+            "status": response.status_code,
+            "duration_ms": round(profile["duration"] * 1000, 2),
+            "cpu_samples": sum(sampler.stacks.values()) if cpu else None,
+            "peak_alloc_kib": round(profile["peak"] / 1024, 1) if memory else None,
+            "files": files,
+        }
+        (self.directory / f"{name}.json").write_text(json.dumps(meta))
+        self._prune()
+        if request.headers.get(PROFILE_HEADER):
+            response["X-Profile-Id"] = name
+        return response
+
+    def _prune(self):
+        profiles = sorted(self.directory.glob("*.json"))
+        for meta in profiles[: max(0, len(profiles) - self.keep)]:
+            for path in self.directory.glob(f"{meta.name[:-5]}.*"):
+                path.unlink(missing_ok=True)
+
+
+class ProfileListView(APIView):
+    """Saved request profiles, newest first."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        directory = Path(_config().get("DIR", ""))
+        profiles = []
+        for path in sorted(directory.glob("*.json"), reverse=True):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return Response(profiles)
+
+
+class ProfileDownloadView(APIView):
+    """One profile file: folded stacks for flamegraph.pl or speedscope."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        path = Path(_config().get("DIR", "")) / name
+        if not PROFILE_NAME.match(name) or not path.is_file():
+            raise Http404
+        return FileResponse(path.open("rb"), as_attachment=True, filename=name)
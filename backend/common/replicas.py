@@ -0,0 +1,121 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_HEADER = "X-Primary-Until"
+PIN_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Whether reads may go to the replica; only ReplicaMiddleware turns it on.
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def _config():
+    return getattr(settings, "DATABASE_REPLICA", {})
+
+
+def replica_alias():
+    """The replica's DATABASES alias, or None when there is none."""
+    alias = _config().get("ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica while ReplicaMiddleware allows it, which is
+    only ever inside a read-only request. The first write of a request
+    switches its remaining reads back to the primary, so a view always sees
+    what it has just written. Everything else (commands, the mailer, tests
+    without a replica) uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        _replica_reads.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return None if db != replica_alias() else False
+
+
+class ReplicaMiddleware:
+    """
+    Lets safe requests read from the replica, except under EXCLUDE paths.
+
+    Read-your-writes: after an unsafe request the client is pinned to the
+    primary for STICKY_SECONDS, long enough for the replica to catch up.
+    The pin travels with the client, so it holds whichever worker or task
+    serves the next request: a `primary_until` cookie for browser sessions
+    and an X-Primary-Until response header that API clients send back. A
+    forged value can only send the sender's own reads to the primary.
+    Configured by settings.DATABASE_REPLICA; removed from the stack when
+    no replica is configured.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        config = _config()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sticky_seconds = config.get("STICKY_SECONDS", 5.0)
+        self.exclude = tuple(config.get("EXCLUDE", ()))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _replica_reads.set(self._replica_allowed(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = _replica_reads.set(self._replica_allowed(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        return self._pin(request, response)
+
+    def _replica_allowed(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        if request.path.startswith(self.exclude):
+            return False
+        pinned = request.headers.get(PIN_HEADER) or request.COOKIES.get(PIN_COOKIE)
+        try:
+            return float(pinned) <= time.time()
+        except (TypeError, ValueError):
+            return True
+
+    def _pin(self, request, response):
+        if request.method in SAFE_METHODS:
+            return response
+        until = f"{time.time() + self.sticky_seconds:.3f}"
+        response[PIN_HEADER] = until
+        response.set_cookie(
+            PIN_COOKIE,
+            until,
+            max_age=self.sticky_seconds,
+            httponly=True,
+            samesite="Lax",
+            secure=request.is_secure(),
+        )
+        return response
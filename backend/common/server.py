@@ -0,0 +1,44 @@
+import math
+import os
+from pathlib import Path
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def cpu_quota(root=CGROUP_ROOT):
+    """CPUs granted by the container's cgroup (v2 or v1), None if unlimited."""
+    root = Path(root)
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+
+def available_cpus(cgroup_root=CGROUP_ROOT):
+    """
+    CPUs this process may actually use. os.cpu_count() reports the host's,
+    which on Fargate is far more than the task was given.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def default_workers(interface, cpus):
+    """
+    Threaded WSGI workers block on the database, so they get the usual
+    2 * CPUs + 1; an ASGI worker keeps one CPU busy on its own.
+    """
+    return cpus if interface == "asgi" else 2 * cpus + 1
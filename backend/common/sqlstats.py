@@ -0,0 +1,150 @@
+import heapq
+import json
+import logging
+import random
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import query_wrapper, request_user
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_CHARS = 500
+
+
+class QueryStats:
+    """
+    `execute_wrapper` that counts and times every statement of a request.
+
+    SQL text is kept with its placeholders, so the same statement run with
+    different parameters (the N+1 signature) collapses into one entry.
+    """
+
+    def __init__(self, keep_slowest=5):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_slowest = keep_slowest
+        self.statements = Counter()
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[sql] += 1
+        # Min-heap of the slowest statements; the count breaks ties.
+        entry = (duration, self.count, sql)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        return [
+            {"sql": sql[:MAX_SQL_CHARS], "ms": round(duration * 1000, 2)}
+            for duration, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def duplicates(self, threshold):
+        return [
+            {"sql": sql[:MAX_SQL_CHARS], "count": count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Measures the queries behind every request on all database connections:
+    count, total time, the slowest statements and statements repeated at
+    least DUPLICATE_THRESHOLD times.
+
+    Adds a Server-Timing header (db and app durations) for staff, or for
+    everyone with SERVER_TIMING "all", since query counts would otherwise
+    tell apart responses that are meant to look alike. Logs one JSON
+    line to the `common.sqlstats` logger for requests that are slow, repeat
+    a statement, or fall into SAMPLE_RATE. Works with DEBUG off, since it
+    hooks the connections instead of reading `connection.queries`.
+    Configured by settings.SQL_INSTRUMENTATION; removed from the stack
+    when disabled.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "SQL_INSTRUMENTATION", {})
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.header = config.get("SERVER_TIMING", "staff")
+        self.slow_ms = config.get("SLOW_REQUEST_MS", 500)
+        self.sample_rate = config.get("SAMPLE_RATE", 0.0)
+        self.duplicate_threshold = config.get("DUPLICATE_THRESHOLD", 3)
+        self.keep_slowest = config.get("SLOWEST", 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = request.sql_stats = QueryStats(self.keep_slowest)
+        started = time.perf_counter()
+        with query_wrapper(stats):
+            response = self.get_response(request)
+        self._report(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats = request.sql_stats = QueryStats(self.keep_slowest)
+        started = time.perf_counter()
+        with query_wrapper(stats):
+            response = await self.get_response(request)
+        self._report(request, response, stats, started)
+        return response
+
+    def _report(self, request, response, stats, started):
+        duration = (time.perf_counter() - started) * 1000
+        db_ms = stats.duration * 1000
+
+        user = request_user(request)
+        if self.header == "all" or (
+            self.header == "staff" and user is not None and user.is_staff
+        ):
+            timing = (
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", '
+                f"app;dur={duration:.1f}"
+            )
+            if response.has_header("Server-Timing"):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response["Server-Timing"] = timing
+
+        duplicates = stats.duplicates(self.duplicate_threshold)
+        slow = duration >= self.slow_ms
+        if slow or duplicates or random.random() < self.sample_rate:
+            match = request.resolver_match
+            entry = {
+                "method": request.method,
+                "route": match.route if match else None,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(duration, 2),
+                "queries": stats.count,
+                "db_ms": round(db_ms, 2),
+                "slow": slow,
+                "slowest": stats.slowest(),
+                "duplicates": duplicates,
+            }
+            logger.log(
+                logging.WARNING if slow or duplicates else logging.INFO,
+                json.dumps(entry, separators=(",", ":")),
+            )
@@ -0,0 +1,771 @@
+import asyncio
+import contextvars
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from botocore.stub import Stubber
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from course.management.commands import migrate_once
+from course.models import Course, CourseProgress
+from module.models import Module
+from question.models import Question
+from questionbank.models import QuestionBank
+from quiz.models import Quiz
+from user.models import User
+
+from . import compression, fastjson, metrics, openapi, server, tracing
+from .fixtures import build_course_fixture
+from .middleware import query_wrapper
+from .profiling import ProfilingMiddleware, StackSampler
+from .replicas import ReplicaMiddleware, ReplicaRouter
+from .sqlstats import QueryStats
+from .traffic import load_capture, replay
+
+
+class TrafficCaptureTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=3, modules=1, quizzes=1)
+        cls.data.students[0].set_password("studentpass")
+        cls.data.students[0].save()
+
+    def capture(self, requests):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "traffic.jsonl"
+            config = {"ENABLED": True, "PATH": str(path), "EXCLUDE": ["/health/"]}
+            with self.settings(TRAFFIC_CAPTURE=config):
+                requests()
+            return load_capture(path.read_text().splitlines())
+
+    def test_capture_records_sanitized_traces(self):
+        student = self.data.students[0]
+
+        def requests():
+            self.client.post(
+                "/accounts/token/",
+                {"username": student.username, "password": "studentpass"},
+                format="json",
+            )
+            self.client.get("/health/")
+            self.client.force_authenticate(user=student)
+            self.client.get(f"/api/courses/{self.data.course.id}/modules/", {"page": 1})
+            self.client.get(
+                f"/api/courses/{self.data.course.id}/eligible-students/",
+                {"search": student.surname},
+            )
+
+        login, modules, search = self.capture(requests)
+        self.assertEqual(login["body"], {"username": "***", "password": "***"})
+        self.assertTrue(login["redacted"])
+        self.assertEqual(login["role"], "anonymous")
+        self.assertEqual(modules["route"], "api/courses/<int:course_id>/modules/")
+        self.assertEqual(modules["query"], {"page": ["1"]})
+        self.assertEqual((modules["role"], modules["user_id"]), ("student", student.id))
+        self.assertFalse(modules["redacted"])
+        self.assertEqual(modules["status"], 200)
+        self.assertEqual(search["query"], {"search": "***"})
+        self.assertTrue(search["redacted"])
+
+    def test_replay_reports_latency_per_route(self):
+        traces = [
+            {"ts": 100.0 + i, "method": "GET", "route": route, "path": "/x/"}
+            for i, route in enumerate(["a/", "a/", "b/"])
+        ]
+        sent = []
+        report = replay(traces, lambda trace: sent.append(trace) or 200, speed=0)
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(report["requests"], 3)
+        self.assertEqual(report["routes"]["GET a/"]["count"], 2)
+        self.assertEqual(report["routes"]["GET b/"]["status"], {"200": 1})
+        self.assertIn("p99_ms", report["overall"])
+
+
+class SQLInstrumentationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="teacher", is_teacher=True)
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=cls.teacher
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+        bank = QuestionBank.objects.create(title="Bank", user=cls.teacher)
+        bank.questions.add(Question.objects.create(text="Why?", is_open_ended=True))
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=10, course=cls.course
+        )
+        cls.quiz.question_banks.add(bank)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.student)
+
+    def test_server_timing_header(self):
+        config = {"ENABLED": True, "SERVER_TIMING": "all", "SAMPLE_RATE": 1.0}
+        with self.settings(SQL_INSTRUMENTATION=config):
+            with self.assertLogs("common.sqlstats", "INFO") as logs:
+                response = self.client.get(f"/api/courses/{self.course.id}")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$',
+        )
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["route"], "api/courses/<int:course_id>")
+        self.assertEqual(entry["status"], 200)
+        self.assertGreater(entry["queries"], 0)
+        self.assertEqual(entry["duplicates"], [])
+        self.assertEqual(len(entry["slowest"]), min(entry["queries"], 5))
+
+    def test_server_timing_staff_only_by_default(self):
+        with self.settings(SQL_INSTRUMENTATION={"ENABLED": True}):
+            response = self.client.get(f"/api/courses/{self.course.id}")
+            self.assertFalse(response.has_header("Server-Timing"))
+            self.client.force_authenticate(user=self.teacher)
+            self.teacher.is_staff = True
+            response = self.client.get("/api/courses/")
+        self.assertTrue(response.has_header("Server-Timing"))
+
+    def test_fast_requests_not_logged_unless_sampled(self):
+        config = {"ENABLED": True, "SAMPLE_RATE": 0.0, "SLOW_REQUEST_MS": 10_000}
+        with self.settings(SQL_INSTRUMENTATION=config):
+            with self.assertNoLogs("common.sqlstats"):
+                self.client.get(f"/api/courses/{self.course.id}")
+
+    async def test_async_requests_measured(self):
+        config = {"ENABLED": True, "SERVER_TIMING": "all", "SAMPLE_RATE": 1.0}
+        token = AccessToken.for_user(self.student)
+        with self.settings(SQL_INSTRUMENTATION=config):
+            with self.assertLogs("common.sqlstats", "INFO") as logs:
+                response = await self.async_client.get(
+                    f"/api/async/quizzes/{self.quiz.id}/questions/",
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Server-Timing", response)
+        self.assertGreater(json.loads(logs.records[0].getMessage())["queries"], 1)
+
+    def test_queries_of_other_threads_in_context_counted(self):
+        # As under ASGI, where the ORM runs in a thread with its own connection.
+        stats = QueryStats()
+
+        def query():
+            try:
+                User.objects.count()
+            finally:
+                connection.close()
+
+        with query_wrapper(stats):
+            thread = threading.Thread(
+                target=contextvars.copy_context().run, args=[query]
+            )
+            thread.start()
+            thread.join()
+        self.assertEqual(stats.count, 1)
+
+    def test_repeated_statements_reported(self):
+        stats = QueryStats(keep_slowest=2)
+        for i, duration in enumerate([0.001, 0.004, 0.002, 0.003]):
+            stats.record(f"SELECT {i % 2}", duration)
+        stats.record("SELECT 0", 0.0)
+        self.assertEqual((stats.count, round(stats.duration, 3)), (5, 0.01))
+        self.assertEqual(stats.duplicates(3), [{"sql": "SELECT 0", "count": 3}])
+        self.assertEqual(
+            stats.slowest(),
+            [{"sql": "SELECT 1", "ms": 4.0}, {"sql": "SELECT 1", "ms": 3.0}],
+        )
+
+
+class MetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", is_staff=True)
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=cls.admin
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+
+    def scrape(self, user=None, **config):
+        config = {"ENABLED": True, **config}
+        with self.settings(METRICS=config, SQL_INSTRUMENTATION={"ENABLED": True}):
+            self.client.force_authenticate(user=self.student)
+            self.client.get(f"/api/courses/{self.course.id}")
+            self.client.get("/no-such-page/")
+            self.client.force_authenticate(user=None)
+            if user is not None:
+                self.client.credentials(
+                    HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+                )
+            return self.client.get("/metrics")
+
+    def test_scrape_exposes_route_metrics(self):
+        response = self.scrape(user=self.admin)
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        route = 'route="api/courses/<int:course_id>"'
+        self.assertIn(f'http_requests_total{{method="GET",{route},status="200"}}', body)
+        self.assertIn('route="<unmatched>",status="404"', body)
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{method="GET",{route},le="+Inf"}}',
+            body,
+        )
+        self.assertIn(f"db_queries_per_request_count{{{route}}}", body)
+        self.assertIn("# TYPE db_time_per_request_seconds histogram", body)
+
+    def test_scrape_requires_staff_by_default(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(user=self.student).status_code, 401)
+
+    def test_scrape_requires_token_when_configured(self):
+        self.assertEqual(self.scrape(TOKEN="secret").status_code, 401)
+        with self.settings(METRICS={"ENABLED": True, "TOKEN": "secret"}):
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+
+    def test_worker_snapshots_are_summed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for value in (0.2, 3.0):
+                worker = metrics.Registry()
+                worker.counter("jobs_total", "Jobs.", ("kind",)).inc("a")
+                worker.histogram("job_seconds", "Job time.", buckets=(1,)).observe(
+                    value
+                )
+                worker.write(tmp)
+            body = metrics.render(metrics.collect(tmp))
+        self.assertIn('jobs_total{kind="a"} 2', body)
+        self.assertIn('job_seconds_bucket{le="1"} 1', body)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 2', body)
+        self.assertIn("job_seconds_count 2", body)
+        self.assertIn("job_seconds_sum 3.2", body)
+
+    def test_exited_worker_totals_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for pid in (1, 2):
+                worker = metrics.Registry()
+                worker.filename = f"metrics-{pid}-0.json"
+                worker.counter("jobs_total", "Jobs.", ("kind",)).inc("a")
+                worker.write(tmp)
+                metrics.retire(tmp, pid)
+            worker = metrics.Registry()
+            worker.filename = "metrics-3-0.json"
+            worker.counter("jobs_total", "Jobs.", ("kind",)).inc("b")
+            worker.write(tmp)
+            body = metrics.render(metrics.collect(tmp))
+            files = sorted(path.name for path in Path(tmp).iterdir())
+        self.assertIn('jobs_total{kind="a"} 2', body)
+        self.assertIn('jobs_total{kind="b"} 1', body)
+        self.assertEqual(files, ["metrics-3-0.json", metrics.RETIRED_FILENAME])
+
+    def test_s3_calls_timed(self):
+        from module.aws import s3_client
+
+        def count():
+            sample = metrics.s3_latency.samples.get(("HeadBucket", "ok"))
+            return sum(sample[:-1]) if sample else 0
+
+        before = count()
+        with Stubber(s3_client) as stubber:
+            stubber.add_response("head_bucket", {}, {"Bucket": "bucket"})
+            s3_client.head_bucket(Bucket="bucket")
+        self.assertEqual(count(), before + 1)
+
+
+class ProfilingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", is_teacher=True, is_staff=True
+        )
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=cls.admin
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        settings = self.settings(PROFILING={"ENABLED": True, "DIR": tmp.name})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_staff_profile_saved_and_downloadable(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}"
+        )
+        response = self.client.get(
+            f"/api/courses/{self.course.id}", HTTP_X_PROFILE="all"
+        )
+        self.assertEqual(response.status_code, 200)
+        name = response["X-Profile-Id"]
+
+        profiles = self.client.get("/api/admin/profiles/").json()
+        self.assertEqual(profiles[0]["id"], name)
+        self.assertEqual(profiles[0]["route"], "api/courses/<int:course_id>")
+        self.assertEqual(
+            profiles[0]["files"], [f"{name}.cpu.folded", f"{name}.mem.folded"]
+        )
+        download = self.client.get(f"/api/admin/profiles/{name}.mem.folded")
+        self.assertEqual(download.status_code, 200)
+        line = b"".join(download.streaming_content).decode().splitlines()[0]
+        self.assertRegex(line, r"^\S+:\d+(;\S+:\d+)* \d+$")
+        self.assertEqual(
+            self.client.get("/api/admin/profiles/..%2Fsettings.py").status_code, 404
+        )
+
+    def test_non_staff_cannot_profile(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.student)}"
+        )
+        response = self.client.get(
+            f"/api/courses/{self.course.id}", HTTP_X_PROFILE="all"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertEqual(list(self.directory.iterdir()), [])
+        self.assertEqual(self.client.get("/api/admin/profiles/").status_code, 403)
+
+    def test_invalid_token_is_not_profiled(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        with mock.patch.object(ProfilingMiddleware, "_profiling") as profiling:
+            response = self.client.get(
+                f"/api/courses/{self.course.id}", HTTP_X_PROFILE="all"
+            )
+        self.assertEqual(response.status_code, 401)
+        profiling.assert_not_called()
+
+    def test_staff_checked_without_extra_queries(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}"
+        )
+        url = f"/api/courses/{self.course.id}"
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as profiled:
+            response = self.client.get(url, HTTP_X_PROFILE="cpu")
+        self.assertTrue(response.has_header("X-Profile-Id"))
+        self.assertEqual(len(profiled), len(plain))
+
+    def test_sampler_collects_folded_stacks(self):
+        def busy_loop():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with StackSampler(threading.get_ident(), interval=0.001) as sampler:
+            busy_loop()
+        self.assertTrue(
+            any(stack.endswith("busy_loop") for stack in sampler.stacks),
+            sampler.folded(),
+        )
+
+
+class TracingTests(APITestCase):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username="teacher", is_teacher=True)
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=teacher
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+        for name in ("First", "Second"):
+            Module.objects.create(name=name, content="", course=cls.course)
+
+    def setUp(self):
+        settings = self.settings(TRACING={"ENABLED": True, "EXPORTER": "memory"})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(tracing.memory_exporter.clear)
+        self.client.force_authenticate(user=self.student)
+
+    def get_modules(self, flags):
+        return self.client.get(
+            f"/api/courses/{self.course.id}/modules/",
+            HTTP_TRACEPARENT=f"00-{self.trace_id}-00f067aa0ba902b7-{flags}",
+        )
+
+    def test_sampled_request_traced(self):
+        response = self.get_modules("01")
+        self.assertTrue(response["traceparent"].startswith(f"00-{self.trace_id}-"))
+        spans = tracing.memory_exporter.spans()
+        self.assertEqual({span["traceId"] for span in spans}, {self.trace_id})
+        (root,) = [span for span in spans if span["kind"] == tracing.SERVER]
+        self.assertEqual(root["name"], "GET api/courses/<int:course_id>/modules/")
+        self.assertEqual(root["parentSpanId"], "00f067aa0ba902b7")
+        self.assertEqual(response["traceparent"].split("-")[2], root["spanId"])
+        names = [span["name"] for span in spans]
+        self.assertIn("SELECT", names)
+        self.assertIn("serialize ModuleSerializer[]", names)
+        self.assertIn("render ORJSONRenderer", names)
+        ids = {span["spanId"] for span in spans}
+        self.assertTrue(all(span["parentSpanId"] in ids for span in spans[:-1]))
+
+    def test_unsampled_request_not_traced(self):
+        response = self.get_modules("00")
+        self.assertFalse(response.has_header("traceparent"))
+        self.assertEqual(tracing.memory_exporter.spans(), [])
+
+    def test_client_forced_traces_are_capped(self):
+        config = {"ENABLED": True, "EXPORTER": "memory", "FORCED_PER_SECOND": 1}
+        with self.settings(TRACING=config):
+            traced = [
+                self.get_modules("01").has_header("traceparent") for _ in range(3)
+            ]
+        self.assertEqual(traced, [True, False, False])
+
+    def test_file_exporter_rotates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "traces.jsonl"
+            exporter = tracing.FileExporter(str(path), max_bytes=100)
+            for i in range(3):
+                exporter.export({"n": "x" * 60, "i": i})
+            self.assertEqual(json.loads(path.read_text())["i"], 2)
+            rotated = Path(f"{path}.1").read_text().splitlines()
+            self.assertEqual([json.loads(line)["i"] for line in rotated], [0, 1])
+
+    def test_s3_calls_traced(self):
+        from module.aws import s3_client
+
+        trace = tracing.Trace(self.trace_id)
+        token = tracing._current.set(tracing.Span("job", trace))
+        try:
+            with Stubber(s3_client) as stubber:
+                stubber.add_response("head_bucket", {}, {"Bucket": "bucket"})
+                s3_client.head_bucket(Bucket="bucket")
+        finally:
+            tracing._current.reset(token)
+        (call,) = trace.spans
+        self.assertEqual(call.name, "S3.HeadBucket")
+        self.assertEqual(call.kind, tracing.CLIENT)
+        self.assertIsNone(call.error)
+
+
+class ServerStartupTests(APITestCase):
+    def advisory_locks(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' "
+                "AND objid = %s AND pid = pg_backend_pid()",
+                [migrate_once.MIGRATION_LOCK],
+            )
+            return cursor.fetchone()[0]
+
+    def test_nothing_to_migrate(self):
+        out = io.StringIO()
+        call_command("migrate_once", stdout=out)
+        self.assertIn("No migrations to apply", out.getvalue())
+
+    def test_waits_for_lock_and_rechecks(self):
+        plans = iter([["0002_pending"], []])
+        locked = []
+
+        def pending(connection):
+            locked.append(self.advisory_locks())
+            return next(plans)
+
+        out = io.StringIO()
+        with mock.patch.object(migrate_once, "pending_migrations", pending):
+            call_command("migrate_once", stdout=out)
+        self.assertIn("Migrated by another process", out.getvalue())
+        # The second look happens under the lock, which is then released.
+        self.assertEqual(locked, [0, 1])
+        self.assertEqual(self.advisory_locks(), 0)
+
+    def test_worker_count_follows_cgroup_quota(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertIsNone(server.cpu_quota(root))
+            (Path(root) / "cpu.max").write_text("max 100000\n")
+            self.assertIsNone(server.cpu_quota(root))
+            (Path(root) / "cpu.max").write_text("50000 100000\n")
+            self.assertEqual(server.cpu_quota(root), 0.5)
+            self.assertEqual(server.available_cpus(root), 1)
+        self.assertEqual(server.default_workers("wsgi", 2), 5)
+        self.assertEqual(server.default_workers("asgi", 2), 2)
+
+
+class ReplicaRoutingTests(APITestCase):
+    # "default" doubles as the replica: the router sends allowed reads to
+    # it and has no opinion (None) on the others.
+    config = {"ALIAS": "default", "STICKY_SECONDS": 5, "EXCLUDE": ["/admin/"]}
+
+    def serve(self, request, write=False):
+        seen = []
+
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Course))
+            if write:
+                router.db_for_write(Course)
+                seen.append(ReplicaRouter().db_for_read(Course))
+            return HttpResponse()
+
+        with self.settings(DATABASE_REPLICA=self.config):
+            response = ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_safe_requests_read_from_replica_until_they_write(self):
+        factory = RequestFactory()
+        self.assertEqual(self.serve(factory.get("/api/courses/"))[0], ["default"])
+        seen, _ = self.serve(factory.get("/api/courses/"), write=True)
+        self.assertEqual(seen, ["default", None])
+        self.assertEqual(self.serve(factory.get("/admin/"))[0], [None])
+        self.assertIsNone(ReplicaRouter().db_for_read(Course))
+
+    def test_writes_pin_client_to_primary(self):
+        factory = RequestFactory()
+        seen, response = self.serve(factory.post("/api/courses/"))
+        self.assertEqual(seen, [None])
+        until = response["X-Primary-Until"]
+        self.assertAlmostEqual(float(until), time.time() + 5, delta=1)
+        self.assertEqual(response.cookies["primary_until"].value, until)
+
+        pinned = factory.get("/api/courses/", headers={"X-Primary-Until": until})
+        self.assertEqual(self.serve(pinned)[0], [None])
+        factory.cookies["primary_until"] = until
+        self.assertEqual(self.serve(factory.get("/api/courses/"))[0], [None])
+        factory.cookies["primary_until"] = str(time.time() - 1)
+        self.assertEqual(self.serve(factory.get("/api/courses/"))[0], ["default"])
+
+    def test_disabled_without_replica_alias(self):
+        with self.settings(DATABASE_REPLICA={"ALIAS": "missing"}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaMiddleware(lambda request: HttpResponse())
+
+
+class FastJSONTests(APITestCase):
+    data = {
+        "score": Decimal("7.50"),
+        "submitted": datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "opened": datetime(2026, 3, 1, 12, 0),
+        "title": gettext_lazy("Quiz"),
+        "text": "zażółć\u2028gęślą\u2029jaźń",
+        "points": {1: 2.5, 2: None},
+    }
+
+    def test_renders_like_drf(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(fastjson.ORJSONRenderer().render(self.data), expected)
+        self.assertIn(b'"2026-03-01T12:30:15.123456Z"', expected)
+        self.assertIn(b"\\u2028", expected)
+        self.assertEqual(fastjson.ORJSONRenderer().render(None), b"")
+
+        indented = JSONRenderer().render(self.data, "application/json; indent=2")
+        self.assertEqual(
+            fastjson.ORJSONRenderer().render(self.data, "application/json; indent=2"),
+            indented,
+        )
+
+    def test_parses_like_drf(self):
+        body = '{"text": "zażółć", "ids": [1, 2.5, null]}'.encode()
+        parsed = fastjson.ORJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(parsed, JSONParser().parse(io.BytesIO(body)))
+        with self.assertRaises(ParseError):
+            fastjson.ORJSONParser().parse(io.BytesIO(b'{"text": '))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch("common.fastjson.orjson", None):
+            self.assertEqual(
+                fastjson.dumps(self.data), JSONRenderer().render(self.data)
+            )
+            self.assertEqual(fastjson.loads(b"[1]"), [1])
+            with self.assertRaises(ParseError):
+                fastjson.ORJSONParser().parse(io.BytesIO(b"{"))
+
+    def test_api_uses_orjson(self):
+        self.assertIs(api_settings.DEFAULT_PARSER_CLASSES[0], fastjson.ORJSONParser)
+        user = User.objects.create_user(
+            username="json", email="json@example.com", password="pass"
+        )
+        self.client.force_authenticate(user)
+        response = self.client.get("/api/courses/", HTTP_ACCEPT="application/json")
+        self.assertIsInstance(response.accepted_renderer, fastjson.ORJSONRenderer)
+
+
+class CompressionTests(APITestCase):
+    body = json.dumps([{"id": i, "title": f"Module {i}"} for i in range(200)])
+
+    def serve(self, request, response=None, view=None):
+        if view is not None:
+            request.resolver_match = ResolverMatch(view, (), {})
+        response = response or HttpResponse(self.body, content_type="application/json")
+        return compression.CompressionMiddleware(lambda request: response)(request)
+
+    def get(self, path="/api/modules/", encoding="gzip", **kwargs):
+        return RequestFactory().get(
+            path, headers={"Accept-Encoding": encoding}, **kwargs
+        )
+
+    def test_negotiates_best_accepted_encoding(self):
+        preference = ["zstd", "br", "gzip"]
+        self.assertEqual(compression.negotiate("gzip, br", preference), "br")
+        self.assertEqual(
+            compression.negotiate("gzip;q=1, br;q=0.5", preference), "gzip"
+        )
+        self.assertEqual(compression.negotiate("*", preference), "zstd")
+        self.assertEqual(compression.negotiate("br;q=0, *;q=0.1", ["br"]), None)
+        self.assertIsNone(compression.negotiate("identity", preference))
+        self.assertIsNone(compression.negotiate("", preference))
+
+    def test_compresses_large_json(self):
+        response = self.serve(self.get(encoding="gzip, deflate"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content).decode(), self.body)
+
+        small = HttpResponse('{"id": 1}', content_type="application/json")
+        self.assertFalse(self.serve(self.get(), small).has_header("Content-Encoding"))
+        image = HttpResponse(self.body, content_type="image/png")
+        self.assertFalse(self.serve(self.get(), image).has_header("Content-Encoding"))
+        plain = self.serve(self.get(encoding=""))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(plain["Vary"], "Accept-Encoding")
+
+    @skipUnless(compression.brotli and compression.zstandard, "brotli, zstandard")
+    def test_brotli_and_zstd(self):
+        response = self.serve(self.get(encoding="br"))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(
+            compression.brotli.decompress(response.content).decode(), self.body
+        )
+        response = self.serve(self.get(encoding="gzip, br, zstd"))
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        decompressor = compression.zstandard.ZstdDecompressor()
+        self.assertEqual(
+            decompressor.decompressobj().decompress(response.content).decode(),
+            self.body,
+        )
+
+    def test_streaming_responses(self):
+        chunks = [
+            self.body[i : i + 500].encode() for i in range(0, len(self.body), 500)
+        ]
+        response = self.serve(
+            self.get(), StreamingHttpResponse(chunks, content_type="application/json")
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response)).decode(), self.body)
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        async def read(response):
+            return b"".join([chunk async for chunk in response])
+
+        response = self.serve(
+            self.get(), StreamingHttpResponse(stream(), content_type="text/csv")
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(asyncio.run(read(response))).decode(), self.body
+        )
+
+    def test_skips_secrets_mixed_with_input(self):
+        view = compression.contains_secrets(lambda request: None)
+        request = RequestFactory().post(
+            "/accounts/token/",
+            {"email": "student@test.com"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        self.assertFalse(self.serve(request, view=view).has_header("Content-Encoding"))
+        response = self.serve(self.get("/accounts/token/"), view=view)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        request = self.get("/admin/?q=secret")
+        get_token(request)
+        self.assertFalse(self.serve(request).has_header("Content-Encoding"))
+        request = self.get("/admin/")
+        get_token(request)
+        self.assertEqual(self.serve(request)["Content-Encoding"], "gzip")
+
+    def test_route_opt_out(self):
+        view = compression.no_compression(lambda request: None)
+        self.assertFalse(
+            self.serve(self.get(), view=view).has_header("Content-Encoding")
+        )
+        with self.settings(COMPRESSION={"EXCLUDE": ["/api/modules/"]}):
+            self.assertFalse(self.serve(self.get()).has_header("Content-Encoding"))
+        with self.settings(COMPRESSION={"ENABLED": False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                compression.CompressionMiddleware(lambda request: HttpResponse())
+
+
+class OpenAPISchemaTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        overridden = self.settings(
+            OPENAPI_SCHEMA={"DIR": directory.name, "MAX_AGE": 60}
+        )
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.addCleanup(openapi._loaded.clear)
+
+    def test_served_from_generated_file(self):
+        out = io.StringIO()
+        call_command("generate_schema", stdout=out)
+        self.assertIn("swagger.yaml", out.getvalue())
+        body = (self.dir / "swagger.json").read_bytes()
+        schema = json.loads(body)
+        self.assertIn("/api/courses/", schema["paths"])
+        self.assertNotIn("host", schema)
+
+        with mock.patch.object(openapi, "generate") as generate:
+            response = self.client.get("/swagger.json")
+            yaml = self.client.get("/swagger.yaml")
+        generate.assert_not_called()
+        self.assertEqual(response.content, body)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertEqual(yaml["Content-Type"], "application/yaml")
+
+        etag = response["ETag"]
+        cached = self.client.get("/swagger.json", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A regenerated file replaces the one workers have read.
+        path = self.dir / "swagger.json"
+        path.write_bytes(body.replace(b"API documentation", b"API docs"))
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        fresh = self.client.get("/swagger.json", headers={"If-None-Match": etag})
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertIn(b"API docs", fresh.content)
+
+    def test_generated_on_first_fetch_when_missing(self):
+        response = self.client.get("/swagger.json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue((self.dir / "swagger.json").exists())
+
+    def test_ui_loads_the_file(self):
+        response = self.client.get("/swagger/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"/swagger.json", response.content)
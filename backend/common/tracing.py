@@ -0,0 +1,400 @@
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from .middleware import query_wrapper, request_user
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+MAX_STATEMENT_CHARS = 1000
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        # int64 is a string in the protobuf JSON mapping
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+
+
+class Span:
+    def __init__(self, name, trace, parent_id=None, kind=INTERNAL, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.error = error or self.error
+        self.trace.spans.append(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+def current_span():
+    return _current.get()
+
+
+def start_span(name, kind=INTERNAL, **attributes):
+    """
+    Child of the current span that the caller has to `end()`; it does not
+    become the current span. None outside of a sampled trace.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(name, parent.trace, parent.span_id, kind, attributes)
+
+
+@contextmanager
+def span(name, kind=INTERNAL, **attributes):
+    """Time the block as a child of the current span, if there is one."""
+    child = start_span(name, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def otlp_payload(trace, service_name):
+    """A trace as an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", service_name)]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [span.to_otlp() for span in trace.spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class InMemoryExporter:
+    def __init__(self):
+        self.payloads = []
+
+    def export(self, payload):
+        self.payloads.append(payload)
+
+    def spans(self):
+        return [
+            span
+            for payload in self.payloads
+            for resource in payload["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+    def clear(self):
+        self.payloads.clear()
+
+
+class FileExporter:
+    """
+    One OTLP/JSON request per line, the layout read by the OpenTelemetry
+    Collector's otlpjsonfile receiver.
+
+    Once the file passes `max_bytes` it is renamed to PATH.1, replacing the
+    previous one, and a new file is started; the other processes writing
+    to it notice the rename and follow.
+    """
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, payload):
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is not None and self.max_bytes and self._rotated():
+                self._file.close()
+                self._file = None
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+            self._file.write(line)
+
+    def _rotated(self):
+        """Whether the open file was, or now is, rotated away."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        if not os.path.samestat(current, os.fstat(self._file.fileno())):
+            return True
+        if current.st_size < self.max_bytes:
+            return False
+        os.replace(self.path, f"{self.path}.1")
+        return True
+
+
+memory_exporter = InMemoryExporter()
+
+
+def _sql_span(execute, sql, params, many, context):
+    operation = sql.split(None, 1)[0].upper() if sql else "SQL"
+    with span(
+        operation,
+        CLIENT,
+        **{
+            "db.system": "postgresql",
+            "db.name": context["connection"].alias,
+            "db.statement": sql[:MAX_STATEMENT_CHARS],
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+def instrument_boto3(session):
+    """Span for every S3 API call of clients created from `session` afterwards."""
+
+    def before_call(model, context, **kwargs):
+        context["tracing_span"] = start_span(
+            f"S3.{model.name}",
+            CLIENT,
+            **{"rpc.system": "aws-api", "rpc.service": "S3", "rpc.method": model.name},
+        )
+
+    def after_call(context, http_response=None, exception=None, **kwargs):
+        call = context.pop("tracing_span", None)
+        if call is None:
+            return
+        if exception is not None:
+            call.end(f"{type(exception).__name__}: {exception}")
+            return
+        call.set_attribute("http.response.status_code", http_response.status_code)
+        call.end(
+            f"HTTP {http_response.status_code}"
+            if http_response.status_code >= 400
+            else None
+        )
+
+    session.events.register("before-parameter-build.s3", before_call)
+    session.events.register("after-call.s3", after_call)
+    session.events.register("after-call-error.s3", after_call)
+
+
+_installed = False
+
+
+def install_drf_spans():
+    """Spans for top-level serializer `.data` and response rendering."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    serializer_data = BaseSerializer.data.fget
+    rendered_content = Response.rendered_content.fget
+
+    def data(self):
+        # Nested serializers use to_representation, so only the outermost
+        # one gets a span; cached data does not.
+        if hasattr(self, "_data"):
+            return serializer_data(self)
+        name = type(self).__name__
+        if getattr(self, "many", False):
+            name = f"{type(self.child).__name__}[]"
+        with span(f"serialize {name}", **{"drf.serializer": name}):
+            return serializer_data(self)
+
+    def render(self):
+        renderer = type(getattr(self, "accepted_renderer", None)).__name__
+        with span(f"render {renderer}", **{"drf.renderer": renderer}):
+            return rendered_content(self)
+
+    BaseSerializer.data = property(data)
+    Response.rendered_content = property(render)
+
+
+class RateLimit:
+    """Token bucket: `rate` events a second on average, bursts up to one second's."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self.updated = now - self.updated, now
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class TracingMiddleware:
+    """
+    Traces sampled requests: a server span per request, child spans for
+    every SQL statement, S3 call, serializer and response rendering.
+
+    A W3C `traceparent` header continues the caller's trace, and its
+    sampled flag forces a trace up to FORCED_PER_SECOND times a second per
+    process; other requests are sampled at SAMPLE_RATE. The
+    trace id is echoed in the response `traceparent`. Finished traces go to
+    the configured EXPORTER as OTLP/JSON. Configured by settings.TRACING;
+    removed from the stack when disabled.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "TRACING", {})
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = config.get("SAMPLE_RATE", 0.0)
+        # any client can send a sampled traceparent
+        self.forced = RateLimit(config.get("FORCED_PER_SECOND", 1.0))
+        self.service_name = config.get("SERVICE_NAME", "backend")
+        exporter = config.get("EXPORTER", "file")
+        if exporter == "memory":
+            self.exporter = memory_exporter
+        else:
+            self.exporter = FileExporter(config["PATH"], config.get("MAX_BYTES"))
+        install_drf_spans()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trace, root = self._start(request)
+        if trace is None:
+            return self.get_response(request)
+        with self._recording(trace, root):
+            response = self.get_response(request)
+        return self._finish(request, response, trace, root)
+
+    async def __acall__(self, request):
+        trace, root = self._start(request)
+        if trace is None:
+            return await self.get_response(request)
+        with self._recording(trace, root):
+            response = await self.get_response(request)
+        return self._finish(request, response, trace, root)
+
+    def _start(self, request):
+        incoming = TRACEPARENT.match(request.headers.get("traceparent", ""))
+        if incoming:
+            trace_id, parent_id, flags = incoming.groups()
+            sampled = int(flags, 16) & 1 and self.forced.allow()
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = False
+        if not sampled:
+            sampled = self.sample_rate and random.random() < self.sample_rate
+        if not sampled:
+            return None, None
+        trace = Trace(trace_id)
+        root = Span(
+            request.method,
+            trace,
+            parent_id,
+            SERVER,
+            {"http.request.method": request.method, "url.path": request.path},
+        )
+        return trace, root
+
+    @contextmanager
+    def _recording(self, trace, root):
+        token = _current.set(root)
+        try:
+            with query_wrapper(_sql_span):
+                yield
+        except Exception as e:
+            root.end(f"{type(e).__name__}: {e}")
+            self.exporter.export(otlp_payload(trace, self.service_name))
+            raise
+        finally:
+            _current.reset(token)
+
+    def _finish(self, request, response, trace, root):
+        match = request.resolver_match
+        if match:
+            root.name = f"{request.method} {match.route}"
+            root.set_attribute("http.route", match.route)
+            root.set_attribute("code.function", match._func_path)
+        user = request_user(request)
+        if user is not None and user.is_authenticated:
+            root.set_attribute("enduser.id", str(user.pk))
+        root.set_attribute("http.response.status_code", response.status_code)
+        root.end(
+            f"HTTP {response.status_code}" if response.status_code >= 500 else None
+        )
+        self.exporter.export(otlp_payload(trace, self.service_name))
+        response["traceparent"] = f"00-{trace.trace_id}-{root.span_id}-01"
+        return response
@@ -0,0 +1,215 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import request_user
+from .stats import latency_summary
+
+REDACTED = "***"
+SENSITIVE_KEYS = {
+    "password",
+    "token",
+    "access",
+    "refresh",
+    "code",
+    "validation_code",
+    "secret",
+    # personal data; usernames are email addresses
+    "username",
+    "email",
+    "name",
+    "surname",
+    "first_name",
+    "last_name",
+    # student search by name or email
+    "search",
+}
+MAX_BODY_BYTES = 64 * 1024
+
+
+def user_role(user):
+    if not user or not user.is_authenticated:
+        return "anonymous"
+    if user.is_staff:
+        return "staff"
+    if getattr(user, "is_teacher", False):
+        return "teacher"
+    return "student"
+
+
+def _sanitize(value):
+    """
+    Return (copy of a decoded JSON value with secrets and personal data
+    redacted, redacted?).
+    """
+    if isinstance(value, dict):
+        clean, redacted = {}, False
+        for key, item in value.items():
+            if key.lower() in SENSITIVE_KEYS:
+                clean[key], redacted = REDACTED, True
+            else:
+                clean[key], item_redacted = _sanitize(item)
+                redacted = redacted or item_redacted
+        return clean, redacted
+    if isinstance(value, list):
+        items = [_sanitize(item) for item in value]
+        return [item for item, _ in items], any(flag for _, flag in items)
+    return value, False
+
+
+class TrafficCaptureMiddleware:
+    """
+    Opt-in recorder of sanitized request traces, one JSON object per line:
+    time, method, URL route and concrete path, query parameters, JSON body,
+    user role and id, response status and duration.
+
+    Credentials and personal data in parameters or bodies are replaced by
+    "***" and the entry is flagged `redacted`. Configured by settings.TRAFFIC_CAPTURE; removed
+    from the stack when disabled.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "TRAFFIC_CAPTURE", {})
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.sample_rate = config.get("SAMPLE_RATE", 1.0)
+        self.exclude = tuple(config.get("EXCLUDE", ()))
+        self.path = config["PATH"]
+        self._lock = threading.Lock()
+        # Line buffered: every trace is a single append, so workers sharing
+        # the file do not interleave partial lines.
+        self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._skip(request):
+            return self.get_response(request)
+        body, ts, started = self._body(request), time.time(), time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, body, ts, started)
+        return response
+
+    async def __acall__(self, request):
+        if self._skip(request):
+            return await self.get_response(request)
+        body, ts, started = self._body(request), time.time(), time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, body, ts, started)
+        return response
+
+    def _skip(self, request):
+        return request.path.startswith(self.exclude) or (
+            self.sample_rate < 1 and random.random() >= self.sample_rate
+        )
+
+    def _record(self, request, response, body, ts, started):
+        duration = (time.perf_counter() - started) * 1000
+        query, query_redacted = _sanitize(
+            {key: request.GET.getlist(key) for key in request.GET}
+        )
+        body, body_redacted = _sanitize(body)
+        match = request.resolver_match
+        user = request_user(request)
+        trace = {
+            "ts": round(ts, 3),
+            "method": request.method,
+            "route": match.route if match else None,
+            "path": request.path,
+            "query": query,
+            "body": body,
+            "role": user_role(user),
+            "user_id": user.pk if user and user.is_authenticated else None,
+            "status": response.status_code,
+            "duration_ms": round(duration, 2),
+            "redacted": query_redacted or body_redacted,
+            "pid": os.getpid(),
+        }
+        line = json.dumps(trace, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def _body(self, request):
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return None
+        if request.content_type != "application/json":
+            return None
+        if int(request.META.get("CONTENT_LENGTH") or 0) > MAX_BODY_BYTES:
+            return None
+        try:
+            return json.loads(request.body or b"null")
+        except ValueError:
+            return None
+
+
+def load_capture(lines):
+    """Parse a capture, sorted by time; blank or broken lines are skipped."""
+    traces = []
+    for line in lines:
+        try:
+            traces.append(json.loads(line))
+        except ValueError:
+            continue
+    return sorted(traces, key=lambda trace: trace["ts"])
+
+
+def replay(traces, send, concurrency=8, speed=1.0, clock=time.monotonic):
+    """
+    Re-issue `traces` with their original spacing divided by `speed`
+    (0 sends everything at once), at most `concurrency` at a time.
+
+    `send(trace)` performs one request and returns its status code.
+    Returns a report with latency distributions per route.
+    """
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+
+    def run(trace):
+        started = clock()
+        try:
+            status = send(trace)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = (clock() - started) * 1000
+        key = f"{trace['method']} {trace.get('route') or trace['path']}"
+        with lock:
+            samples[key].append(elapsed)
+            statuses[key][str(status)] += 1
+
+    first = traces[0]["ts"] if traces else 0
+    started = clock()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for trace in traces:
+            if speed:
+                delay = (trace["ts"] - first) / speed - (clock() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, trace)
+    wall = clock() - started
+
+    routes = {
+        key: {"count": len(timings), "status": dict(statuses[key])}
+        | latency_summary(timings)
+        for key, timings in sorted(samples.items())
+    }
+    all_timings = [elapsed for timings in samples.values() for elapsed in timings]
+    return {
+        "requests": len(all_timings),
+        "wall_s": round(wall, 2),
+        "overall": latency_summary(all_timings) if all_timings else {},
+        "routes": routes,
+    }
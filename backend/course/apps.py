@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CourseConfig(AppConfig):
     name = "course"
+
+    def ready(self):
+        from common.middleware import install_query_wrappers
+
+        # SQL instrumentation and tracing see the queries of every thread
+        install_query_wrappers()
+
+        # re-indexes courses and modules for search as they are saved
+        from . import search  # noqa: F401
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from user.mail import validation_email
+from user.models import OutgoingEmail, User
+
+from .models import CourseProgress
+
+ROSTER_FIELDS = ("email", "name", "surname", "password")
+
+CREATED = "created"
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already_enrolled"
+ERROR = "error"
+
+
+def read_roster(content, fmt):
+    """
+    Parse a CSV (with a header row) or JSON roster into a list of dicts
+    restricted to ROSTER_FIELDS. JSON may be a list of objects or an object
+    with a "students" list.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if fmt == "json":
+        data = json.loads(content)
+        rows = data.get("students", []) if isinstance(data, dict) else data
+    elif fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(content)))
+    else:
+        raise ValueError(f"Unsupported roster format: {fmt}")
+    return clean_roster(rows)
+
+
+def clean_roster(rows):
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Expected a list of student objects.")
+    return [
+        {field: str(row.get(field) or "").strip() for field in ROSTER_FIELDS}
+        for row in rows
+    ]
+
+
+def _hash_passwords(passwords):
+    # PBKDF2 runs in OpenSSL with the GIL released, so threads scale here.
+    workers = min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, passwords))
+
+
+def _validate_row(row):
+    try:
+        validate_email(row["email"])
+    except ValidationError:
+        return "Invalid email."
+    for field in ("name", "surname"):
+        if len(row[field]) > User._meta.get_field(field).max_length:
+            return f"Field '{field}' is too long."
+    return None
+
+
+@transaction.atomic
+def bulk_enroll(course, rows):
+    """
+    Create missing student accounts and enroll every valid roster row in
+    `course` with a fixed number of queries, whatever the roster size.
+
+    New accounts are inactive and get a validation mail queued, same as
+    self-registration; existing accounts must be active. Returns one report
+    entry per input row.
+    """
+    report = [{"row": i, "email": row["email"]} for i, row in enumerate(rows, 1)]
+    emails = {}
+    for entry, row in zip(report, rows):
+        error = _validate_row(row)
+        if error is None and row["email"] in emails:
+            error = "Duplicate email in roster."
+        if error:
+            entry.update(status=ERROR, detail=error)
+        else:
+            emails[row["email"]] = (entry, row)
+
+    existing = {
+        user.email: user
+        for user in User.objects.filter(email__in=list(emails)).only(
+            "id", "email", "is_active", "is_staff", "is_teacher"
+        )
+    }
+
+    new_rows = []
+    for email, (entry, row) in emails.items():
+        user = existing.get(email)
+        if user is None:
+            if not row["password"]:
+                entry.update(status=ERROR, detail="Password required for new user.")
+            else:
+                new_rows.append((entry, row))
+        elif user.is_staff or user.is_teacher:
+            entry.update(status=ERROR, detail="User is not a student.")
+        elif not user.is_active:
+            # same rule as enrolling a single student
+            entry.update(status=ERROR, detail="User is not active.")
+
+    new_users = [
+        User(
+            username=row["email"],
+            email=row["email"],
+            password=password,
+            name=row["name"],
+            surname=row["surname"],
+            is_active=False,
+            validation_code=secrets.token_hex(32),
+        )
+        for (_, row), password in zip(
+            new_rows, _hash_passwords([row["password"] for _, row in new_rows])
+        )
+    ]
+    User.objects.bulk_create(new_users)
+    OutgoingEmail.objects.bulk_create([validation_email(user) for user in new_users])
+    for (entry, _), user in zip(new_rows, new_users):
+        entry["status"] = CREATED
+        existing[user.email] = user
+
+    students = {
+        email: existing[email]
+        for email, (entry, _) in emails.items()
+        if entry.get("status") != ERROR
+    }
+    enrolled_ids = set(
+        CourseProgress.objects.filter(
+            course=course, user_id__in=[user.id for user in students.values()]
+        ).values_list("user_id", flat=True)
+    )
+    CourseProgress.objects.bulk_create(
+        [
+            CourseProgress(user=user, course=course, percent_complete=0.0)
+            for user in students.values()
+            if user.id not in enrolled_ids
+        ],
+        ignore_conflicts=True,
+    )
+    for email, user in students.items():
+        entry = emails[email][0]
+        if user.id in enrolled_ids:
+            entry["status"] = ALREADY_ENROLLED
+        elif "status" not in entry:
+            entry["status"] = ENROLLED
+    return report
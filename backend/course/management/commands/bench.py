@@ -0,0 +1,178 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.stats import latency_summary
+from course.models import Course
+from quiz.attempts import reopen
+from quiz.scoring import quiz_question_ids
+
+# name -> (role, method, url template)
+ENDPOINTS = {
+    "course-list": ("student", "get", "/api/courses/"),
+    "course-detail": ("student", "get", "/api/courses/{course}"),
+    "module-list": ("student", "get", "/api/courses/{course}/modules/"),
+    "quiz-list": ("student", "get", "/api/quizzes/?course_id={course}"),
+    # as the teacher: a student fetching them starts an attempt
+    "quiz-questions": ("teacher", "get", "/api/quizzes/{quiz}/questions/"),
+    "quiz-review": ("student", "get", "/api/quizzes/{quiz}/review/"),
+    "quiz-submissions": ("teacher", "get", "/api/quizzes/{quiz}/submissions/"),
+    "quiz-student-submission": (
+        "teacher",
+        "get",
+        "/api/quizzes/{quiz}/submissions/{student}/",
+    ),
+    "enrolled-students": ("teacher", "get", "/api/courses/{course}/enrolled-students/"),
+    "eligible-students": ("teacher", "get", "/api/courses/{course}/eligible-students/"),
+}
+# change the data the other endpoints read; only run with --include-writes
+WRITE_ENDPOINTS = {
+    "quiz-attempt": ("student", "get", "/api/quizzes/{quiz}/questions/"),
+    "quiz-submit": ("student", "post", "/api/quizzes/{quiz}/submit/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives the key API endpoints through the Django test client and prints "
+        "p50/p95/p99 latency, queries and allocations per request as JSON. "
+        "Read-only unless --include-writes is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            help="Course to benchmark against; the newest one by default.",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=sorted({**ENDPOINTS, **WRITE_ENDPOINTS}),
+            help="Benchmark only these endpoints.",
+        )
+        parser.add_argument(
+            "--include-writes",
+            action="store_true",
+            help="Also benchmark endpoints that write: starting and submitting "
+            "the student's quiz attempt.",
+        )
+        parser.add_argument(
+            "--output", type=Path, help="Also write the report to this file."
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        endpoints = dict(ENDPOINTS)
+        if options["include_writes"]:
+            endpoints.update(WRITE_ENDPOINTS)
+        names = options["only"] or list(endpoints)
+        writes = sorted(set(names) - set(endpoints))
+        if writes:
+            raise CommandError(f"{', '.join(writes)} write; pass --include-writes")
+        courses = Course.objects.select_related("instructor").order_by("-id")
+        course = (
+            courses.filter(id=options["course"]).first()
+            if options["course"]
+            else courses.first()
+        )
+        if course is None:
+            raise CommandError("No course to benchmark; run seed_perf_data first")
+        # review answers 403 for quizzes that do not show answers
+        quiz = course.quiz_set.order_by(
+            "-show_correct_answers_on_completion", "id"
+        ).first()
+        enrollment = course.courseprogress_set.select_related("user").order_by("id")
+        if quiz is None or not enrollment.exists():
+            raise CommandError(f"Course {course.id} needs a quiz and a student")
+        student = enrollment.first().user
+        submit_body = json.dumps(
+            {
+                "responses": [
+                    {"question_id": question_id, "answer": 1}
+                    for question_id in quiz_question_ids(quiz).values_list(
+                        "id", flat=True
+                    )
+                ]
+            }
+        )
+
+        clients = {
+            role: Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+            for role, user in (("student", student), ("teacher", course.instructor))
+        }
+        ids = {"course": course.id, "quiz": quiz.id, "student": student.id}
+        report = {
+            "course": course.id,
+            "quiz": quiz.id,
+            "iterations": options["iterations"],
+            "endpoints": {},
+        }
+        for name in names:
+            role, method, url = endpoints[name]
+            client, url = clients[role], url.format(**ids)
+
+            def request():
+                if method == "post":
+                    return client.post(
+                        url, submit_body, content_type="application/json"
+                    )
+                return client.get(url)
+
+            # a sealed attempt refuses another submit
+            prepare = (lambda: reopen(student, quiz)) if name == "quiz-submit" else None
+            report["endpoints"][name] = self.measure(request, options, prepare)
+            self.stderr.write(f"{name}: p50 {report['endpoints'][name]['p50_ms']} ms")
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            options["output"].write_text(output)
+
+    def measure(self, request, options, prepare=None):
+        """Times `request`, calling `prepare` (untimed) before each one."""
+        prepare = prepare or (lambda: None)
+        for _ in range(options["warmup"]):
+            prepare()
+            request()
+
+        timings, queries, statuses = [], [], set()
+        for _ in range(options["iterations"]):
+            prepare()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+
+        # Tracing slows every allocation down, so it gets a pass of its own.
+        allocations = []
+        tracemalloc.start()
+        try:
+            for _ in range(min(options["iterations"], 10)):
+                prepare()
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                request()
+                allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "status": sorted(statuses),
+            **latency_summary(timings),
+            "queries": max(queries),
+            "peak_alloc_kib": round(statistics.median(allocations) / 1024, 1),
+        }
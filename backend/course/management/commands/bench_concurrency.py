@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.stats import latency_summary
+from quiz.models import Quiz
+from quiz.scoring import quiz_question_ids
+
+# variant -> URL prefix of the quiz-taking endpoints
+VARIANTS = {"sync": "/api/quizzes", "async": "/api/async/quizzes"}
+ACTIONS = ("questions", "submit", "review")
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers the quiz-taking endpoints of a running instance with many "
+        "concurrent students and prints throughput and latency per endpoint "
+        "as JSON. Run it against the WSGI server and against "
+        "`uvicorn backend.asgi:application` to compare the sync views with "
+        "the async ones (/api/async/quizzes/) under load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument(
+            "--quiz", type=int, help="Quiz to take; the newest one by default."
+        )
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument(
+            "--requests", type=int, default=1000, help="Per endpoint and variant."
+        )
+        parser.add_argument("--variant", choices=[*VARIANTS, "both"], default="both")
+        parser.add_argument("--only", nargs="+", choices=ACTIONS)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument(
+            "--output", type=Path, help="Also write the report to this file."
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1")
+        quizzes = Quiz.objects.order_by("-id")
+        if options["quiz"]:
+            quizzes = quizzes.filter(id=options["quiz"])
+        quiz = quizzes.first()
+        if quiz is None:
+            raise CommandError("No quiz to benchmark; run seed_perf_data first")
+        students = [
+            progress.user
+            for progress in quiz.course.courseprogress_set.select_related("user")
+        ]
+        if not students:
+            raise CommandError(f"Nobody is enrolled in the course of quiz {quiz.id}")
+        # Review needs a finished quiz that allows it; keep the run repeatable.
+        if not quiz.show_correct_answers_on_completion:
+            quiz.show_correct_answers_on_completion = True
+            quiz.save(update_fields=["show_correct_answers_on_completion"])
+        submit_body = json.dumps(
+            {
+                "responses": [
+                    {"question_id": question_id, "answer": 1}
+                    for question_id in quiz_question_ids(quiz).values_list(
+                        "id", flat=True
+                    )
+                ]
+            }
+        ).encode()
+        # Spread the load over every enrolled student, as in a real exam.
+        tokens = [str(AccessToken.for_user(student)) for student in students]
+
+        base_url = options["base_url"].rstrip("/")
+        variants = (
+            list(VARIANTS) if options["variant"] == "both" else [options["variant"]]
+        )
+        report = {
+            "base_url": base_url,
+            "quiz": quiz.id,
+            "students": len(students),
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+            "endpoints": {},
+        }
+        # In ACTIONS order: review answers 403 until a student has submitted.
+        for action in options["only"] or ACTIONS:
+            for variant in variants:
+                url = f"{base_url}{VARIANTS[variant]}/{quiz.id}/{action}/"
+                body = submit_body if action == "submit" else None
+                name = f"{variant}-{action}"
+                report["endpoints"][name] = self.load(url, body, tokens, options)
+                result = report["endpoints"][name]
+                self.stderr.write(
+                    f"{name}: {result['throughput_rps']} req/s, "
+                    f"p99 {result.get('p99_ms')} ms, errors {result['errors']}"
+                )
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            options["output"].write_text(output)
+
+    def load(self, url, body, tokens, options):
+        counter = iter(range(options["requests"]))
+        lock = threading.Lock()
+
+        def send(i):
+            request = urllib.request.Request(
+                url,
+                data=body,
+                headers={
+                    "Authorization": f"Bearer {tokens[i % len(tokens)]}",
+                    "Content-Type": "application/json",
+                },
+                method="POST" if body is not None else "GET",
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as r:
+                    r.read()
+                    status = r.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except (urllib.error.URLError, OSError):
+                status = None
+            return status, (time.perf_counter() - started) * 1000
+
+        def worker():
+            results = []
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return results
+                results.append(send(i))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            futures = [pool.submit(worker) for _ in range(options["concurrency"])]
+            results = [result for future in futures for result in future.result()]
+        elapsed = time.perf_counter() - started
+
+        timings = [ms for status, ms in results if status is not None]
+        statuses = {}
+        for status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "status": statuses,
+            "errors": sum(
+                count
+                for status, count in statuses.items()
+                if status == "None" or int(status) >= 500
+            ),
+            "throughput_rps": round(len(results) / elapsed, 1),
+            **(latency_summary(timings) if timings else {}),
+        }
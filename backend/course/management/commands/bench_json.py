@@ -0,0 +1,138 @@
+import io
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common import fastjson
+from common.fastjson import ORJSONParser, ORJSONRenderer
+from questionresponse.models import QuestionResponse
+from quiz.models import Quiz
+from quiz.scoring import quiz_questions, quiz_submissions, review_data
+from user.models import User
+
+BACKENDS = {
+    "stdlib": (JSONRenderer, JSONParser),
+    "orjson": (ORJSONRenderer, ORJSONParser),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Times DRF's JSON renderer and parser against the orjson ones "
+        "(common/fastjson.py) on real payloads: a student's quiz review and "
+        "a gradebook page of quiz submissions. Prints throughput per payload "
+        "and backend as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quiz", type=int, help="Quiz to build payloads from; the newest one."
+        )
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Rows in the submissions payload, like ?page_size=.",
+        )
+        parser.add_argument(
+            "--output", type=Path, help="Also write the report to this file."
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        quizzes = Quiz.objects.order_by("-id")
+        if options["quiz"]:
+            quizzes = quizzes.filter(id=options["quiz"])
+        quiz = quizzes.first()
+        if quiz is None:
+            raise CommandError("No quiz to benchmark; run seed_perf_data first")
+        rows = list(quiz_submissions(quiz).order_by("user_id")[: options["page_size"]])
+        if not rows:
+            raise CommandError(f"Nobody has answered quiz {quiz.id}")
+        student = User.objects.get(id=rows[0]["user_id"])
+
+        questions = list(quiz_questions(quiz))
+        responses = QuestionResponse.objects.filter(
+            user=student, question__in=questions
+        )
+        payloads = {
+            "review": review_data(
+                quiz, student, questions, {r.question_id: r for r in responses}
+            ),
+            # what QuizViewSet.submissions returns for one page
+            "submissions": {
+                "count": len(rows),
+                "next": None,
+                "previous": None,
+                "results": [
+                    {
+                        "user_id": row["user_id"],
+                        "name": f"{row['user__name']} {row['user__surname']}",
+                        "email": row["user__email"],
+                        "answered": row["answered"],
+                        "score": row["score"],
+                        "last_activity": row["last_activity"],
+                    }
+                    for row in rows
+                ],
+            },
+        }
+
+        backends = dict(BACKENDS) if fastjson.orjson else {"stdlib": BACKENDS["stdlib"]}
+        if not fastjson.orjson:
+            self.stderr.write("orjson is not installed; timing the stdlib only")
+        report = {"quiz": quiz.id, "iterations": options["iterations"], "payloads": {}}
+        for name, data in payloads.items():
+            results = {}
+            for backend, (renderer_class, parser_class) in backends.items():
+                results[backend] = self.measure(
+                    renderer_class(), parser_class(), data, options["iterations"]
+                )
+            if "orjson" in results:
+                results["render_speedup"] = round(
+                    results["orjson"]["render_per_s"]
+                    / results["stdlib"]["render_per_s"],
+                    2,
+                )
+                results["parse_speedup"] = round(
+                    results["orjson"]["parse_per_s"] / results["stdlib"]["parse_per_s"],
+                    2,
+                )
+            report["payloads"][name] = results
+            self.stderr.write(
+                f"{name}: {results['stdlib']['bytes']} bytes, render speedup "
+                f"{results.get('render_speedup')}, parse speedup "
+                f"{results.get('parse_speedup')}"
+            )
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            options["output"].write_text(output)
+
+    def measure(self, renderer, parser, data, iterations):
+        body = renderer.render(data)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(data)
+        render_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parser.parse(io.BytesIO(body))
+        parse_seconds = time.perf_counter() - started
+
+        return {
+            "bytes": len(body),
+            "render_per_s": round(iterations / render_seconds, 1),
+            "render_mb_per_s": round(len(body) * iterations / render_seconds / 1e6, 1),
+            "parse_per_s": round(iterations / parse_seconds, 1),
+            "parse_mb_per_s": round(len(body) * iterations / parse_seconds / 1e6, 1),
+        }
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.enrollment import ERROR, bulk_enroll, read_roster
+from course.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Enrolls a CSV/JSON roster (email, name, surname, password) in a course, "
+        "creating missing student accounts. Prints a per-row JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("course_id", type=int)
+        parser.add_argument("roster", type=Path)
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="Roster format; guessed from the file extension by default.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(id=options["course_id"])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course_id']} does not exist")
+
+        path = options["roster"]
+        fmt = options["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+        try:
+            rows = read_roster(path.read_bytes(), fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read roster: {e}")
+
+        report = bulk_enroll(course, rows)
+        self.stdout.write(json.dumps(report, indent=2))
+        errors = sum(entry["status"] == ERROR for entry in report)
+        self.stderr.write(f"{len(report) - errors} rows enrolled, {errors} errors")
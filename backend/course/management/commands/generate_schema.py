@@ -0,0 +1,28 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from common import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the OpenAPI schema served at /swagger.json and /swagger.yaml "
+        "(common/openapi.py). Run at image build and whenever the API "
+        "changes; running workers pick the new files up on their next fetch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir",
+            type=Path,
+            help="Where to write the files; OPENAPI_SCHEMA['DIR'] by default.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        paths = openapi.generate(options["output_dir"])
+        for path in paths:
+            self.stdout.write(f"Wrote {path} ({path.stat().st_size} bytes)")
+        self.stdout.write(f"Generated in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Application-wide key of the Postgres advisory lock ("mgr8")
+MIGRATION_LOCK = 0x6D677238
+
+
+def pending_migrations(connection):
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies pending migrations, one process at a time: every container "
+        "runs it on start, the first one migrates behind a Postgres advisory "
+        "lock and the others wait for it, then find nothing left to do."
+    )
+    # migrate runs the checks itself, and only when there is work to do.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        database = options["database"]
+        connection = connections[database]
+        migrate = {
+            "database": database,
+            "interactive": False,
+            "verbosity": options["verbosity"],
+        }
+
+        if not pending_migrations(connection):
+            self.report("No migrations to apply", started)
+            return
+        if connection.vendor != "postgresql":
+            call_command("migrate", **migrate)
+            self.report("Migrated", started)
+            return
+
+        # The lock belongs to this session, which migrate then uses too.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [MIGRATION_LOCK])
+            try:
+                # Whoever held the lock before us may have applied them all.
+                if pending_migrations(connection):
+                    call_command("migrate", **migrate)
+                    self.report("Migrated", started)
+                else:
+                    self.report("Migrated by another process", started)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [MIGRATION_LOCK])
+
+    def report(self, message, started):
+        self.stdout.write(f"{message} in {time.perf_counter() - started:.2f}s")
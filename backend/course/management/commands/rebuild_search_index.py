@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from course import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-indexes every course and module for search (course/search.py): "
+        "after changing SEARCH['CONFIGS'] or installing a Polish dictionary, "
+        "or after rows were written without save(), e.g. by bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        courses, modules = search.rebuild(options["batch_size"])
+        self.stdout.write(f"Indexed {courses} courses and {modules} modules")
@@ -0,0 +1,110 @@
+import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.traffic import load_capture, replay
+from user.models import User
+
+ROLE_FILTERS = {
+    "student": {"is_staff": False, "is_teacher": False},
+    "teacher": {"is_staff": False, "is_teacher": True},
+    "staff": {"is_staff": True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a traffic capture (see TRAFFIC_CAPTURE) against a running "
+        "instance and prints per-route latency distributions as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture", type=Path)
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=1.0,
+            help="Time compression: 10 replays ten times faster, 0 as fast as possible.",
+        )
+        parser.add_argument("--limit", type=int, help="Replay only the first N.")
+        parser.add_argument(
+            "--include-redacted",
+            action="store_true",
+            help="Also send requests whose credentials were redacted.",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument(
+            "--output", type=Path, help="Also write the report to this file."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with options["capture"].open(encoding="utf-8") as f:
+                traces = load_capture(f)
+        except OSError as e:
+            raise CommandError(f"Cannot read capture: {e}")
+        skipped = 0
+        if not options["include_redacted"]:
+            kept = [trace for trace in traces if not trace.get("redacted")]
+            skipped, traces = len(traces) - len(kept), kept
+        traces = traces[: options["limit"]]
+
+        tokens = self.tokens_for(traces)
+        base_url = options["base_url"].rstrip("/")
+
+        def send(trace):
+            url = base_url + trace["path"]
+            if trace.get("query"):
+                url += "?" + urlencode(trace["query"], doseq=True)
+            headers = {}
+            token = tokens.get(trace.get("user_id")) or tokens.get(trace["role"])
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            data = None
+            if trace.get("body") is not None:
+                data = json.dumps(trace["body"]).encode()
+                headers["Content-Type"] = "application/json"
+            request = urllib.request.Request(
+                url, data=data, headers=headers, method=trace["method"]
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as r:
+                    r.read()
+                    return r.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        report = replay(
+            traces, send, concurrency=options["concurrency"], speed=options["speed"]
+        )
+        report["skipped_redacted"] = skipped
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            options["output"].write_text(output)
+
+    def tokens_for(self, traces):
+        """
+        Access tokens keyed by captured user id where that user exists
+        locally, and by role otherwise (any local user with that role).
+        """
+        tokens = {}
+        user_ids = {trace["user_id"] for trace in traces if trace.get("user_id")}
+        for user in User.objects.filter(id__in=user_ids, is_active=True):
+            tokens[user.id] = str(AccessToken.for_user(user))
+        for role in {trace["role"] for trace in traces} & ROLE_FILTERS.keys():
+            user = (
+                User.objects.filter(is_active=True, **ROLE_FILTERS[role])
+                .order_by("id")
+                .first()
+            )
+            if user:
+                tokens[role] = str(AccessToken.for_user(user))
+        return tokens
@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from common.fixtures import build_course_fixture
+from quiz.models import Quiz
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic dataset for performance work: courses with "
+        "modules, quizzes, question banks, enrolled students and their responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=5)
+        parser.add_argument("--students", type=int, default=200, help="Per course.")
+        parser.add_argument("--modules", type=int, default=10, help="Per course.")
+        parser.add_argument("--quizzes", type=int, default=5, help="Per course.")
+        parser.add_argument("--banks-per-quiz", type=int, default=3)
+        parser.add_argument("--questions-per-bank", type=int, default=20)
+        parser.add_argument(
+            "--response-rate",
+            type=float,
+            default=0.8,
+            help="Share of students who answered every quiz of their course.",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="perf",
+            help="Prefix of generated usernames; must not be in use yet.",
+        )
+        parser.add_argument(
+            "--password",
+            default="perfpass",
+            help="Password of every generated account.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}").exists():
+            raise CommandError(
+                f"Users prefixed '{prefix}' already exist; pick another --prefix"
+            )
+        if not 0 <= options["response_rate"] <= 1:
+            raise CommandError("--response-rate must be between 0 and 1")
+
+        # Hashing once instead of per account keeps seeding I/O bound.
+        password = make_password(options["password"])
+        started = time.monotonic()
+        for c in range(options["courses"]):
+            with transaction.atomic():
+                data = build_course_fixture(
+                    students=options["students"],
+                    modules=options["modules"],
+                    quizzes=options["quizzes"],
+                    banks_per_quiz=options["banks_per_quiz"],
+                    questions_per_bank=options["questions_per_bank"],
+                    prefix=f"{prefix}{c}",
+                    password=password,
+                    response_rate=options["response_rate"],
+                )
+                # so that bench can review them without changing anything
+                Quiz.objects.filter(course=data.course).update(
+                    show_correct_answers_on_completion=True
+                )
+            self.stdout.write(
+                f"Course {data.course.id}: teacher {data.teacher.username}, "
+                f"{len(data.students)} students, {len(data.questions)} questions"
+            )
+        self.stderr.write(
+            f"Seeded {options['courses']} courses in {time.monotonic() - started:.1f}s"
+        )
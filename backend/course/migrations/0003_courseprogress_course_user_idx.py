@@ -0,0 +1,44 @@
+# Generated by Django 6.0
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("course", "0002_courseprogress"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="courseprogress",
+            index=models.Index(
+                fields=["course"],
+                include=("user",),
+                name="courseprogress_course_user_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="courseprogress",
+            name="course",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="course.course",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="courseprogress",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 6.0 on 2026-10-19 00:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Postgres has no Polish stemmer of its own; until the database gets a
+# dictionary for it, "polish" indexes words as they are written.
+CREATE_POLISH_CONFIG = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'polish') THEN
+        CREATE TEXT SEARCH CONFIGURATION polish (COPY = simple);
+    END IF;
+END
+$$;
+"""
+
+# What course/search.py writes, for the courses and modules already there.
+INDEX_EXISTING = """
+INSERT INTO course_searchdocument (course_id, module_id, vector)
+SELECT id, NULL,
+    setweight(to_tsvector('polish', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('polish', coalesce(description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+FROM course_course;
+INSERT INTO course_searchdocument (course_id, module_id, vector)
+SELECT course_id, id,
+    setweight(to_tsvector('polish', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('polish', coalesce(content, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+FROM module_module;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0003_courseprogress_course_user_idx"),
+        ("module", "0005_moduleprogress_completed_idx"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_POLISH_CONFIG, migrations.RunSQL.noop),
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vector", django.contrib.postgres.search.SearchVectorField()),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="course.course"
+                    ),
+                ),
+                (
+                    "module",
+                    models.OneToOneField(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_document",
+                        to="module.module",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["vector"], name="searchdocument_vector_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("module__isnull", True)),
+                        fields=("course",),
+                        name="searchdocument_course_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(INDEX_EXISTING, migrations.RunSQL.noop),
+    ]
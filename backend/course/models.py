@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -9,10 +11,45 @@ class Course(models.Model):
 
 
 class CourseProgress(models.Model):
-    user = models.ForeignKey("user.User", on_delete=models.CASCADE)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    # user_id lookups are served by the leading column of unique_together,
+    # course_id lookups by the covering index below.
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE, db_index=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_index=False)
     completed = models.BooleanField(default=False)
     percent_complete = models.FloatField(default=0.0)
 
     class Meta:
         unique_together = ("user", "course")
+        indexes = [
+            models.Index(
+                fields=["course"],
+                include=["user"],
+                name="courseprogress_course_user_idx",
+            )
+        ]
+
+
+class SearchDocument(models.Model):
+    """
+    Full-text search entry of a course (module null) or of one of its
+    modules. Kept up to date by course/search.py.
+    """
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    module = models.OneToOneField(
+        "module.Module",
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="search_document",
+    )
+    vector = SearchVectorField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course"],
+                condition=models.Q(module__isnull=True),
+                name="searchdocument_course_uniq",
+            )
+        ]
+        indexes = [GinIndex(fields=["vector"], name="searchdocument_vector_idx")]
@@ -0,0 +1,88 @@
+from django.db.models import Exists, F, FloatField, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, NullIf
+
+from module.models import Module, ModuleProgress
+from question.models import Question
+from questionresponse.models import QuestionResponse
+from quiz.models import Quiz
+
+from .models import CourseProgress
+
+
+class SubqueryCount(Subquery):
+    """COUNT(*) over a correlated subquery, 0 when it matches nothing."""
+
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+    def __init__(self, queryset, **extra):
+        super().__init__(queryset.order_by().values("pk"), **extra)
+
+
+def completed_quizzes(course, user):
+    """
+    Quizzes of `course` that `user` has answered at least one question of.
+    A quiz without questions counts as completed, as it always has.
+    Both arguments may be outer references.
+    """
+    has_questions = Exists(Question.objects.filter(question_banks__quiz=OuterRef("pk")))
+    answered = Exists(
+        QuestionResponse.objects.filter(
+            user=OuterRef(user) if isinstance(user, OuterRef) else user,
+            question__question_banks__quiz=OuterRef("pk"),
+        )
+    )
+    return Quiz.objects.filter(course=course).filter(~has_questions | answered)
+
+
+def annotate_progress(queryset, course_ref="course_id", user_ref="user_id"):
+    """
+    Annotate each row with the student's live course progress, computed in
+    the same query: completed modules plus attempted quizzes over all
+    modules and quizzes of the course, as a percentage in `progress`.
+
+    `course_ref` names the field of the annotated model that holds the
+    course (CourseProgress rows by default). `user_ref` names the field
+    holding the student, or is the student itself.
+    """
+    course = OuterRef(course_ref)
+    user = OuterRef(user_ref) if isinstance(user_ref, str) else user_ref
+    # alias() keeps each count out of the SELECT list, so every subquery is
+    # evaluated once per row.
+    return queryset.alias(
+        items_total=SubqueryCount(Module.objects.filter(course=course))
+        + SubqueryCount(Quiz.objects.filter(course=course)),
+        items_done=SubqueryCount(
+            ModuleProgress.objects.filter(
+                user=user, module__course=course, completed=True
+            )
+        )
+        + SubqueryCount(completed_quizzes(course, user)),
+    ).annotate(
+        progress=Coalesce(
+            F("items_done") * 100.0 / NullIf(F("items_total"), 0),
+            0.0,
+            output_field=FloatField(),
+        )
+    )
+
+
+def annotate_course_stats(queryset, user):
+    """
+    Annotate courses with everything CourseSerializer reports, so a list of
+    courses costs one query: `students_count`, `modules_count` and, for a
+    student, `is_enrolled` and `progress`.
+    """
+    queryset = queryset.annotate(
+        students_count=SubqueryCount(
+            CourseProgress.objects.filter(course=OuterRef("pk"))
+        ),
+        modules_count=SubqueryCount(Module.objects.filter(course=OuterRef("pk"))),
+    )
+    if not user.is_authenticated or getattr(user, "is_teacher", False):
+        return queryset
+    return annotate_progress(queryset, course_ref="pk", user_ref=user).annotate(
+        is_enrolled=Exists(
+            CourseProgress.objects.filter(course=OuterRef("pk"), user=user)
+        )
+    )
@@ -0,0 +1,202 @@
+"""
+Full-text search over courses and their modules.
+
+Every course and module has a SearchDocument holding one tsvector, behind
+a GIN index: course title (weight A) and description (B), module name (A)
+and current content (B). Each is indexed under every text search configuration in
+settings.SEARCH["CONFIGS"] (Polish and English), since a course written in
+Polish still uses English terms, and a query matches if it matches under
+any of them. Saving a course or a module, or a new revision of its
+content, re-indexes just that row; rebuild_search_index re-indexes
+everything, e.g. after a change of CONFIGS or after bulk_create, which
+sends no signals. Headlines are cut only for the page of results shown,
+since module content has to be read from its revisions.
+"""
+
+import operator
+from functools import reduce
+from html import escape
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from module import revisions
+from module.models import Module
+
+from .models import Course, SearchDocument
+
+# saves that touch none of these leave the document as it is
+COURSE_FIELDS = {"title", "description"}
+MODULE_FIELDS = {"name", "course", "course_id"}
+
+INDEX_COURSES_SQL = """
+INSERT INTO {documents} (course_id, module_id, vector)
+SELECT c.id, NULL, {vector}
+FROM {courses} c
+WHERE c.id = ANY(%s)
+ON CONFLICT (course_id) WHERE module_id IS NULL DO UPDATE SET
+    vector = EXCLUDED.vector
+"""
+
+INDEX_MODULES_SQL = """
+INSERT INTO {documents} (course_id, module_id, vector)
+SELECT m.course_id, m.id, {vector}
+FROM {modules} m
+JOIN unnest(%s::bigint[], %s::text[]) AS v(id, content) ON v.id = m.id
+ON CONFLICT (module_id) DO UPDATE SET
+    course_id = EXCLUDED.course_id,
+    vector = EXCLUDED.vector
+"""
+
+HEADLINES_SQL = """
+SELECT ts_headline(%s::regconfig, t.text, websearch_to_tsquery(%s::regconfig, %s), %s)
+FROM unnest(%s::text[]) WITH ORDINALITY AS t(text, position)
+ORDER BY t.position
+"""
+HEADLINE_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+)
+
+
+def _config():
+    return getattr(settings, "SEARCH", {})
+
+
+def _configs():
+    return _config().get("CONFIGS", ["simple"])
+
+
+def _vector(columns):
+    """
+    SQL of the tsvector of `columns` ({column: weight}) under every
+    configuration, and its parameters.
+    """
+    parts, params = [], []
+    for column, weight in columns.items():
+        for config in _configs():
+            parts.append(
+                f"setweight(to_tsvector(%s::regconfig, coalesce({column}, '')), "
+                f"'{weight}')"
+            )
+            params.append(config)
+    return " || ".join(parts), params
+
+
+def _index(sql, columns, *arrays):
+    vector, params = _vector(columns)
+    sql = sql.format(
+        documents=SearchDocument._meta.db_table,
+        courses=Course._meta.db_table,
+        modules=Module._meta.db_table,
+        vector=vector,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, *arrays])
+
+
+def index_courses(ids):
+    _index(INDEX_COURSES_SQL, {"c.title": "A", "c.description": "B"}, list(ids))
+
+
+def index_modules(ids):
+    ids = list(ids)
+    contents = revisions.current_contents(ids)
+    _index(
+        INDEX_MODULES_SQL,
+        {"m.name": "A", "v.content": "B"},
+        ids,
+        [contents.get(module_id, "") for module_id in ids],
+    )
+
+
+def rebuild(batch_size=500):
+    """Re-indexes every course and module. Returns how many of each."""
+    counts = []
+    for model, index in ((Course, index_courses), (Module, index_modules)):
+        ids = list(model.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(ids), batch_size):
+            index(ids[start : start + batch_size])
+        counts.append(len(ids))
+    return tuple(counts)
+
+
+def search(courses, text):
+    """
+    Documents of `courses` (a queryset) matching `text`, in web search
+    syntax ("quoted phrases", or, -negation), best first. Rows are dicts
+    of course_id, course_title, module_id and module_name (None for a
+    course hit), rank and course_description; add_headlines turns the
+    last into a headline.
+    """
+    query = reduce(
+        operator.or_,
+        (
+            SearchQuery(text, config=config, search_type="websearch")
+            for config in _configs()
+        ),
+    )
+    return (
+        SearchDocument.objects.filter(course__in=courses, vector=query)
+        .annotate(rank=SearchRank(F("vector"), query))
+        .order_by("-rank", "id")
+        .values(
+            "course_id",
+            "module_id",
+            "rank",
+            course_title=F("course__title"),
+            module_name=F("module__name"),
+            course_description=F("course__description"),
+        )
+    )
+
+
+def add_headlines(rows, text):
+    """
+    Replaces course_description in search() `rows` with a headline: the
+    passage of the module content, or of the course description for a
+    course hit, that matches `text`, matches wrapped in <mark>. The rest of
+    the headline is HTML-escaped, so it can be rendered as HTML.
+    """
+    rows = list(rows)
+    if not rows:
+        return rows
+    contents = revisions.current_contents(
+        [row["module_id"] for row in rows if row["module_id"] is not None]
+    )
+    # escaped before ts_headline, which passes markup through as it is
+    texts = [
+        escape(
+            row["course_description"]
+            if row["module_id"] is None
+            else contents.get(row["module_id"], "")
+        )
+        for row in rows
+    ]
+    config = _config().get("HEADLINE_CONFIG", _configs()[0])
+    with connection.cursor() as cursor:
+        cursor.execute(HEADLINES_SQL, [config, config, text, HEADLINE_OPTIONS, texts])
+        for row, (headline,) in zip(rows, cursor.fetchall()):
+            del row["course_description"]
+            row["headline"] = headline
+    return rows
+
+
+@receiver(post_save, sender=Course)
+def _course_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or COURSE_FIELDS & update_fields:
+        index_courses([instance.pk])
+
+
+@receiver(post_save, sender=Module)
+def _module_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or MODULE_FIELDS & update_fields:
+        index_modules([instance.pk])
+
+
+@receiver(revisions.content_changed, sender=Module)
+def _module_content_changed(sender, module, **kwargs):
+    index_modules([module.pk])
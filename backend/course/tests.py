@@ -1,9 +1,20 @@
+import io
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
-from user.models import User
+from common.fixtures import build_course_fixture
+from module.models import Module, ModuleProgress
+from questionresponse.models import QuestionResponse
+from quiz.models import Quiz, QuizAttempt
+from user.models import OutgoingEmail, User
 
-from .models import Course, CourseProgress
+from .models import Course, CourseProgress, SearchDocument
 
 
 class CourseViewSetTests(APITestCase):
@@ -191,3 +202,403 @@ class CourseViewSetTests(APITestCase):
         self.assertEqual(response.data, response2.data)
         self.assertEqual(response.status_code, response2.status_code)
         self.assertEqual(response.headers, response2.headers)
+
+
+class BulkEnrollmentTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor_user = User.objects.create_user(
+            username="instructor",
+            email="instructor@test.com",
+            password="instrpass",
+            is_teacher=True,
+        )
+        cls.student_user = User.objects.create_user(
+            username="student@test.com",
+            email="student@test.com",
+            password="studentpass",
+        )
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Test Course",
+            description="Test Description",
+            instructor=self.instructor_user,
+        )
+        CourseProgress.objects.create(user=self.student_user, course=self.course)
+        self.url = f"/api/courses/{self.course.id}/bulk-enroll/"
+        self.client.force_authenticate(user=self.instructor_user)
+
+    def test_bulk_enroll_csv_reports_every_row(self):
+        roster = SimpleUploadedFile(
+            "roster.csv",
+            b"email,name,surname,password\n"
+            b"student@test.com,,,\n"
+            b"new1@test.com,Anna,Nowak,secretpass\n"
+            b"new2@test.com,Piotr,Lis,secretpass\n"
+            b"new1@test.com,Anna,Nowak,secretpass\n"
+            b"instructor@test.com,,,\n"
+            b"not-an-email,,,\n"
+            b"nopass@test.com,Ola,Kot,\n",
+        )
+        response = self.client.post(self.url, {"roster": roster})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [entry["status"] for entry in response.data],
+            [
+                "already_enrolled",
+                "created",
+                "created",
+                "error",
+                "error",
+                "error",
+                "error",
+            ],
+        )
+        new_user = User.objects.get(email="new1@test.com")
+        self.assertFalse(new_user.is_active)
+        self.assertTrue(new_user.check_password("secretpass"))
+        self.assertEqual(
+            set(self.course.courseprogress_set.values_list("user__email", flat=True)),
+            {"student@test.com", "new1@test.com", "new2@test.com"},
+        )
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+
+    def test_bulk_enroll_query_count_does_not_grow_with_roster(self):
+        students = [
+            User(username=f"s{i}@test.com", email=f"s{i}@test.com") for i in range(50)
+        ]
+        User.objects.bulk_create(students)
+        rows = [{"email": user.email} for user in students]
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {"students": rows[:5]}, format="json")
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, {"students": rows}, format="json")
+        self.assertEqual(len(large), len(small))
+        self.assertEqual({entry["status"] for entry in response.data[5:]}, {"enrolled"})
+
+    def test_bulk_enroll_skips_inactive_users(self):
+        User.objects.create_user(
+            username="gone@test.com", email="gone@test.com", is_active=False
+        )
+        response = self.client.post(
+            self.url, {"students": [{"email": "gone@test.com"}]}, format="json"
+        )
+        self.assertEqual(response.data[0]["status"], "error")
+        self.assertEqual(response.data[0]["detail"], "User is not active.")
+        self.assertFalse(
+            self.course.courseprogress_set.filter(user__email="gone@test.com").exists()
+        )
+
+    def test_bulk_enroll_as_student_forbidden(self):
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.post(self.url, {"students": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EligibleStudentsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor_user = User.objects.create_user(
+            username="instructor", password="instrpass", is_teacher=True
+        )
+        cls.course = Course.objects.create(
+            title="Test Course", description="Desc", instructor=cls.instructor_user
+        )
+        User.objects.bulk_create(
+            User(
+                username=f"student{i}",
+                email=f"student{i}@test.com",
+                name="Anna" if i % 2 else "Piotr",
+                surname=f"Nowak{i:02d}",
+            )
+            for i in range(30)
+        )
+        User.objects.create_user(username="inactive", is_active=False)
+        User.objects.create_user(username="teacher2", is_teacher=True)
+        CourseProgress.objects.create(
+            user=User.objects.get(username="student0"), course=cls.course
+        )
+        cls.url = f"/api/courses/{cls.course.id}/eligible-students/"
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.instructor_user)
+
+    def test_eligible_students_paginated(self):
+        response = self.client.get(self.url, {"page_size": 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 29)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(response.data["results"][0]["email"], "student1@test.com")
+
+    def test_eligible_students_search(self):
+        response = self.client.get(self.url, {"search": "anna"})
+        self.assertEqual(response.data["count"], 15)
+        response = self.client.get(self.url, {"search": "nowak0"})
+        self.assertEqual(
+            [student["email"] for student in response.data["results"]],
+            [f"student{i}@test.com" for i in range(1, 10)],
+        )
+
+
+class EnrolledStudentsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor_user = User.objects.create_user(
+            username="instructor", password="instrpass", is_teacher=True
+        )
+        cls.course = Course.objects.create(
+            title="Test Course", description="Desc", instructor=cls.instructor_user
+        )
+        cls.modules = [
+            Module.objects.create(name=f"Module {i}", content="", course=cls.course)
+            for i in range(3)
+        ]
+        # quiz without questions counts as completed for everyone
+        Quiz.objects.create(
+            title="Empty", description="", time_limit_in_minutes=5, course=cls.course
+        )
+        cls.students = []
+        for i in range(4):
+            student = User.objects.create_user(
+                username=f"student{i}", email=f"student{i}@test.com", surname=f"S{i}"
+            )
+            CourseProgress.objects.create(user=student, course=cls.course)
+            ModuleProgress.objects.bulk_create(
+                ModuleProgress(user=student, module=module, completed=True)
+                for module in cls.modules[:i]
+            )
+            cls.students.append(student)
+        cls.url = f"/api/courses/{cls.course.id}/enrolled-students/"
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.instructor_user)
+
+    def test_enrolled_students_live_progress(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(
+            [
+                (
+                    entry["student"]["email"],
+                    entry["percent_complete"],
+                    entry["completed"],
+                )
+                for entry in response.data["results"]
+            ],
+            [
+                ("student0@test.com", 25.0, False),
+                ("student1@test.com", 50.0, False),
+                ("student2@test.com", 75.0, False),
+                ("student3@test.com", 100.0, True),
+            ],
+        )
+
+    def test_enrolled_students_filter_and_ordering(self):
+        response = self.client.get(
+            self.url, {"completed": "false", "ordering": "-progress"}
+        )
+        self.assertEqual(
+            [entry["student"]["email"] for entry in response.data["results"]],
+            ["student2@test.com", "student1@test.com", "student0@test.com"],
+        )
+        response = self.client.get(self.url, {"search": "student3"})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_enrolled_students_query_count_constant(self):
+        for i in range(4, 20):
+            student = User.objects.create_user(username=f"student{i}")
+            CourseProgress.objects.create(user=student, course=self.course)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 20)
+
+
+class CourseQueryBudgetTests(APITestCase):
+    """
+    Query ceilings per endpoint, measured on a realistically sized course.
+    They must hold whatever the data size; a per-row query breaks them.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=30, modules=5, quizzes=3)
+        build_course_fixture(students=5, teacher=cls.data.teacher, prefix="other")
+        cls.course = cls.data.course
+        cls.student = cls.data.students[3]
+
+    def assertBudget(self, user, url, queries):
+        self.client.force_authenticate(user=user)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_course_list(self):
+        response = self.assertBudget(self.data.teacher, "/api/courses/", 1)
+        self.assertEqual(len(response.data), 2)
+        response = self.assertBudget(self.student, "/api/courses/", 1)
+        self.assertEqual(response.data[0]["students_count"], 30)
+        self.assertEqual(response.data[0]["modules_count"], 5)
+
+    def test_course_detail(self):
+        response = self.assertBudget(self.student, f"/api/courses/{self.course.id}", 2)
+        # 3 of 5 modules plus all 3 quizzes answered
+        self.assertEqual(response.data["progress"], 75.0)
+
+    def test_enrolled_students(self):
+        self.assertBudget(
+            self.data.teacher, f"/api/courses/{self.course.id}/enrolled-students/", 5
+        )
+
+    def test_eligible_students(self):
+        self.assertBudget(
+            self.data.teacher, f"/api/courses/{self.course.id}/eligible-students/", 5
+        )
+
+    def test_user_info(self):
+        self.assertBudget(
+            self.student, f"/accounts/check_user_info/{self.student.id}/", 1
+        )
+
+
+class PerfToolingTests(APITestCase):
+    def test_seed_then_bench(self):
+        call_command(
+            "seed_perf_data",
+            courses=2,
+            students=4,
+            modules=2,
+            quizzes=1,
+            banks_per_quiz=2,
+            questions_per_bank=3,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+        self.assertEqual(Course.objects.count(), 2)
+        self.assertEqual(CourseProgress.objects.count(), 8)
+        self.assertTrue(
+            self.client.login(username="perf0-student0@test.com", password="perfpass")
+        )
+
+        responses = list(QuestionResponse.objects.values_list("id", "updated_at"))
+        out = io.StringIO()
+        call_command("bench", iterations=2, warmup=0, stdout=out, stderr=io.StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["course"], Course.objects.latest("id").id)
+        self.assertFalse({"quiz-attempt", "quiz-submit"} & set(report["endpoints"]))
+        for name, result in report["endpoints"].items():
+            self.assertEqual(result["status"], [200], name)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["queries"], 0)
+        # read-only by default
+        self.assertEqual(
+            list(QuestionResponse.objects.values_list("id", "updated_at")), responses
+        )
+        self.assertFalse(QuizAttempt.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command("bench", only=["quiz-submit"], stdout=io.StringIO())
+        out = io.StringIO()
+        call_command(
+            "bench",
+            only=["quiz-attempt", "quiz-submit"],
+            include_writes=True,
+            iterations=2,
+            warmup=0,
+            stdout=out,
+            stderr=io.StringIO(),
+        )
+        for name, result in json.loads(out.getvalue())["endpoints"].items():
+            self.assertEqual(result["status"], [200], name)
+
+
+class SearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="teacher", email="teacher@test.com", password="x", is_teacher=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", email="student@test.com", password="x"
+        )
+        cls.course = Course.objects.create(
+            title="Programowanie w Pythonie",
+            description="Kurs podstaw programowania",
+            instructor=cls.teacher,
+        )
+        cls.other = Course.objects.create(
+            title="Algorytmy",
+            description="Programowanie dynamiczne",
+            instructor=cls.teacher,
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+        cls.module = Module.objects.create(
+            name="Testing",
+            content="Running the tests before every commit keeps the build green.",
+            course=cls.course,
+        )
+        Module.objects.create(
+            name="Pętle", content="Pętla for powtarza instrukcje.", course=cls.other
+        )
+
+    def search(self, user, q, **params):
+        self.client.force_authenticate(user)
+        return self.client.get("/api/search/", {"q": q, **params})
+
+    def test_finds_polish_and_stemmed_english_in_enrolled_courses(self):
+        response = self.search(self.student, "programowania")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        hit = response.data["results"][0]
+        self.assertEqual(hit["course_id"], self.course.id)
+        self.assertIsNone(hit["module_id"])
+        self.assertIn("<mark>programowania</mark>", hit["headline"])
+
+        hit = self.search(self.student, "run test").data["results"][0]
+        self.assertEqual(hit["module_id"], self.module.id)
+        self.assertEqual(hit["module_name"], "Testing")
+        self.assertEqual(hit["course_title"], "Programowanie w Pythonie")
+
+        self.assertEqual(self.search(self.student, "pętla").data["count"], 0)
+        self.assertEqual(self.search(self.teacher, "pętla").data["count"], 1)
+        response = self.search(self.teacher, "programowanie", course=self.other.id)
+        self.assertEqual(
+            [hit["course_id"] for hit in response.data["results"]], [self.other.id]
+        )
+
+    def test_headline_escapes_markup(self):
+        self.module.content = 'Testing <img src=x onerror="alert(1)"> & more.'
+        self.module.save()
+        hit = self.search(self.teacher, "testing").data["results"][0]
+        self.assertNotIn("<img", hit["headline"])
+        self.assertIn("&lt;img", hit["headline"])
+        self.assertIn("<mark>Testing</mark>", hit["headline"])
+
+    def test_reindexed_on_save(self):
+        self.module.content = "Continuous integration with GitHub Actions."
+        self.module.save()
+        self.assertEqual(self.search(self.student, "commit").data["count"], 0)
+        self.assertEqual(self.search(self.student, "integration").data["count"], 1)
+
+        self.course.title = "Python programming"
+        self.course.save(update_fields=["title"])
+        self.assertEqual(self.search(self.student, "programming").data["count"], 1)
+        self.assertEqual(SearchDocument.objects.count(), 4)
+
+    def test_rejects_bad_queries(self):
+        response = self.search(self.student, " a ")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.search(self.student, "tests", course="x")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(None)
+        response = self.client.get("/api/search/", {"q": "tests"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Indexed 2 courses and 2 modules")
+        self.assertEqual(self.search(self.student, "tests").data["count"], 1)
@@ -1,16 +1,21 @@
+from django.db.models import Exists, OuterRef, Q
 from django.shortcuts import get_object_or_404
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import permissions, serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from common.permissions import IsInstructor
 from common.swagger_utils import swagger_tags
-from user.models import User
+from user.models import ACTIVE_STUDENT, User
 
+from .enrollment import bulk_enroll, clean_roster, read_roster
 from .models import Course, CourseProgress
 from .permissions import (
     IsCourseInstructor,
@@ -18,9 +23,29 @@ from .permissions import (
     IsEnrolledToCourseTaughtByInstructor,
     IsSameUser,
 )
-from module.models import ModuleProgress
-from quiz.models import Quiz
-from questionresponse.models import QuestionResponse
+from .progress import annotate_course_stats, annotate_progress
+from .search import add_headlines, search
+
+
+class StudentPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
+def visible_courses(user):
+    """Courses `user` teaches or is enrolled in; every course for admins."""
+    if user.is_superuser:
+        return Course.objects.all()
+    if getattr(user, "is_teacher", False):
+        return Course.objects.filter(instructor=user)
+    return Course.objects.filter(courseprogress__user=user)
 
 
 class UserInfoSerializer(serializers.ModelSerializer):
@@ -42,6 +67,19 @@ class CourseProgressSerializer(serializers.ModelSerializer):
         ]
 
 
+class EnrolledStudentSerializer(CourseProgressSerializer):
+    """Roster entry with progress computed live by `annotate_progress`."""
+
+    percent_complete = serializers.SerializerMethodField()
+    completed = serializers.SerializerMethodField()
+
+    def get_percent_complete(self, obj):
+        return round(obj.progress, 2)
+
+    def get_completed(self, obj):
+        return obj.progress >= 100
+
+
 class CourseSerializer(serializers.ModelSerializer):
     progress = serializers.SerializerMethodField()
     students_count = serializers.SerializerMethodField()
@@ -56,53 +94,22 @@ class CourseSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         user = request.user
         if request and user.is_authenticated and not getattr(user, "is_teacher", False):
-            # Check enrollment
-            try:
-                obj.courseprogress_set.get(user=user)
-            except CourseProgress.DoesNotExist:
+            if not hasattr(obj, "progress"):
+                # Not loaded through CourseViewSet.get_queryset (e.g. after an update)
+                obj = annotate_course_stats(Course.objects.filter(pk=obj.pk), user).get()
+            if not obj.is_enrolled:
                 return 0
-
-            # 1. Modules Progress
-            total_modules = obj.module_set.count()
-            completed_modules = ModuleProgress.objects.filter(
-                user=user, 
-                module__course=obj, 
-                completed=True
-            ).count()
-
-            # 2. Quizzes Progress
-            quizzes = obj.quiz_set.all()
-            total_quizzes = quizzes.count()
-            completed_quizzes = 0
-            
-            for quiz in quizzes:
-                # Gather all question IDs for the quiz
-                # We count a quiz as "completed" (or at least attempted) if there is at least one response
-                # to any of its questions.
-                question_ids = set()
-                for bank in quiz.question_banks.all():
-                    question_ids.update(bank.questions.values_list('id', flat=True))
-                
-                if not question_ids:
-                    # Empty quiz counts as completed for progress purposes
-                    completed_quizzes += 1
-                    continue
-
-                if QuestionResponse.objects.filter(user=user, question_id__in=question_ids).exists():
-                    completed_quizzes += 1
-
-            total_items = total_modules + total_quizzes
-            if total_items == 0:
-                return 0.0
-
-            completed_items = completed_modules + completed_quizzes
-            return round((completed_items / total_items) * 100, 2)
+            return round(obj.progress, 2)
         return None
 
     def get_students_count(self, obj):
+        if hasattr(obj, "students_count"):
+            return obj.students_count
         return obj.courseprogress_set.count()
 
     def get_modules_count(self, obj):
+        if hasattr(obj, "modules_count"):
+            return obj.modules_count
         return obj.module_set.count()
 
 
@@ -124,6 +131,53 @@ class UserInfoView(APIView):
         return Response(data=UserInfoSerializer(user).data, status=200)
 
 
+class SearchView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=["courses"],
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description='Words to find; "quoted phrases", or and -word work as in web search',
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "course",
+                openapi.IN_QUERY,
+                description="Only search this course",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+    )
+    def get(self, request):
+        """Search the titles, descriptions, modules and module content of your courses (paginated)."""
+        text = request.query_params.get("q", "").strip()
+        if len(text) < 2:
+            return Response({"detail": "Search for at least 2 characters."}, status=400)
+        courses = visible_courses(request.user)
+        course_id = request.query_params.get("course")
+        if course_id:
+            if not course_id.isdigit():
+                return Response({"detail": "course must be an id."}, status=400)
+            courses = courses.filter(id=course_id)
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search(courses, text), request, view=self)
+        return paginator.get_paginated_response(add_headlines(page, text))
+
+
+ROSTER_ORDERING = {
+    "surname": ["user__surname", "user__name"],
+    "name": ["user__name", "user__surname"],
+    "email": ["user__email"],
+    "progress": ["progress"],
+}
+
+
 @swagger_tags(tags=["courses"])
 class CourseViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
@@ -137,13 +191,9 @@ class CourseViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             return Course.objects.none()
         user = self.request.user
-        if user.is_superuser:
-            courses = Course.objects.all()
-        elif getattr(user, "is_teacher", False):
-            courses = Course.objects.filter(instructor=user)
-        else:
-            courses = Course.objects.filter(courseprogress__user=user)
-
+        courses = visible_courses(user)
+        if self.action in ("list", "retrieve"):
+            courses = annotate_course_stats(courses, user)
         return courses
 
     def get_object(self):
@@ -160,31 +210,97 @@ class CourseViewSet(viewsets.ModelViewSet):
         methods=["get"],
         permission_classes=[IsCourseInstructor | permissions.IsAdminUser],
     )
-    @swagger_auto_schema(tags=["courses - enrollments"])
+    @swagger_auto_schema(
+        tags=["courses - enrollments"],
+        manual_parameters=[
+            openapi.Parameter(
+                "search",
+                openapi.IN_QUERY,
+                description="Substring of the student's name, surname or email",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "completed",
+                openapi.IN_QUERY,
+                description="Only students who have (true) or have not (false) completed the course",
+                type=openapi.TYPE_BOOLEAN,
+            ),
+            openapi.Parameter(
+                "ordering",
+                openapi.IN_QUERY,
+                description="surname, name, email or progress; prefix with '-' for descending",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
     def enrolled_students(self, request, pk=None, **kwargs):
-        """List all students currently enrolled in this course."""
+        """List students currently enrolled in this course with their progress (paginated)."""
         course = self.get_object()
-        enrollments = (
-            course.courseprogress_set.all()
-        )  # via related_name or default reverse
-        serializer = CourseProgressSerializer(enrollments, many=True)
-        return Response(serializer.data)
+        enrollments = annotate_progress(
+            course.courseprogress_set.select_related("user")
+        )
+
+        search = request.query_params.get("search", "").strip()
+        if search:
+            enrollments = enrollments.filter(
+                Q(user__name__icontains=search)
+                | Q(user__surname__icontains=search)
+                | Q(user__email__icontains=search)
+            )
+        completed = request.query_params.get("completed")
+        if completed == "true":
+            enrollments = enrollments.filter(progress__gte=100)
+        elif completed == "false":
+            enrollments = enrollments.filter(progress__lt=100)
+
+        ordering = request.query_params.get("ordering", "surname")
+        fields = ROSTER_ORDERING.get(ordering.lstrip("-"), ROSTER_ORDERING["surname"])
+        if ordering.startswith("-"):
+            fields = [f"-{field}" for field in fields]
+        enrollments = enrollments.order_by(*fields, "id")
+
+        paginator = StudentPagination()
+        page = paginator.paginate_queryset(enrollments, request, view=self)
+        serializer = EnrolledStudentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
         methods=["get"],
         permission_classes=[IsCourseInstructor | permissions.IsAdminUser],
     )
-    @swagger_auto_schema(tags=["courses - enrollments"])
+    @swagger_auto_schema(
+        tags=["courses - enrollments"],
+        manual_parameters=[
+            openapi.Parameter(
+                "search",
+                openapi.IN_QUERY,
+                description="Substring of the student's name, surname or email",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
     def eligible_students(self, request, pk=None, **kwargs):
-        """List active students who are NOT yet enrolled in this course."""
+        """List active students who are NOT yet enrolled in this course (paginated)."""
         course = self.get_object()
-        enrolled_user_ids = course.courseprogress_set.values_list("user_id", flat=True)
-        eligible = User.objects.filter(
-            is_active=True, is_staff=False, is_teacher=False
-        ).exclude(id__in=enrolled_user_ids)
-        serializer = UserInfoSerializer(eligible, many=True)
-        return Response(serializer.data)
+        eligible = User.objects.filter(ACTIVE_STUDENT).filter(
+            ~Exists(
+                CourseProgress.objects.filter(course=course, user=OuterRef("pk"))
+            )
+        )
+        search = request.query_params.get("search", "").strip()
+        if search:
+            eligible = eligible.filter(
+                Q(name__icontains=search)
+                | Q(surname__icontains=search)
+                | Q(email__icontains=search)
+            )
+        eligible = eligible.order_by("surname", "name", "id")
+
+        paginator = StudentPagination()
+        page = paginator.paginate_queryset(eligible, request, view=self)
+        serializer = UserInfoSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
@@ -213,6 +329,35 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Student enrolled successfully."}, status=201)
         return Response({"detail": "Student is already enrolled."}, status=400)
 
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="bulk-enroll",
+        permission_classes=[IsCourseInstructor | permissions.IsAdminUser],
+        parser_classes=[JSONParser, MultiPartParser, FormParser],
+    )
+    @swagger_auto_schema(tags=["courses - enrollments"])
+    def bulk_enroll(self, request, pk=None, **kwargs):
+        """
+        Enroll a roster of students, creating accounts that don't exist yet.
+        Accepts a CSV/JSON file in "roster" (columns: email, name, surname,
+        password) or a JSON body {"students": [...]}. Returns a per-row report.
+        """
+        course = self.get_object()
+        fileobj = request.FILES.get("roster")
+        try:
+            if fileobj is not None:
+                fmt = "json" if fileobj.name.lower().endswith(".json") else "csv"
+                rows = read_roster(fileobj.read(), fmt)
+            else:
+                data = request.data
+                rows = clean_roster(
+                    data if isinstance(data, list) else data.get("students", [])
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"detail": f"Invalid roster: {e}"}, status=400)
+        return Response(bulk_enroll(course, rows))
+
     @action(
         detail=True,
         methods=["delete"],
@@ -0,0 +1,83 @@
+"""
+Production server settings; start.sh runs `gunicorn -c gunicorn.conf.py`.
+
+The app is imported once in the master and forked into the workers
+(preload_app), which start in milliseconds and share its memory. SIGHUP
+replaces the workers gracefully; SIGTERM (what ECS sends) lets in-flight
+requests finish within GRACEFUL_TIMEOUT. Code upgrades ship as new tasks,
+since preloaded code is not re-read on HUP.
+
+SERVER_INTERFACE=asgi serves backend.asgi with uvicorn workers instead of
+threaded WSGI workers.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# Each worker counts for itself; /metrics sums the workers' snapshots here.
+os.environ.setdefault("METRICS_DIR", "/tmp/metrics")
+
+from common.server import available_cpus, default_workers  # noqa: E402
+
+interface = os.getenv("SERVER_INTERFACE", "wsgi")
+if interface == "asgi":
+    wsgi_app = "backend.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "backend.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.getenv("SERVER_THREADS", "4"))
+
+bind = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+workers = int(
+    os.getenv("WEB_CONCURRENCY") or default_workers(interface, available_cpus())
+)
+preload_app = True
+
+# Recycle workers now and then to cap slow leaks; the jitter keeps them
+# from all restarting at once.
+max_requests = int(os.getenv("SERVER_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(os.getenv("SERVER_TIMEOUT", "60"))
+# Below the 30 s ECS waits between SIGTERM and SIGKILL.
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "25"))
+# Longer than the load balancer's 60 s idle timeout, so it is always the
+# balancer that closes idle connections and never races a closing socket.
+keepalive = int(os.getenv("SERVER_KEEPALIVE", "65"))
+
+accesslog = os.getenv("SERVER_ACCESS_LOG") or None
+# Worker heartbeats go to memory rather than a possibly slow container disk.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def when_ready(server):
+    from django.conf import settings
+    from django.db import connections
+
+    # Workers must open their own connections, never share the master's.
+    connections.close_all()
+    for connection in connections.all():
+        # psycopg pools (DB_POOL) hold sockets too
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()
+    # Snapshots of the previous run's workers would be summed forever.
+    metrics_dir = settings.METRICS.get("DIR")
+    if metrics_dir:
+        for path in Path(metrics_dir).glob("metrics-*.json"):
+            path.unlink(missing_ok=True)
+    server.log.info("Serving %s with %s %s workers", wsgi_app, workers, worker_class)
+
+
+def child_exit(server, worker):
+    from django.conf import settings
+
+    from common import metrics
+
+    # Keep the exited worker's totals, but not its file.
+    metrics_dir = settings.METRICS.get("DIR")
+    if metrics_dir:
+        metrics.retire(metrics_dir, worker.pid)
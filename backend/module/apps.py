@@ -6,6 +6,10 @@ class ModuleConfig(AppConfig):
 
     def ready(self):
         from django.conf import settings
+
+        # removes archived revisions from S3 with their module
+        from . import revisions  # noqa: F401
+
         if not settings.PRODUCTION:
             try:
                 from .aws import s3_client
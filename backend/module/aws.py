@@ -3,11 +3,15 @@ import json
 import boto3
 from django.conf import settings
 
+from common import metrics, tracing
+
 session = boto3.Session(
     aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
     aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
     region_name=settings.AWS_REGION,
 )
+metrics.instrument_boto3(session)
+tracing.instrument_boto3(session)
 
 s3 = session.resource(
     "s3",
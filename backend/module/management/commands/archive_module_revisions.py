@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from module.revisions import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves module content revisions superseded more than "
+        "MODULE_REVISIONS['ARCHIVE_AFTER_DAYS'] ago to S3. Meant to run "
+        "periodically (cron, scheduled task) next to the app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        moved = archive(batch_size=options["batch_size"])
+        self.stdout.write(f"Archived {moved} module revisions")
@@ -0,0 +1,35 @@
+# Generated by Django 6.0
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("module", "0004_alter_module_photo_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="moduleprogress",
+            index=models.Index(
+                condition=models.Q(("completed", True)),
+                fields=["user", "module"],
+                name="moduleprogress_completed_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="moduleprogress",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
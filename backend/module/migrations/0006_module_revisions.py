@@ -0,0 +1,149 @@
+# Generated by Django 6.0 on 2026-10-19 01:04
+
+import hashlib
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+EXCERPT_CHARS = 280
+
+
+def move_content_to_revisions(apps, schema_editor):
+    # module/revisions.py as of this migration, inlined: the first revision
+    # of each module is its content, stored whole.
+    Module = apps.get_model("module", "Module")
+    ModuleRevision = apps.get_model("module", "ModuleRevision")
+    for module in Module.objects.only("id", "content").iterator(chunk_size=500):
+        text = module.content
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        excerpt = " ".join(text.split())
+        if len(excerpt) > EXCERPT_CHARS:
+            excerpt = excerpt[:EXCERPT_CHARS].rsplit(" ", 1)[0] + "…"
+        ModuleRevision.objects.create(
+            module_id=module.id,
+            number=1,
+            kind="full",
+            data=zlib.compress(text.encode(), 6),
+            size=len(text),
+            content_hash=digest,
+        )
+        Module.objects.filter(id=module.id).update(
+            revision=1, content_hash=digest, excerpt=excerpt
+        )
+
+
+def move_content_back(apps, schema_editor):
+    # The newest revision is always stored whole, in the database.
+    Module = apps.get_model("module", "Module")
+    ModuleRevision = apps.get_model("module", "ModuleRevision")
+    heads = ModuleRevision.objects.filter(number=models.F("module__revision"))
+    for module_id, data in heads.values_list("module_id", "data").iterator():
+        Module.objects.filter(id=module_id).update(
+            content=zlib.decompress(data).decode()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("module", "0005_moduleprogress_completed_idx"),
+        # its backfill reads module.content
+        ("course", "0004_searchdocument"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="module",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="module",
+            name="excerpt",
+            field=models.CharField(blank=True, default="", max_length=300),
+        ),
+        migrations.AddField(
+            model_name="module",
+            name="revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="ModuleRevision",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("full", "Full"), ("delta", "Delta")],
+                        default="full",
+                        max_length=5,
+                    ),
+                ),
+                ("data", models.BinaryField(null=True)),
+                (
+                    "archive_key",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("size", models.PositiveIntegerField()),
+                ("content_hash", models.CharField(max_length=32)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "author",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "module",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="revisions",
+                        to="module.module",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("module", "number"),
+                        name="modulerevision_module_number_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(move_content_to_revisions, move_content_back),
+        # The column stays until the release after this one, so tasks still
+        # running the old code keep working through the deploy; it only
+        # gets a database default for the rows the new code inserts.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name="module",
+                    name="content",
+                    field=models.TextField(db_default=""),
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name="module",
+                    name="content",
+                ),
+            ],
+        ),
+    ]
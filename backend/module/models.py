@@ -5,16 +5,46 @@ from django.db import models
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 
+from common.tracing import CLIENT, span
+
 from .aws import s3_client
 
 
 # Create your models here.
 class Module(models.Model):
     name = models.CharField(max_length=255)
-    content = models.TextField()
     course = models.ForeignKey("course.Course", on_delete=models.CASCADE)
     photo_id = models.CharField(max_length=64, null=True, blank=True)
     photo_url = models.URLField(null=True, blank=True)
+    # The content itself lives in ModuleRevision rows; these describe the
+    # newest one, so listing modules never has to read it.
+    revision = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=32, blank=True, default="")
+    excerpt = models.CharField(max_length=300, blank=True, default="")
+
+    _content = None
+    _content_changed = False
+
+    @property
+    def content(self):
+        """The newest revision's content, read on first use."""
+        if self._content is None:
+            from .revisions import read
+
+            self._content = read(self) if self.revision else ""
+        return self._content
+
+    @content.setter
+    def content(self, text):
+        self._content = text
+        self._content_changed = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self._content_changed:
+            from .revisions import commit
+
+            commit(self, self._content)
 
     def upload_photo(self, fileobj):
         import os
@@ -30,11 +60,13 @@ class Module(models.Model):
             With a billion stored files, the probability is roughly ~10^-59."""
         
         key = f"{self.photo_id}{ext}"
-        s3_client.upload_fileobj(
-            Fileobj=fileobj,
-            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-            Key=key,
-        )
+        # The transfer runs its S3 calls on worker threads, outside the trace.
+        with span("S3 upload_fileobj", CLIENT, **{"aws.s3.key": key}):
+            s3_client.upload_fileobj(
+                Fileobj=fileobj,
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=key,
+            )
         if settings.PRODUCTION:
             self.photo_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
         else:
@@ -54,9 +86,53 @@ def pre_delete_module(sender, instance, **kwargs):
 
 
 class ModuleProgress(models.Model):
-    user = models.ForeignKey("user.User", on_delete=models.CASCADE)
+    # user_id lookups are served by the leading column of unique_together
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE, db_index=False)
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ("user", "module")
+        indexes = [
+            models.Index(
+                fields=["user", "module"],
+                condition=models.Q(completed=True),
+                name="moduleprogress_completed_idx",
+            )
+        ]
+
+
+class ModuleRevision(models.Model):
+    """
+    One version of a module's content, zlib-compressed. The newest is
+    stored whole, older ones as a delta against the next newer one; see
+    module/revisions.py. `data` is null once the revision is archived to
+    S3 under `archive_key`.
+    """
+
+    FULL = "full"
+    DELTA = "delta"
+
+    # module_id lookups are served by the leading column of the constraint
+    module = models.ForeignKey(
+        Module, on_delete=models.CASCADE, related_name="revisions", db_index=False
+    )
+    number = models.PositiveIntegerField()
+    kind = models.CharField(
+        max_length=5, choices=[(FULL, "Full"), (DELTA, "Delta")], default=FULL
+    )
+    data = models.BinaryField(null=True)
+    archive_key = models.CharField(max_length=255, null=True, blank=True)
+    size = models.PositiveIntegerField()
+    content_hash = models.CharField(max_length=32)
+    author = models.ForeignKey(
+        "user.User", on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["module", "number"], name="modulerevision_module_number_uniq"
+            )
+        ]
@@ -0,0 +1,219 @@
+"""
+Module content, stored as revisions.
+
+Every edit adds a revision holding the whole new content, zlib-compressed,
+and re-encodes the one it replaces as a delta against it: the lines it
+shares with the newer text become references into it. Reading the current
+content is one row; reading an older one walks back from the nearest
+revision stored whole, and one in SNAPSHOT_EVERY stays whole so that walk
+stays short. Revisions superseded for ARCHIVE_AFTER_DAYS can be moved to
+S3 by archive_module_revisions. Configured by settings.MODULE_REVISIONS.
+"""
+
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.db.models.signals import pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .aws import s3_client
+from .models import Module, ModuleRevision
+
+EXCERPT_CHARS = 280
+
+# Sent with the module and its new content once a revision is stored.
+content_changed = Signal()
+
+
+def _config():
+    return getattr(settings, "MODULE_REVISIONS", {})
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def excerpt(text):
+    """The start of `text`, whitespace collapsed, cut at a word."""
+    text = " ".join(text.split())
+    if len(text) <= EXCERPT_CHARS:
+        return text
+    return text[:EXCERPT_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def diff(base, text):
+    """
+    A delta that rebuilds `text` from `base`: a JSON list of [start, end)
+    line ranges of `base` and strings of new lines.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(lines[j1:j2]))
+    return json.dumps(ops, separators=(",", ":"))
+
+
+def patch(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    return "".join(
+        "".join(base_lines[op[0] : op[1]]) if isinstance(op, list) else op
+        for op in json.loads(delta)
+    )
+
+
+def _compress(text):
+    return zlib.compress(text.encode(), 6)
+
+
+def _decompress(data):
+    return zlib.decompress(data).decode()
+
+
+def _data(revision):
+    if revision.data is not None:
+        return bytes(revision.data)
+    response = s3_client.get_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=revision.archive_key
+    )
+    return response["Body"].read()
+
+
+def commit(module, text, author=None):
+    """
+    Stores `text` as the newest revision of `module` (saved already) and
+    returns it; None when it equals the current content.
+    """
+    digest = content_hash(text)
+    with transaction.atomic():
+        # Locks out concurrent edits of the module until this one is in.
+        current, current_hash = (
+            Module.objects.select_for_update()
+            .filter(pk=module.pk)
+            .values_list("revision", "content_hash")
+            .get()
+        )
+        if current and current_hash == digest:
+            revision = None
+        else:
+            revision = ModuleRevision.objects.create(
+                module=module,
+                number=current + 1,
+                data=_compress(text),
+                size=len(text),
+                content_hash=digest,
+                author=author,
+            )
+            if current:
+                _encode_as_delta(module, current, text)
+            Module.objects.filter(pk=module.pk).update(
+                revision=revision.number, content_hash=digest, excerpt=excerpt(text)
+            )
+            module.revision, module.content_hash = revision.number, digest
+            module.excerpt = excerpt(text)
+    module._content, module._content_changed = text, False
+    if revision is not None:
+        content_changed.send(sender=Module, module=module, content=text)
+    return revision
+
+
+def _encode_as_delta(module, number, newer_text):
+    if number % _config().get("SNAPSHOT_EVERY", 20) == 0:
+        return
+    previous = ModuleRevision.objects.get(module=module, number=number)
+    if previous.data is None:
+        return
+    delta = _compress(diff(newer_text, _decompress(_data(previous))))
+    if len(delta) < len(previous.data):
+        previous.kind, previous.data = ModuleRevision.DELTA, delta
+        previous.save(update_fields=["kind", "data"])
+
+
+def read(module, number=None):
+    """The content of revision `number` of `module`, the newest by default."""
+    number = number or module.revision
+    revisions = ModuleRevision.objects.filter(module=module)
+    whole = (
+        revisions.filter(number__gte=number, kind=ModuleRevision.FULL)
+        .order_by("number")
+        .values_list("number", flat=True)
+        .first()
+    )
+    if whole is None:
+        raise ModuleRevision.DoesNotExist(
+            f"Module {module.pk} has no revision {number}"
+        )
+    chain = revisions.filter(number__gte=number, number__lte=whole).order_by("-number")
+    text = None
+    for revision in chain:
+        data = _decompress(_data(revision))
+        text = data if revision.kind == ModuleRevision.FULL else patch(text, data)
+    return text
+
+
+def current_contents(module_ids):
+    """{module id: current content} for modules with any, in one query."""
+    heads = ModuleRevision.objects.filter(
+        module_id__in=module_ids, number=F("module__revision")
+    ).values_list("module_id", "data")
+    return {module_id: _decompress(data) for module_id, data in heads}
+
+
+def archive(batch_size=100):
+    """
+    Moves the data of revisions superseded more than ARCHIVE_AFTER_DAYS
+    ago to S3. Returns the number of revisions moved.
+    """
+    days = _config().get("ARCHIVE_AFTER_DAYS", 90)
+    prefix = _config().get("ARCHIVE_PREFIX", "module-revisions/")
+    # A revision is superseded when the next one is created.
+    superseded_long_ago = ModuleRevision.objects.filter(
+        module=OuterRef("module"),
+        number=OuterRef("number") + 1,
+        created_at__lt=timezone.now() - timedelta(days=days),
+    )
+    superseded = ModuleRevision.objects.filter(
+        Exists(superseded_long_ago),
+        number__lt=F("module__revision"),
+        data__isnull=False,
+    )
+    moved = 0
+    while True:
+        batch = list(superseded.order_by("id")[:batch_size])
+        if not batch:
+            return moved
+        for revision in batch:
+            key = f"{prefix}{revision.module_id}/{revision.number}"
+            s3_client.put_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=key,
+                Body=bytes(revision.data),
+            )
+            moved += ModuleRevision.objects.filter(
+                pk=revision.pk, data__isnull=False
+            ).update(data=None, archive_key=key)
+
+
+@receiver(pre_delete, sender=Module)
+def _delete_archived(sender, instance, **kwargs):
+    keys = list(
+        ModuleRevision.objects.filter(
+            module=instance, archive_key__isnull=False
+        ).values_list("archive_key", flat=True)
+    )
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in keys[start : start + 1000]]},
+        )
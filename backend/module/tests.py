@@ -1,3 +1,204 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.fixtures import build_course_fixture
+from course.models import Course, CourseProgress
+from user.models import User
+
+from . import revisions
+from .aws import s3_client
+from .models import Module, ModuleRevision
+
+
+class ModuleQueryBudgetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=10, modules=20, quizzes=1)
+        cls.student = cls.data.students[3]
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.student)
+
+    def test_module_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/courses/{self.data.course.id}/modules/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [module["completed"] for module in response.data[:4]],
+            [True, True, True, False],
+        )
+
+    def test_module_detail(self):
+        module = self.data.modules[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f"/api/courses/{self.data.course.id}/modules/{module.id}/"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["completed"])
+
+
+class ModuleRevisionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="teacher", is_teacher=True)
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=cls.teacher
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+        cls.texts = [
+            "".join(f"Paragraph {i}: wstęp do algebry liniowej.\n" for i in range(50)),
+        ]
+        cls.texts.append(cls.texts[0].replace("Paragraph 7:", "Paragraph 7 (edited):"))
+        cls.texts.append(cls.texts[1] + "Paragraph 50: podsumowanie.\n")
+
+    def setUp(self):
+        self.module = Module.objects.create(
+            name="Algebra", course=self.course, content=self.texts[0]
+        )
+        self.url = f"/api/courses/{self.course.id}/modules/{self.module.id}/"
+
+    def edit(self, *texts):
+        for text in texts:
+            self.module.content = text
+            self.module.save()
+
+    def kinds(self):
+        return list(
+            self.module.revisions.order_by("number").values_list("kind", flat=True)
+        )
+
+    def test_older_revisions_are_stored_as_deltas(self):
+        self.edit(*self.texts[1:])
+        self.assertEqual(self.module.revision, 3)
+        self.assertEqual(
+            self.kinds(),
+            [ModuleRevision.DELTA, ModuleRevision.DELTA, ModuleRevision.FULL],
+        )
+        for number, text in enumerate(self.texts, 1):
+            self.assertEqual(revisions.read(self.module, number), text)
+        module = Module.objects.get(id=self.module.id)
+        self.assertEqual(module.content, self.texts[2])
+        self.assertEqual(module.content_hash, revisions.content_hash(self.texts[2]))
+        self.assertTrue(module.excerpt.startswith("Paragraph 0: wstęp"))
+        self.assertTrue(module.excerpt.endswith("…"))
+
+    @override_settings(MODULE_REVISIONS={"SNAPSHOT_EVERY": 2})
+    def test_snapshots_stay_whole(self):
+        self.edit(*self.texts[1:])
+        self.assertEqual(
+            self.kinds(),
+            [ModuleRevision.DELTA, ModuleRevision.FULL, ModuleRevision.FULL],
+        )
+        self.assertEqual(revisions.read(self.module, 1), self.texts[0])
+
+    def test_unchanged_content_adds_no_revision(self):
+        self.edit(self.texts[0])
+        self.assertEqual(self.module.revision, 1)
+        self.assertEqual(self.module.revisions.count(), 1)
+
+    def test_list_has_excerpt_not_content(self):
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(f"/api/courses/{self.course.id}/modules/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = next(row for row in response.data if row["id"] == self.module.id)
+        self.assertNotIn("content", row)
+        self.assertEqual(row["revision"], 1)
+        self.assertTrue(row["excerpt"].startswith("Paragraph 0:"))
+
+    def test_teacher_edit_adds_revision(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.patch(
+            self.url, {"content": self.texts[1]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["revision"], 2)
+        head = self.module.revisions.get(number=2)
+        self.assertEqual(head.author, self.teacher)
+        self.assertEqual(revisions.read(self.module, 2), self.texts[1])
+
+        response = self.client.patch(self.url, {"name": "Algebra I"}, format="json")
+        self.assertEqual(response.data["revision"], 2)
+
+    def test_content_with_etag(self):
+        self.edit(self.texts[1])
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url + "content/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content.decode(), self.texts[1])
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(response["X-Revision"], "2")
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertEqual(etag, f'"{revisions.content_hash(self.texts[1])}"')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url + "content/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_content_of_old_revision(self):
+        self.edit(self.texts[1])
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url + "content/?revision=1")
+        self.assertEqual(response.content.decode(), self.texts[0])
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(
+            self.client.get(self.url + "content/?revision=9").status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            self.client.get(self.url + "content/?revision=x").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_revision_list_is_for_instructors(self):
+        self.edit(self.texts[1])
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(
+            self.client.get(self.url + "revisions/").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url + "revisions/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["number"] for row in response.data], [2, 1])
+        self.assertEqual(response.data[1]["kind"], ModuleRevision.DELTA)
+        self.assertFalse(response.data[1]["archived"])
+
+    def test_archive_moves_superseded_revisions_to_s3(self):
+        self.edit(self.texts[1])
+        ModuleRevision.objects.filter(module=self.module, number=2).update(
+            created_at=timezone.now() - timedelta(days=91)
+        )
+        data = bytes(self.module.revisions.get(number=1).data)
+        key = f"module-revisions/{self.module.id}/1"
+        bucket = settings.AWS_STORAGE_BUCKET_NAME
+        with Stubber(s3_client) as stubber:
+            stubber.add_response(
+                "put_object", {}, {"Bucket": bucket, "Key": key, "Body": data}
+            )
+            self.assertEqual(revisions.archive(), 1)
+            stubber.assert_no_pending_responses()
+        archived = self.module.revisions.get(number=1)
+        self.assertIsNone(archived.data)
+        self.assertEqual(archived.archive_key, key)
+
+        with Stubber(s3_client) as stubber:
+            stubber.add_response(
+                "get_object",
+                {"Body": StreamingBody(io.BytesIO(data), len(data))},
+                {"Bucket": bucket, "Key": key},
+            )
+            self.assertEqual(revisions.read(self.module, 1), self.texts[0])
+        # the head is never archived
+        self.assertEqual(revisions.archive(), 0)
@@ -1,4 +1,7 @@
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import permissions, serializers, viewsets
@@ -9,26 +12,93 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from common.swagger_utils import swagger_tags
 
-from .models import Module, ModuleProgress
+from .models import Module, ModuleProgress, ModuleRevision
 from .permissions import IsCourseInstructor, IsStudentEnrolledInCourseReadOnly
+from .revisions import commit, read
+
+# a pinned revision never changes
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
 
 
 class ModuleSerializer(serializers.ModelSerializer):
+    """
+    Module metadata and an excerpt of its content; the content itself is
+    written here, as a new revision, and read from the content endpoint.
+    """
+
     completed = serializers.SerializerMethodField()
+    content = serializers.CharField(
+        write_only=True, allow_blank=True, trim_whitespace=False
+    )
 
     class Meta:
         model = Module
-        fields = ["id", "name", "content", "photo_url", "completed"]
-        read_only_fields = ["photo_url", "completed"]
+        fields = [
+            "id",
+            "name",
+            "content",
+            "excerpt",
+            "revision",
+            "content_hash",
+            "photo_url",
+            "completed",
+        ]
+        read_only_fields = [
+            "excerpt",
+            "revision",
+            "content_hash",
+            "photo_url",
+            "completed",
+        ]
+
+    def create(self, validated_data):
+        content = validated_data.pop("content")
+        module = super().create(validated_data)
+        commit(module, content, author=self._author())
+        return module
+
+    def update(self, instance, validated_data):
+        content = validated_data.pop("content", None)
+        module = super().update(instance, validated_data)
+        if content is not None:
+            commit(module, content, author=self._author())
+        return module
+
+    def _author(self):
+        request = self.context.get("request")
+        if request and request.user.is_authenticated:
+            return request.user
+        return None
 
     def get_completed(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
+            if hasattr(obj, "is_completed"):
+                return obj.is_completed
             # Check if ModuleProgress exists and is completed
             return obj.moduleprogress_set.filter(user=request.user, completed=True).exists()
         return False
 
 
+class ModuleRevisionSerializer(serializers.ModelSerializer):
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ModuleRevision
+        fields = [
+            "number",
+            "kind",
+            "size",
+            "content_hash",
+            "author",
+            "created_at",
+            "archived",
+        ]
+
+    def get_archived(self, obj):
+        return obj.archive_key is not None
+
+
 @swagger_tags(["courses - modules"])
 class ModuleViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
@@ -40,12 +110,21 @@ class ModuleViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         course_id = self.kwargs.get("course_id")
         module_id = self.kwargs.get("module_id")
+        modules = Module.objects.select_related("course")
+        if self.request.user.is_authenticated:
+            modules = modules.annotate(
+                is_completed=Exists(
+                    ModuleProgress.objects.filter(
+                        module=OuterRef("pk"), user=self.request.user, completed=True
+                    )
+                )
+            )
         if course_id and module_id:
-            return Module.objects.filter(course__id=course_id, id=module_id)
+            return modules.filter(course__id=course_id, id=module_id)
         elif course_id:
-            return Module.objects.filter(course__id=course_id)
+            return modules.filter(course__id=course_id)
         return (
-            Module.objects.all()
+            modules.all()
         )  # incoherency cause url patterns dont allow this case but left for future extensibility
 
     def get_object(self):
@@ -75,6 +154,65 @@ class ModuleViewSet(viewsets.ModelViewSet):
         )
         return Response({'status': 'module marked as completed'})
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "revision",
+                openapi.IN_QUERY,
+                description="Revision number; the newest by default",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={200: "Content as text/plain", 304: "Not modified"},
+    )
+    @action(detail=True, methods=["get"])
+    def content(self, request, course_id=None, module_id=None):
+        """The module content, the newest revision or ?revision=, as plain text."""
+        module = self.get_object()
+        number = request.query_params.get("revision")
+        if number is None:
+            number, digest = module.revision, module.content_hash
+        else:
+            if not number.isdigit():
+                return Response({"detail": "revision must be a number."}, status=400)
+            number = int(number)
+            digest = (
+                ModuleRevision.objects.filter(module=module, number=number)
+                .values_list("content_hash", flat=True)
+                .first()
+            )
+        if not number or digest is None:
+            return Response({"detail": "No such revision."}, status=404)
+
+        # The hash names the content, so a client holding it needs no read.
+        etag = f'"{digest}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                read(module, number), content_type="text/plain; charset=utf-8"
+            )
+        response["ETag"] = etag
+        response["X-Revision"] = str(number)
+        if "revision" in request.query_params:
+            patch_cache_control(
+                response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+            )
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @swagger_auto_schema(responses={200: ModuleRevisionSerializer(many=True)})
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[IsCourseInstructor | permissions.IsAdminUser],
+    )
+    def revisions(self, request, course_id=None, module_id=None):
+        """The module's content revisions, newest first, without their content."""
+        module = self.get_object()
+        rows = module.revisions.defer("data").order_by("-number")
+        return Response(ModuleRevisionSerializer(rows, many=True).data)
+
 
 class ModuleImageView(APIView):
     permission_classes = [
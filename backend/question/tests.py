@@ -1,3 +1,17 @@
-from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from common.fixtures import build_course_fixture
+
+
+class QuestionQueryBudgetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=2, quizzes=2, questions_per_bank=10)
+
+    def test_question_list(self):
+        self.client.force_authenticate(user=self.data.teacher)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/questions/", {"page_size": 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 50)
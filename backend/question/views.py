@@ -37,7 +37,7 @@ class QuestionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Optionally filter by user permissions if needed.
         # For now, allow viewing all questions (as they are reusable).
-        return Question.objects.all()
+        return Question.objects.select_related("mcq")
 
     def perform_create(self, serializer):
         # Handle polymorphic creation if needed or just standard save
@@ -108,8 +108,8 @@ class QuestionViewSet(viewsets.ModelViewSet):
         instance.save()
         
         # Handle MultipleChoiceOption
-        if hasattr(instance, 'multiplechoiceoption'):
-            mco = instance.multiplechoiceoption
+        if hasattr(instance, 'mcq'):
+            mco = instance.mcq
             
             # Update options if provided
             options = data.get('options')
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("questionbank", "0002_questionbank_questions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="questionbank",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -6,3 +6,5 @@ class QuestionBank(models.Model):
     title = models.CharField(max_length=255)
     user = models.ForeignKey("user.User", on_delete=models.CASCADE)
     questions = models.ManyToManyField("question.Question", related_name="question_banks", blank=True)
+    # bumped whenever questions change, keys the cached ids (quiz/sampling.py)
+    version = models.PositiveIntegerField(default=0)
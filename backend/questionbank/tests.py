@@ -1,6 +1,7 @@
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
+from common.fixtures import build_course_fixture
 from question.models import MultipleChoiceOption, Question
 
 # Create your tests here.
@@ -130,3 +131,25 @@ class QuestionBankViewSetTests(APITestCase):
             f"/api/question_banks/{self.questionbank.id+1}/questions/"
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QuestionBankQueryBudgetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=2, quizzes=2, questions_per_bank=10)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.data.teacher)
+
+    def test_question_bank_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/question_banks/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["number_of_questions"], 10)
+
+    def test_question_bank_questions(self):
+        bank = self.data.banks[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/question_banks/{bank.id}/questions/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 10)
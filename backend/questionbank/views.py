@@ -1,5 +1,7 @@
+from django.db.models import Count
 from rest_framework import serializers, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
@@ -29,6 +31,8 @@ class QuestionBankSerializer(ModelSerializer):
         read_only_fields = ["id", "number_of_questions"]
 
     def get_number_of_questions(self, obj):
+        if hasattr(obj, "questions_count"):
+            return obj.questions_count
         return obj.questions.count()
 
     def get_questions(self, obj):
@@ -89,7 +93,7 @@ class QuestionBankViewSet(ModelViewSet):
             qbs = QuestionBank.objects.filter(user=self.request.user)
         if question_bank_id:
             qbs = qbs.filter(id=question_bank_id)
-        return qbs
+        return qbs.annotate(questions_count=Count("questions"))
 
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
@@ -97,6 +101,6 @@ class QuestionBankViewSet(ModelViewSet):
     @action(detail=True, methods=["get"])
     def questions(self, request, question_bank_id=None):
         bank = self.get_object()
-        questions = bank.questions.all()
+        questions = bank.questions.select_related("mcq")
         serializer = FullQuestionSerializer(questions, many=True)
         return Response(serializer.data)
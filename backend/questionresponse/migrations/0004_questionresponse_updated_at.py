@@ -0,0 +1,18 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("questionresponse", "0003_questionresponse_selected_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="questionresponse",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("questionresponse", "0004_questionresponse_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Concurrent submits could race update_or_create; keep the newest row.
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM questionresponse_questionresponse older
+                USING questionresponse_questionresponse newer
+                WHERE older.user_id = newer.user_id
+                  AND older.question_id = newer.question_id
+                  AND older.id < newer.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=[
+                        # leftover of an interrupted build would be INVALID
+                        "DROP INDEX CONCURRENTLY IF EXISTS "
+                        "questionresponse_user_question_uniq",
+                        "CREATE UNIQUE INDEX CONCURRENTLY "
+                        "questionresponse_user_question_uniq "
+                        "ON questionresponse_questionresponse (user_id, question_id)",
+                        "ALTER TABLE questionresponse_questionresponse "
+                        "ADD CONSTRAINT questionresponse_user_question_uniq "
+                        "UNIQUE USING INDEX questionresponse_user_question_uniq",
+                    ],
+                    reverse_sql=[
+                        "ALTER TABLE questionresponse_questionresponse "
+                        "DROP CONSTRAINT questionresponse_user_question_uniq",
+                    ],
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name="questionresponse",
+                    constraint=models.UniqueConstraint(
+                        fields=("user", "question"),
+                        name="questionresponse_user_question_uniq",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="questionresponse",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
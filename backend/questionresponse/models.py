@@ -4,7 +4,8 @@ from django.db import models
 # Create your models here.
 class QuestionResponse(models.Model):
     question = models.ForeignKey("question.Question", on_delete=models.CASCADE)
-    user = models.ForeignKey("user.User", on_delete=models.CASCADE)
+    # user_id lookups are served by the leading column of the unique index
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE, db_index=False)
     response_text = models.TextField(null=True, blank=True)
     selected_option = models.PositiveSmallIntegerField(
         null=True, blank=True
@@ -12,3 +13,11 @@ class QuestionResponse(models.Model):
     selected_options = models.JSONField(default=list, blank=True, help_text="List of selected option indices (1-based) for multiple choice")
     instructor_comment = models.TextField(null=True, blank=True)
     points = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "question"], name="questionresponse_user_question_uniq"
+            )
+        ]
@@ -1,3 +1,145 @@
+import json
+
+from django.db import IntegrityError, connection
+from django.db.models import Exists, OuterRef
 from django.test import TestCase
 
-# Create your tests here.
+from course.models import Course, CourseProgress
+from course.progress import annotate_progress
+from module.models import Module, ModuleProgress
+from question.models import MultipleChoiceOption, Question
+from questionbank.models import QuestionBank
+from quiz.models import Quiz
+from quiz.scoring import quiz_submissions
+from user.models import ACTIVE_STUDENT, User
+
+from .models import QuestionResponse
+
+
+def scanned_tables(queryset, node_type):
+    """Tables read with a `node_type` node in the plan of `queryset`."""
+    plan = json.loads(queryset.explain(format="json"))
+    found = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == node_type:
+            found.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+def used_indexes(queryset):
+    """Names of the indexes read in the plan of `queryset`."""
+    plan = json.loads(queryset.explain(format="json"))
+    found = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            found.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+class HotQueryPlanTests(TestCase):
+    """
+    With sequential scans priced out the planner only falls back to one when
+    no index can serve the query, so any Seq Scan left means a missing index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username="teacher", is_teacher=True)
+        cls.student = User.objects.create_user(username="student")
+        cls.course = Course.objects.create(
+            title="Course", description="", instructor=teacher
+        )
+        CourseProgress.objects.create(user=cls.student, course=cls.course)
+        module = Module.objects.create(name="Module", content="", course=cls.course)
+        ModuleProgress.objects.create(user=cls.student, module=module, completed=True)
+        cls.question = Question.objects.create(text="Why?", is_open_ended=True)
+        choice = Question.objects.create(text="Which?", is_open_ended=False)
+        MultipleChoiceOption.objects.create(
+            question=choice,
+            option1="a",
+            option2="b",
+            option3="c",
+            option4="d",
+            correct_option=1,
+        )
+        bank = QuestionBank.objects.create(title="Bank", user=teacher)
+        bank.questions.add(cls.question, choice)
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=5, course=cls.course
+        )
+        cls.quiz.question_banks.add(bank)
+        QuestionResponse.objects.create(user=cls.student, question=cls.question)
+        QuestionResponse.objects.create(
+            user=cls.student, question=choice, selected_option=1
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertNoSeqScan(self, queryset):
+        self.assertEqual(scanned_tables(queryset, "Seq Scan"), set())
+
+    def test_response_lookups(self):
+        question_ids = Question.objects.filter(
+            question_banks__quiz=self.quiz
+        ).values_list("id", flat=True)
+        # review / get_is_finished
+        self.assertNoSeqScan(
+            QuestionResponse.objects.filter(
+                user=self.student, question_id__in=list(question_ids)
+            )
+        )
+        # submit
+        submit = QuestionResponse.objects.filter(
+            question=self.question, user=self.student
+        )
+        self.assertNoSeqScan(submit)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, QuestionResponse._meta.db_table
+            )
+        constraint = constraints["questionresponse_user_question_uniq"]
+        self.assertEqual(constraint["columns"], ["user_id", "question_id"])
+        self.assertTrue(constraint["unique"])
+        # submissions, scored through the multiple choice join
+        submissions = quiz_submissions(self.quiz)
+        self.assertNoSeqScan(submissions)
+        self.assertIn(
+            "question_multiplechoiceoption_question_id_key", used_indexes(submissions)
+        )
+        self.assertEqual(list(submissions.values_list("answered", "score")), [(2, 1)])
+
+    def test_progress_lookups(self):
+        # get_progress
+        self.assertNoSeqScan(self.course.courseprogress_set.filter(user=self.student))
+        self.assertNoSeqScan(
+            ModuleProgress.objects.filter(
+                user=self.student, module__course=self.course, completed=True
+            )
+        )
+        self.assertNoSeqScan(Course.objects.filter(courseprogress__user=self.student))
+        self.assertNoSeqScan(
+            annotate_progress(self.course.courseprogress_set.select_related("user"))
+        )
+
+    def test_eligible_students_anti_join(self):
+        self.assertNoSeqScan(
+            User.objects.filter(ACTIVE_STUDENT).filter(
+                ~Exists(
+                    CourseProgress.objects.filter(
+                        course=self.course, user=OuterRef("pk")
+                    )
+                )
+            )
+        )
+
+    def test_duplicate_response_rejected(self):
+        with self.assertRaises(IntegrityError):
+            QuestionResponse.objects.create(user=self.student, question=self.question)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QuizConfig(AppConfig):
     name = "quiz"
+
+    def ready(self):
+        # keeps the cached question ids of banks in step with the banks
+        from . import sampling  # noqa: F401
@@ -0,0 +1,189 @@
+"""
+Async versions of the quiz-taking endpoints, on the async ORM.
+
+Served by an ASGI server (see backend/asgi.py) a student waiting on
+Postgres holds no worker thread, only a coroutine, so one process can keep
+thousands of requests in flight when an exam starts. The payloads match
+QuizViewSet's questions, autosave, submit and review actions.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from common.fastjson import dumps, loads
+from question.models import Question
+from questionresponse.models import QuestionResponse
+
+from .attempts import attempt_session, expired, seal
+from .autosave import buffer as autosave_buffer
+from .models import Quiz
+from .responses import UPSERT, build_responses
+from .sampling import in_order, option_seed, served_question_ids
+from .scoring import quiz_finished, quiz_question_ids, quiz_questions, review_data
+from .serializers import QuestionSerializer
+from .views import visible_quizzes
+
+
+def _json(data, status=200):
+    # rendered like DRF's responses, so decimals and dates come out the same
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def jwt_view(view):
+    """JWT authentication and IsAuthenticated for an async view, as in DRF."""
+
+    @csrf_exempt
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+            response = _json(detail, status=401)
+        else:
+            if result is not None:
+                request.user = result[0]
+                return await view(request, *args, **kwargs)
+            response = _json(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+    return wrapper
+
+
+async def _get_quiz(request, pk):
+    return await visible_quizzes(request.user).filter(pk=pk).afirst()
+
+
+def _not_found():
+    return _json({"detail": "No Quiz matches the given query."}, status=404)
+
+
+def _payload(request):
+    try:
+        return loads(request.body or b"{}"), None
+    except ValueError as e:
+        return None, _json({"detail": f"JSON parse error - {e}"}, status=400)
+
+
+@require_GET
+@jwt_view
+async def questions(request, pk):
+    user = request.user
+    quiz = await _get_quiz(request, pk)
+    if quiz is None:
+        return _not_found()
+    if not (user.is_staff or getattr(user, "is_teacher", False)):
+        await sync_to_async(attempt_session)(user, quiz)
+    ids = await sync_to_async(served_question_ids)(quiz, user)
+    questions = in_order(
+        [question async for question in quiz_questions(quiz, ids)], ids
+    )
+    # select_related already loaded everything the serializer reads.
+    context = {"option_seed": option_seed(quiz, user)}
+    return _json(QuestionSerializer(questions, many=True, context=context).data)
+
+
+@require_POST
+@jwt_view
+async def submit(request, pk):
+    quiz = await _get_quiz(request, pk)
+    if quiz is None:
+        return _not_found()
+    payload, error = _payload(request)
+    if error:
+        return error
+    session = await sync_to_async(attempt_session)(request.user, quiz)
+    if session["submitted"]:
+        return _json({"error": "Quiz already submitted."}, status=409)
+    if expired(session):
+        await sync_to_async(seal)(request.user, quiz)
+        return _json({"error": "Time limit exceeded."}, status=403)
+    if "responses" in payload:
+        ids = await sync_to_async(served_question_ids)(quiz, request.user)
+        questions = Question.objects.filter(
+            id__in=quiz_question_ids(quiz) if ids is None else ids
+        ).only("id", "is_open_ended")
+        rows = build_responses(
+            request.user,
+            [question async for question in questions],
+            payload["responses"],
+        )
+        await QuestionResponse.objects.abulk_create(rows, **UPSERT)
+    await sync_to_async(seal)(request.user, quiz)
+    return _json({"status": "submitted"})
+
+
+@require_POST
+@jwt_view
+async def autosave(request, pk):
+    quiz = await _get_quiz(request, pk)
+    if quiz is None:
+        return _not_found()
+    payload, error = _payload(request)
+    if error:
+        return error
+    answers = payload.get("responses", [])
+
+    question_ids = {answer.get("question_id") for answer in answers}
+    if not all(type(question_id) is int for question_id in question_ids):
+        return _json({"error": "question_id must be an integer."}, status=400)
+    ids = await sync_to_async(served_question_ids)(quiz, request.user)
+    questions = (
+        Question.objects.filter(id__in=quiz_question_ids(quiz) if ids is None else ids)
+        .filter(id__in=question_ids)
+        .only("id", "is_open_ended")
+    )
+    questions = [question async for question in questions]
+    if len(questions) != len(question_ids):
+        return _json({"error": "Question not in this quiz."}, status=400)
+
+    session = await sync_to_async(attempt_session)(request.user, quiz)
+    if session["submitted"]:
+        return _json({"error": "Quiz already submitted."}, status=409)
+    if expired(session):
+        return _json({"error": "Time limit exceeded."}, status=403)
+
+    # A flush may run in here, so off the event loop.
+    await sync_to_async(autosave_buffer.add)(
+        quiz.id, build_responses(request.user, questions, answers)
+    )
+    return _json({"status": "saved", "saved": len(questions)}, status=202)
+
+
+@require_GET
+@jwt_view
+async def review(request, pk):
+    user = request.user
+    quiz = await _get_quiz(request, pk)
+    if quiz is None:
+        return _not_found()
+
+    if not (user.is_staff or getattr(user, "is_teacher", False)):
+        question_ids = quiz_question_ids(quiz)
+        if not await question_ids.aexists():
+            return _json({"error": "Quiz has no questions."}, status=404)
+        finished = Quiz.objects.filter(pk=quiz.pk).filter(quiz_finished(user))
+        if not await finished.aexists():
+            return _json({"error": "You must complete the quiz first."}, status=403)
+        if not quiz.show_correct_answers_on_completion:
+            return _json({"error": "Review not allowed for this quiz."}, status=403)
+
+    ids = await sync_to_async(served_question_ids)(quiz, user)
+    questions = in_order(
+        [question async for question in quiz_questions(quiz, ids)], ids
+    )
+    responses = QuestionResponse.objects.filter(
+        user=user, question_id__in=[question.id for question in questions]
+    )
+    responses_map = {response.question_id: response async for response in responses}
+    return _json(review_data(quiz, user, questions, responses_map))
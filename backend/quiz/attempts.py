@@ -0,0 +1,125 @@
+"""
+Attempt sessions: the server's side of the quiz timer.
+
+Opening a quiz starts the student's attempt with a deadline
+time_limit_in_minutes away. Autosaves and submits are checked against a
+cached copy of the attempt, so the check costs no query, and
+close_expired_attempts seals in bulk the attempts nobody submitted in
+time. Configured by settings.QUIZ_ATTEMPTS; GRACE_SECONDS covers the trip
+of a submit sent just as the clock runs out.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .autosave import buffer as autosave_buffer
+from .models import QuizAttempt
+from .sampling import question_seed
+
+
+def _config():
+    return getattr(settings, "QUIZ_ATTEMPTS", {})
+
+
+def _key(user_id, quiz_id):
+    return f"quiz-attempt:{user_id}:{quiz_id}"
+
+
+def _session(attempt):
+    return {
+        "started_at": attempt.started_at.timestamp(),
+        "deadline": attempt.deadline.timestamp() if attempt.deadline else None,
+        "seed": attempt.seed,
+        "submitted": attempt.submitted_at is not None,
+    }
+
+
+def attempt_session(user, quiz):
+    """
+    The student's attempt at `quiz` as a dict of started_at and deadline
+    (epoch seconds, deadline None without a time limit), seed and
+    submitted. Starts the attempt if there is none yet.
+    """
+    key = _key(user.id, quiz.id)
+    session = cache.get(key)
+    if session is None:
+        limit = quiz.time_limit_in_minutes
+        attempt, _ = QuizAttempt.objects.get_or_create(
+            user=user,
+            quiz=quiz,
+            defaults={
+                "deadline": (
+                    timezone.now() + timedelta(minutes=limit) if limit else None
+                ),
+                "seed": question_seed(quiz.id, user.id),
+            },
+        )
+        session = _session(attempt)
+        cache.set(key, session, _config().get("CACHE_TIMEOUT", 3600))
+    return session
+
+
+def seconds_left(session, now=None):
+    """Seconds until the deadline, None without a time limit."""
+    if session["deadline"] is None:
+        return None
+    return max(0, session["deadline"] - (now or time.time()))
+
+
+def expired(session, now=None):
+    """
+    Whether the deadline and the grace period after it have passed. A
+    cached session may still say open after close_expired_attempts sealed
+    it elsewhere, but never past its deadline.
+    """
+    if session["deadline"] is None:
+        return False
+    grace = _config().get("GRACE_SECONDS", 30)
+    return (now or time.time()) > session["deadline"] + grace
+
+
+def seal(user, quiz):
+    """
+    Writes the student's buffered answers and marks the attempt submitted,
+    keeping the time of an earlier seal.
+    """
+    autosave_buffer.flush(user.id, quiz.id)
+    QuizAttempt.objects.filter(user=user, quiz=quiz, submitted_at__isnull=True).update(
+        submitted_at=timezone.now()
+    )
+    key = _key(user.id, quiz.id)
+    session = cache.get(key)
+    if session is not None:
+        cache.set(
+            key, session | {"submitted": True}, _config().get("CACHE_TIMEOUT", 3600)
+        )
+
+
+def reopen(user, quiz):
+    """Undoes `seal`, so tools such as bench can submit the same attempt again."""
+    QuizAttempt.objects.filter(user=user, quiz=quiz).update(submitted_at=None)
+    cache.delete(_key(user.id, quiz.id))
+
+
+def close_expired_attempts(batch_size=1000):
+    """
+    Seals the open attempts whose deadline and grace period have passed, in
+    batches of `batch_size`. Answers received before that stay, as the
+    autosave buffers only refuse answers received after the seal. Returns
+    the number of attempts closed.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=_config().get("GRACE_SECONDS", 30))
+    expired_attempts = QuizAttempt.objects.filter(
+        submitted_at__isnull=True, deadline__lt=cutoff
+    )
+    closed = 0
+    while True:
+        ids = list(expired_attempts.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return closed
+        closed += expired_attempts.filter(id__in=ids).update(submitted_at=now)
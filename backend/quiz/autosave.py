@@ -0,0 +1,172 @@
+"""
+Autosave of quizzes in progress.
+
+Students' answers arrive a question at a time, several times a second
+while they type. Rather than a write per edit they wait in a per-process
+buffer that keeps only the latest answer to each question and goes out
+in one upsert every FLUSH_INTERVAL seconds, or as soon as MAX_PENDING
+answers are waiting. Submitting writes the student's buffered answers
+first, then seals the attempt. Configured by settings.QUIZ_AUTOSAVE;
+a FLUSH_INTERVAL of 0 writes every autosave straight through.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from questionresponse.models import QuestionResponse
+
+from .models import QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+# Rows carry the time the server received the answer and only ever move
+# forward in time: when several workers buffer edits of the same student,
+# the one flushing last must not undo a newer edit. Nothing received
+# after its attempt was sealed is written.
+FLUSH_SQL = """
+INSERT INTO {responses} AS r
+    (user_id, question_id, response_text, selected_option, selected_options,
+     points, updated_at)
+SELECT v.user_id, v.question_id, v.response_text, v.selected_option,
+       v.selected_options::jsonb, 0, v.updated_at
+FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[], %s::text[],
+            %s::integer[], %s::text[], %s::timestamptz[])
+    AS v(user_id, quiz_id, question_id, response_text, selected_option,
+         selected_options, updated_at)
+WHERE NOT EXISTS (
+    SELECT 1 FROM {attempts} a
+    WHERE a.user_id = v.user_id AND a.quiz_id = v.quiz_id
+        AND a.submitted_at < v.updated_at
+)
+ON CONFLICT (user_id, question_id) DO UPDATE SET
+    response_text = EXCLUDED.response_text,
+    selected_option = EXCLUDED.selected_option,
+    selected_options = EXCLUDED.selected_options,
+    updated_at = EXCLUDED.updated_at
+WHERE r.updated_at IS NULL OR r.updated_at <= EXCLUDED.updated_at
+"""
+
+
+def _config():
+    return getattr(settings, "QUIZ_AUTOSAVE", {})
+
+
+def _write(entries):
+    columns = [[] for _ in range(7)]
+    for quiz_id, response, received in entries:
+        values = (
+            response.user_id,
+            quiz_id,
+            response.question_id,
+            response.response_text,
+            response.selected_option,
+            json.dumps(response.selected_options),
+            received,
+        )
+        for column, value in zip(columns, values):
+            column.append(value)
+    sql = FLUSH_SQL.format(
+        responses=QuestionResponse._meta.db_table,
+        attempts=QuizAttempt._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, columns)
+
+
+class AutosaveBuffer:
+    """
+    Answers waiting to be written, latest per (user, question). Flushed
+    by a daemon thread started with the first autosave, on submit for the
+    submitting student, and when the process exits.
+    """
+
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self._flush_at_exit)
+
+    def _reset(self):
+        # A forked worker starts empty, with a flusher of its own.
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, quiz_id, responses):
+        """Buffers unsaved QuestionResponses answering questions of the quiz."""
+        received = timezone.now()
+        config = _config()
+        with self._lock:
+            for response in responses:
+                key = (response.user_id, response.question_id)
+                self._pending[key] = (quiz_id, response, received)
+            full = len(self._pending) >= config.get("MAX_PENDING", 1000)
+        interval = config.get("FLUSH_INTERVAL", 2.0)
+        if full or interval <= 0:
+            self.flush()
+        elif self._flusher is None:
+            self._start_flusher(interval)
+
+    def flush(self, user_id=None, quiz_id=None):
+        """
+        Writes out everything, or only what one student answered in one
+        quiz, in a single statement. Returns the number of answers written.
+        """
+        with self._lock:
+            if user_id is None:
+                entries, self._pending = self._pending, {}
+            else:
+                entries = {
+                    key: self._pending.pop(key)
+                    for key, (quiz, _, _) in list(self._pending.items())
+                    if key[0] == user_id and quiz == quiz_id
+                }
+        if not entries:
+            return 0
+        try:
+            _write(entries.values())
+        except Exception:
+            # Keep them for the next flush, unless edited again meanwhile.
+            with self._lock:
+                for key, entry in entries.items():
+                    self._pending.setdefault(key, entry)
+            raise
+        return len(entries)
+
+    def _start_flusher(self, interval):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._run, args=(interval,), name="quiz-autosave", daemon=True
+            )
+        self._flusher.start()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing %d autosaved answers failed", len(self))
+            finally:
+                close_old_connections()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Lost %d autosaved answers at exit", len(self))
+
+
+buffer = AutosaveBuffer()
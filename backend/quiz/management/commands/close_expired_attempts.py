@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.attempts import close_expired_attempts
+
+
+class Command(BaseCommand):
+    help = (
+        "Submits the quiz attempts whose time ran out, with the answers "
+        "autosaved in time. Run it periodically, or once with --loop next "
+        "to the app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping instead of closing the expired attempts once.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="Seconds between sweeps (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed = close_expired_attempts(batch_size=options["batch_size"])
+            if closed or not options["loop"]:
+                self.stdout.write(f"Closed {closed} expired attempts")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,33 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+import quiz.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0003_quizattempt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quizattempt",
+            name="deadline",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="quizattempt",
+            name="seed",
+            field=models.PositiveIntegerField(default=quiz.models.new_attempt_seed),
+        ),
+        migrations.AddIndex(
+            model_name="quizattempt",
+            index=models.Index(
+                condition=models.Q(("submitted_at__isnull", True)),
+                fields=["deadline"],
+                name="quizattempt_open_deadline_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0004_quizattempt_deadline_seed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quiz",
+            name="questions_per_bank",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="quiz",
+            name="shuffle_options",
+            field=models.BooleanField(default=False),
+        ),
+    ]
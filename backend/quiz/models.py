@@ -1,3 +1,5 @@
+import random
+
 from django.db import models
 
 
@@ -7,7 +9,48 @@ class Quiz(models.Model):
     description = models.TextField()
     time_limit_in_minutes = models.PositiveSmallIntegerField()
     randomize_question_order = models.BooleanField(default=False)
+    # Draw this many questions from each bank per student (all when empty)
+    questions_per_bank = models.PositiveSmallIntegerField(null=True, blank=True)
+    shuffle_options = models.BooleanField(default=False)
     show_correct_answers_on_completion = models.BooleanField(default=False)
     question_banks = models.ManyToManyField("questionbank.QuestionBank")
     course = models.ForeignKey("course.Course", on_delete=models.CASCADE)
-    module = models.ForeignKey("module.Module", on_delete=models.SET_NULL, null=True, blank=True)
+    module = models.ForeignKey(
+        "module.Module", on_delete=models.SET_NULL, null=True, blank=True
+    )
+
+
+def new_attempt_seed():
+    return random.getrandbits(31)
+
+
+class QuizAttempt(models.Model):
+    """
+    A student's run through a quiz: started when the student opens it,
+    sealed by submit or, once the deadline has passed, by
+    close_expired_attempts. Answers of a sealed attempt no longer change.
+    """
+
+    # user_id lookups are served by the leading column of the unique index
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE, db_index=False)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    # None when the quiz has no time limit
+    deadline = models.DateTimeField(null=True, blank=True)
+    seed = models.PositiveIntegerField(default=new_attempt_seed)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quiz"], name="quizattempt_user_quiz_uniq"
+            )
+        ]
+        indexes = [
+            # the sweeper's open attempts by deadline
+            models.Index(
+                fields=["deadline"],
+                condition=models.Q(submitted_at__isnull=True),
+                name="quizattempt_open_deadline_idx",
+            )
+        ]
@@ -0,0 +1,37 @@
+from questionresponse.models import QuestionResponse
+
+# One INSERT ... ON CONFLICT per submission; grading is left untouched.
+UPSERT = {
+    "update_conflicts": True,
+    "unique_fields": ["user", "question"],
+    "update_fields": [
+        "response_text",
+        "selected_option",
+        "selected_options",
+        "updated_at",
+    ],
+}
+
+
+def build_responses(user, questions, answers):
+    """
+    Unsaved responses of `user` to `questions` from a submitted
+    [{question_id, answer}] list; unanswered questions get empty answers.
+    `answer` is text for open questions, an option number for single and a
+    list of option numbers for multiple choice.
+    """
+    submitted = {answer.get("question_id"): answer.get("answer") for answer in answers}
+    rows = []
+    for question in questions:
+        val = submitted.get(question.id)
+        defaults = {}
+        if question.is_open_ended:
+            defaults["response_text"] = str(val) if val is not None else ""
+        elif isinstance(val, list):
+            defaults["selected_options"] = val
+            defaults["selected_option"] = None
+        else:
+            defaults["selected_option"] = int(val) if val is not None else None
+            defaults["selected_options"] = []
+        rows.append(QuestionResponse(question=question, user=user, **defaults))
+    return rows
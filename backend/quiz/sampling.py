@@ -0,0 +1,137 @@
+"""
+Which questions a student gets, and in which order.
+
+A quiz with questions_per_bank draws that many questions from each of its
+banks; randomize_question_order and shuffle_options shuffle the questions
+and their options. All of it is seeded by (quiz, student), so a student
+sees the same quiz on every reload and in the review, and nothing about
+the draw has to be stored. A bank's draw is the questions ranking first by
+a hash of (seed, question id), rather than ORDER BY random(): adding or
+removing a question only changes the draws it ranks in.
+
+The question ids of each bank are cached under the bank's version, which
+the database bumps on every membership change, so no worker keeps serving
+ids another worker has invalidated.
+"""
+
+import hashlib
+import heapq
+import random
+
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from questionbank.models import QuestionBank
+
+# Stale versions are never read again; this only bounds how long they
+# take up room in the cache.
+CACHE_TIMEOUT = 3600
+
+
+def question_seed(quiz_id, user_id):
+    digest = hashlib.blake2b(f"{quiz_id}:{user_id}".encode(), digest_size=4)
+    return int.from_bytes(digest.digest(), "big") >> 1
+
+
+def _bank_key(bank_id, version):
+    return f"bank-questions:{bank_id}:{version}"
+
+
+def bank_question_ids(quiz):
+    """{bank id: sorted question ids} for the banks of `quiz`, from the cache."""
+    versions = dict(
+        QuestionBank.objects.filter(quiz=quiz)
+        .order_by("id")
+        .values_list("id", "version")
+    )
+    keys = {
+        bank_id: _bank_key(bank_id, version) for bank_id, version in versions.items()
+    }
+    cached = cache.get_many(keys.values())
+    missing = [bank_id for bank_id, key in keys.items() if key not in cached]
+    if missing:
+        fresh = {bank_id: [] for bank_id in missing}
+        rows = (
+            QuestionBank.questions.through.objects.filter(questionbank_id__in=missing)
+            .order_by("question_id")
+            .values_list("questionbank_id", "question_id")
+        )
+        for bank_id, question_id in rows:
+            fresh[bank_id].append(question_id)
+        fresh = {keys[bank_id]: ids for bank_id, ids in fresh.items()}
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        cached.update(fresh)
+    return {bank_id: cached[key] for bank_id, key in keys.items()}
+
+
+def _rank(seed, question_id):
+    digest = hashlib.blake2b(f"{seed}:{question_id}".encode(), digest_size=8)
+    return digest.digest()
+
+
+def draw(banks, per_bank, seed):
+    """
+    `per_bank` ids from each of `banks` ({bank id: ids}), the same ones for
+    the same seed. A question held by several banks counts once.
+    """
+    drawn = {}
+    for ids in banks.values():
+        ranked = heapq.nsmallest(per_bank, ids, key=lambda id: _rank(seed, id))
+        for question_id in ranked:
+            drawn.setdefault(question_id, None)
+    return list(drawn)
+
+
+def served_question_ids(quiz, user):
+    """
+    Ids of the questions `user` gets in `quiz`, in the order they get
+    them. None for a quiz that serves all its questions in id order.
+    """
+    if not (quiz.questions_per_bank or quiz.randomize_question_order):
+        return None
+    seed = question_seed(quiz.id, user.id)
+    banks = bank_question_ids(quiz)
+    if quiz.questions_per_bank:
+        ids = sorted(draw(banks, quiz.questions_per_bank, seed))
+    else:
+        ids = sorted({question_id for ids in banks.values() for question_id in ids})
+    if quiz.randomize_question_order:
+        random.Random(seed).shuffle(ids)
+    return ids
+
+
+def in_order(questions, ids):
+    """`questions` in the order of `ids` from served_question_ids."""
+    if ids is None:
+        return questions
+    position = {question_id: i for i, question_id in enumerate(ids)}
+    return sorted(questions, key=lambda question: position[question.id])
+
+
+def option_seed(quiz, user):
+    """Seed for shuffled_options, None when the quiz keeps options in order."""
+    return question_seed(quiz.id, user.id) if quiz.shuffle_options else None
+
+
+def shuffled_options(options, seed, question_id):
+    """Options of a question in the student's order; ids stay as they are."""
+    if seed is None:
+        return options
+    options = list(options)
+    random.Random(f"{seed}:q{question_id}").shuffle(options)
+    return options
+
+
+@receiver(m2m_changed, sender=QuestionBank.questions.through)
+def _bank_questions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        banks = QuestionBank.objects.filter(pk=instance.pk)
+    elif reverse and action in ("post_add", "post_remove"):
+        banks = QuestionBank.objects.filter(pk__in=pk_set)
+    elif reverse and action == "pre_clear":
+        banks = instance.question_banks.all()
+    else:
+        return
+    banks.update(version=F("version") + 1)
@@ -0,0 +1,189 @@
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    Exists,
+    F,
+    JSONField,
+    Max,
+    OuterRef,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from question.models import Question
+from questionresponse.models import QuestionResponse
+
+from .models import QuizAttempt
+from .sampling import option_seed, shuffled_options
+
+MC = "question__mcq__"
+
+
+def is_correct():
+    """
+    1 when a response matches its multiple choice key, else 0. Same rule as
+    the review: multiple-select answers compare as sets, open questions are
+    never auto-correct.
+    """
+    correct_options = Coalesce(
+        F(f"{MC}correct_options"), Value([], output_field=JSONField())
+    )
+    return Case(
+        When(
+            Q(**{f"{MC}is_multiple_choice": True})
+            & Q(selected_options__contains=correct_options)
+            & Q(selected_options__contained_by=correct_options),
+            then=Value(1),
+        ),
+        When(
+            Q(**{f"{MC}is_multiple_choice": False})
+            & Q(selected_option=F(f"{MC}correct_option")),
+            then=Value(1),
+        ),
+        default=Value(0),
+    )
+
+
+def response_points():
+    """Stored points, or 1 for a correct answer that has not been graded yet."""
+    return Case(
+        When(points=0, then=is_correct()),
+        default=F("points"),
+        output_field=DecimalField(max_digits=6, decimal_places=2),
+    )
+
+
+def quiz_question_ids(quiz):
+    """Ids of the questions in any bank of `quiz`, as a subquery."""
+    return Question.objects.filter(question_banks__quiz=quiz).values("id")
+
+
+def quiz_questions(quiz, ids=None):
+    """
+    Questions of `quiz`, each listed once even if several of its banks hold
+    it, with the multiple choice part loaded in the same query. `ids`
+    narrows them to a student's draw (see sampling.served_question_ids).
+    """
+    return (
+        Question.objects.filter(id__in=quiz_question_ids(quiz) if ids is None else ids)
+        .select_related("mcq")
+        .order_by("id")
+    )
+
+
+def quiz_finished(user, quiz=OuterRef("pk")):
+    """
+    Whether `user` has finished `quiz` (the outer Quiz by default): a
+    submitted attempt, or for quizzes taken before attempts were recorded,
+    any response to one of its questions outside an attempt.
+    """
+    attempts = QuizAttempt.objects.filter(user=user, quiz=quiz)
+    legacy = QuestionResponse.objects.filter(
+        user=user, question__question_banks__quiz=quiz
+    )
+    return Exists(attempts.filter(submitted_at__isnull=False)) | (
+        Exists(legacy) & ~Exists(attempts)
+    )
+
+
+def quiz_submissions(quiz):
+    """
+    One row per student who answered `quiz`: answer count, preliminary
+    score and last activity, grouped in the database.
+    """
+    return (
+        QuestionResponse.objects.filter(question_id__in=quiz_question_ids(quiz))
+        .values("user_id", "user__name", "user__surname", "user__email")
+        .annotate(
+            answered=Count("id"),
+            score=Sum(response_points()),
+            last_activity=Max("updated_at"),
+        )
+    )
+
+
+def _question_type(question):
+    if not hasattr(question, "mcq"):
+        return "open"
+    if question.mcq.is_multiple_choice:
+        return "multiple_choice"
+    return "single_choice"
+
+
+def _answer_is_correct(question, response):
+    if not hasattr(question, "mcq"):
+        return False
+    mc = question.mcq
+    if mc.is_multiple_choice:
+        return set(response.selected_options or []) == set(mc.correct_options or [])
+    return response.selected_option == mc.correct_option
+
+
+def review_data(quiz, student, questions, responses):
+    """
+    A student's review of `quiz`: the questions with their answer keys and
+    the student's responses (by question id), scored like `response_points`.
+    Builds no queries, so sync and async views share it.
+    """
+    questions_data = []
+    responses_data = []
+    score = 0
+    seed = option_seed(quiz, student)
+    for q in questions:
+        q_data = {"id": q.id, "text": q.text, "type": _question_type(q)}
+        if hasattr(q, "mcq"):
+            mc = q.mcq
+
+            def check_correct(idx):
+                if mc.is_multiple_choice and mc.correct_options:
+                    return idx in mc.correct_options
+                return mc.correct_option == idx
+
+            q_data["options"] = shuffled_options(
+                [
+                    {"id": idx, "text": text, "is_correct": check_correct(idx)}
+                    for idx, text in enumerate(
+                        [mc.option1, mc.option2, mc.option3, mc.option4], start=1
+                    )
+                ],
+                seed,
+                q.id,
+            )
+        else:
+            q_data["correct_answer"] = "To do: model override"
+        questions_data.append(q_data)
+
+        resp = responses.get(q.id)
+        if resp is None:
+            continue
+        is_correct = _answer_is_correct(q, resp)
+        # Basic auto-grading if points not set manually
+        points = resp.points
+        if points == 0 and is_correct:
+            points = 1
+        score += points
+        responses_data.append(
+            {
+                "response_id": resp.id,
+                "question_id": q.id,
+                "selected_option_id": resp.selected_option,
+                "selected_options": resp.selected_options,
+                "text_response": resp.response_text,
+                "is_correct": is_correct,
+                "points": points,
+                "instructor_comment": resp.instructor_comment,
+            }
+        )
+
+    return {
+        "quiz_title": quiz.title,
+        "student_name": f"{student.name} {student.surname}",
+        "score": score,
+        "total_questions": len(questions),
+        "questions": questions_data,
+        "responses": responses_data,
+    }
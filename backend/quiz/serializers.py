@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Quiz
 from question.models import Question, MultipleChoiceOption
-from questionresponse.models import QuestionResponse
+from .sampling import shuffled_options
+from .scoring import quiz_finished
 
 class QuestionSerializer(serializers.ModelSerializer):
     options = serializers.SerializerMethodField()
@@ -12,21 +13,22 @@ class QuestionSerializer(serializers.ModelSerializer):
         fields = ['id', 'text', 'is_open_ended', 'type', 'options']
 
     def get_type(self, obj):
-        if hasattr(obj, 'multiplechoiceoption'):
-            if obj.multiplechoiceoption.is_multiple_choice:
+        if hasattr(obj, 'mcq'):
+            if obj.mcq.is_multiple_choice:
                 return 'multiple_choice'
             return 'single_choice'
         return 'open'
 
     def get_options(self, obj):
-        if hasattr(obj, 'multiplechoiceoption'):
-            mc = obj.multiplechoiceoption
-            return [
+        if hasattr(obj, 'mcq'):
+            mc = obj.mcq
+            # Students may see them shuffled, see sampling.option_seed
+            return shuffled_options([
                 {'id': 1, 'text': mc.option1},
                 {'id': 2, 'text': mc.option2},
                 {'id': 3, 'text': mc.option3},
                 {'id': 4, 'text': mc.option4},
-            ]
+            ], self.context.get('option_seed'), obj.id)
         return None
 
 class FullQuestionSerializer(QuestionSerializer):
@@ -37,13 +39,13 @@ class FullQuestionSerializer(QuestionSerializer):
         fields = QuestionSerializer.Meta.fields + ['correct_option', 'correct_options', 'tags']
 
     def get_correct_option(self, obj):
-        if hasattr(obj, 'multiplechoiceoption'):
-            return obj.multiplechoiceoption.correct_option
+        if hasattr(obj, 'mcq'):
+            return obj.mcq.correct_option
         return None
 
     def get_correct_options(self, obj):
-        if hasattr(obj, 'multiplechoiceoption'):
-            return obj.multiplechoiceoption.correct_options
+        if hasattr(obj, 'mcq'):
+            return obj.mcq.correct_options
         return None
 
 
@@ -58,6 +60,8 @@ class QuizSerializer(serializers.ModelSerializer):
             "description", 
             "time_limit_in_minutes", 
             "randomize_question_order", 
+            "questions_per_bank",
+            "shuffle_options",
             "show_correct_answers_on_completion", 
             "question_banks", 
             "course",
@@ -69,18 +73,9 @@ class QuizSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
-            
-        # Get all questions in the quiz
-        # This logic finds if there is ANY response for any question in the quiz by this user.
-        # This assumes "finished" means "attempted at least once".
-        # Optimziation: This can be N+1 if not careful, but for now we implement logic.
-        
-        # Collect all question IDs from all banks
-        question_ids = set()
-        for bank in obj.question_banks.all():
-            question_ids.update(bank.questions.values_list('id', flat=True))
-            
-        if not question_ids:
-            return False
-            
-        return QuestionResponse.objects.filter(user=user, question_id__in=question_ids).exists()
+
+        # "Finished" means submitted, see quiz_finished. QuizViewSet
+        # annotates it for lists.
+        if hasattr(obj, 'finished'):
+            return obj.finished
+        return Quiz.objects.filter(pk=obj.pk).filter(quiz_finished(user)).exists()
@@ -1,15 +1,38 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 from user.models import User
 from course.models import Course
 from questionbank.models import QuestionBank
 from question.models import Question, MultipleChoiceOption
-from quiz.models import Quiz
+from quiz.attempts import attempt_session, seal
+from quiz.autosave import buffer as autosave_buffer
+from quiz.sampling import bank_question_ids, shuffled_options
+from quiz.models import Quiz, QuizAttempt
 from questionresponse.models import QuestionResponse
 
 from course.models import Course, CourseProgress
+from common.fixtures import build_course_fixture
+
+
+def single_choice(text, correct_option=1):
+    question = Question.objects.create(text=text, is_open_ended=False)
+    MultipleChoiceOption.objects.create(
+        question=question, option1='a', option2='b', option3='c', option4='d',
+        correct_option=correct_option,
+    )
+    return question
+
 
 class QuizTests(TestCase):
     def setUp(self):
@@ -83,3 +106,599 @@ class QuizTests(TestCase):
         url = reverse('quiz-review', args=[self.quiz.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QuizSubmissionsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username='teacher', password='password', is_teacher=True)
+        self.course = Course.objects.create(title="Test Course", description="Desc", instructor=self.teacher)
+
+        self.single = Question.objects.create(text="What is 2+2?", is_open_ended=False)
+        MultipleChoiceOption.objects.create(
+            question=self.single,
+            option1="1", option2="2", option3="3", option4="4",
+            correct_option=4
+        )
+        self.multi = Question.objects.create(text="Which are even?", is_open_ended=False)
+        MultipleChoiceOption.objects.create(
+            question=self.multi,
+            option1="1", option2="2", option3="3", option4="4",
+            correct_option=2,
+            is_multiple_choice=True,
+            correct_options=[2, 4]
+        )
+        self.open = Question.objects.create(text="Explain.", is_open_ended=True)
+        bank = QuestionBank.objects.create(title="Bank 1", user=self.teacher)
+        bank.questions.add(self.single, self.multi, self.open)
+        # the same question in a second bank must not be counted twice
+        other_bank = QuestionBank.objects.create(title="Bank 2", user=self.teacher)
+        other_bank.questions.add(self.single)
+
+        self.quiz = Quiz.objects.create(
+            title="Test Quiz",
+            description="Test Desc",
+            time_limit_in_minutes=10,
+            course=self.course,
+        )
+        self.quiz.question_banks.add(bank, other_bank)
+        self.url = reverse('quiz-submissions', args=[self.quiz.id])
+        self.client.force_authenticate(user=self.teacher)
+
+    def make_student(self, username, surname):
+        student = User.objects.create_user(
+            username=username, email=f'{username}@test.com', name='Jan', surname=surname
+        )
+        CourseProgress.objects.create(user=student, course=self.course)
+        return student
+
+    def test_submissions_scored_in_database(self):
+        alice = self.make_student('alice', 'A')
+        bob = self.make_student('bob', 'B')
+        self.make_student('carol', 'C')  # enrolled, no answers
+        QuestionResponse.objects.create(user=alice, question=self.single, selected_option=4)
+        QuestionResponse.objects.create(user=alice, question=self.multi, selected_options=[4, 2])
+        QuestionResponse.objects.create(user=alice, question=self.open, response_text="...", points=3)
+        QuestionResponse.objects.create(user=bob, question=self.single, selected_option=1)
+        QuestionResponse.objects.create(user=bob, question=self.multi, selected_options=[2])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(row['email'], row['answered'], row['score']) for row in response.data['results']],
+            [('alice@test.com', 3, 5), ('bob@test.com', 2, 0)],
+        )
+        self.assertEqual(response.data['results'][0]['name'], 'Jan A')
+        self.assertIsNotNone(response.data['results'][0]['last_activity'])
+
+    def test_submissions_search_and_ordering(self):
+        alice = self.make_student('alice', 'A')
+        bob = self.make_student('bob', 'B')
+        QuestionResponse.objects.create(user=alice, question=self.single, selected_option=1)
+        QuestionResponse.objects.create(user=bob, question=self.single, selected_option=4)
+
+        response = self.client.get(self.url, {'ordering': '-score'})
+        self.assertEqual([row['email'] for row in response.data['results']], ['bob@test.com', 'alice@test.com'])
+        response = self.client.get(self.url, {'search': 'alice'})
+        self.assertEqual([row['email'] for row in response.data['results']], ['alice@test.com'])
+
+    def test_submissions_query_count_constant(self):
+        for i in range(30):
+            student = self.make_student(f'student{i}', f'S{i:02}')
+            for question in (self.single, self.multi, self.open):
+                QuestionResponse.objects.create(user=student, question=question)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'page_size': 10})
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_submissions_forbidden_for_students(self):
+        self.client.force_authenticate(user=self.make_student('alice', 'A'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QuizQueryBudgetTests(TestCase):
+    """
+    Query ceilings per quiz endpoint on a quiz of 3 banks x 8 questions and
+    30 students. They must not grow with banks, questions or students.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_course_fixture(students=30, quizzes=3)
+        cls.quiz = cls.data.quizzes[0]
+        cls.quiz.show_correct_answers_on_completion = True
+        cls.quiz.save()
+        cls.student = cls.data.students[3]
+        cls.teacher = cls.data.teacher
+
+    def setUp(self):
+        self.client = APIClient()
+        self.addCleanup(cache.clear)
+
+    def start(self, user):
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('quiz-start', args=[self.quiz.id]))
+
+    def assertBudget(self, user, queries, url, data=None, method='get'):
+        self.client.force_authenticate(user=user)
+        with self.assertNumQueries(queries):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_quiz_list(self):
+        response = self.assertBudget(self.student, 2, reverse('quiz-list'), {'course_id': self.data.course.id})
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(quiz['is_finished'] for quiz in response.data))
+        self.assertEqual(len(response.data[0]['question_banks']), 3)
+        self.assertBudget(self.teacher, 2, reverse('quiz-list'))
+
+    def test_quiz_detail(self):
+        self.assertBudget(self.student, 2, reverse('quiz-detail', args=[self.quiz.id]))
+
+    def test_quiz_questions(self):
+        self.start(self.student)
+        response = self.assertBudget(self.student, 2, reverse('quiz-questions', args=[self.quiz.id]))
+        self.assertEqual(len(response.data), 24)
+        self.assertEqual(
+            {question['type'] for question in response.data}, {'open', 'single_choice'}
+        )
+
+    def test_quiz_submit(self):
+        questions = self.data.questions[:24]
+        responses = [{'question_id': q.id, 'answer': 2} for q in questions]
+        self.start(self.student)
+        self.assertBudget(self.student, 4, reverse('quiz-submit', args=[self.quiz.id]), {'responses': responses}, method='post')
+        self.assertEqual(
+            QuestionResponse.objects.filter(user=self.student, question__in=questions).count(), 24
+        )
+
+    def test_quiz_review(self):
+        response = self.assertBudget(self.student, 5, reverse('quiz-review', args=[self.quiz.id]))
+        self.assertEqual(len(response.data['responses']), 24)
+
+    def test_quiz_submissions(self):
+        self.assertBudget(self.teacher, 3, reverse('quiz-submissions', args=[self.quiz.id]))
+
+    def test_student_submission(self):
+        url = reverse('quiz-student-submission', args=[self.quiz.id, self.student.id])
+        self.assertBudget(self.teacher, 4, url)
+        # creating the missing empty responses costs a fixed two queries more
+        QuestionResponse.objects.filter(user=self.student).delete()
+        response = self.assertBudget(self.teacher, 6, url)
+        self.assertEqual(len(response.data['responses']), 24)
+
+
+@override_settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 1000})
+class QuizAutosaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='teacher', is_teacher=True)
+        cls.student = User.objects.create_user(username='student')
+        course = Course.objects.create(title="Course", description="", instructor=teacher)
+        CourseProgress.objects.create(user=cls.student, course=course)
+        cls.single = single_choice("Which?")
+        cls.open = Question.objects.create(text="Why?", is_open_ended=True)
+        bank = QuestionBank.objects.create(title="Bank", user=teacher)
+        bank.questions.add(cls.single, cls.open)
+        cls.other = Question.objects.create(text="Elsewhere?", is_open_ended=True)
+        other_bank = QuestionBank.objects.create(title="Other bank", user=teacher)
+        other_bank.questions.add(cls.other)
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=10, course=course,
+            show_correct_answers_on_completion=True,
+        )
+        cls.quiz.question_banks.add(bank)
+        other_quiz = Quiz.objects.create(
+            title="Other quiz", description="", time_limit_in_minutes=10, course=course
+        )
+        other_quiz.question_banks.add(other_bank)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+        self.addCleanup(autosave_buffer._pending.clear)
+        self.addCleanup(cache.clear)
+
+    def autosave(self, *answers):
+        responses = [{'question_id': q.id, 'answer': answer} for q, answer in answers]
+        return self.client.post(
+            reverse('quiz-autosave', args=[self.quiz.id]), {'responses': responses}, format='json'
+        )
+
+    def saved(self, question):
+        return QuestionResponse.objects.filter(user=self.student, question=question).first()
+
+    def test_edits_are_coalesced_until_flushed(self):
+        for answer in (1, 2, 3):
+            response = self.autosave((self.single, answer))
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.autosave((self.open, 'draft'))
+        self.assertIsNone(self.saved(self.single))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(autosave_buffer.flush(), 2)
+        self.assertEqual(self.saved(self.single).selected_option, 3)
+        self.assertEqual(self.saved(self.open).response_text, 'draft')
+
+    def test_write_through_without_interval(self):
+        with self.settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 0}):
+            self.autosave((self.single, 2))
+        self.assertEqual(self.saved(self.single).selected_option, 2)
+        self.assertEqual(len(autosave_buffer), 0)
+
+    def test_in_progress_quiz_is_not_finished(self):
+        with self.settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 0}):
+            self.autosave((self.single, 2))
+        detail = self.client.get(reverse('quiz-detail', args=[self.quiz.id]))
+        self.assertFalse(detail.data['is_finished'])
+        review = self.client.get(reverse('quiz-review', args=[self.quiz.id]))
+        self.assertEqual(review.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_submit_seals_autosaved_answers(self):
+        self.autosave((self.single, 4))
+        response = self.client.post(reverse('quiz-submit', args=[self.quiz.id]), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.saved(self.single).selected_option, 4)
+        self.assertIsNotNone(QuizAttempt.objects.get(user=self.student, quiz=self.quiz).submitted_at)
+        detail = self.client.get(reverse('quiz-detail', args=[self.quiz.id]))
+        self.assertTrue(detail.data['is_finished'])
+        self.assertEqual(self.autosave((self.single, 1)).status_code, status.HTTP_409_CONFLICT)
+
+    def test_late_flush_cannot_change_a_sealed_attempt(self):
+        self.autosave((self.single, 1))
+        # another worker's buffer, flushed after the student submitted
+        pending = dict(autosave_buffer._pending)
+        self.client.post(
+            reverse('quiz-submit', args=[self.quiz.id]),
+            {'responses': [{'question_id': self.single.id, 'answer': 3}]}, format='json',
+        )
+        autosave_buffer._pending.update(pending)
+        autosave_buffer.flush()
+        self.assertEqual(self.saved(self.single).selected_option, 3)
+
+    def test_older_edit_does_not_overwrite_newer(self):
+        self.autosave((self.single, 1))
+        QuestionResponse.objects.create(user=self.student, question=self.single, selected_option=2)
+        autosave_buffer.flush()
+        self.assertEqual(self.saved(self.single).selected_option, 2)
+
+    def test_rejects_questions_of_other_quizzes(self):
+        response = self.autosave((self.single, 1), (self.other, 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(autosave_buffer), 0)
+
+
+@override_settings(QUIZ_ATTEMPTS={'GRACE_SECONDS': 30, 'CACHE_TIMEOUT': 3600})
+class QuizAttemptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='teacher', is_teacher=True)
+        cls.student = User.objects.create_user(username='student')
+        cls.classmate = User.objects.create_user(username='classmate')
+        course = Course.objects.create(title="Course", description="", instructor=teacher)
+        for student in (cls.student, cls.classmate):
+            CourseProgress.objects.create(user=student, course=course)
+        cls.question = single_choice("Which?", correct_option=4)
+        bank = QuestionBank.objects.create(title="Bank", user=teacher)
+        bank.questions.add(cls.question)
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=30, course=course
+        )
+        cls.quiz.question_banks.add(bank)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+        self.addCleanup(cache.clear)
+
+    def start(self):
+        return self.client.post(reverse('quiz-start', args=[self.quiz.id]))
+
+    def expire(self, seconds=31):
+        # as if the student had opened the quiz a time limit and `seconds` ago
+        deadline = timezone.now() - timedelta(seconds=seconds)
+        QuizAttempt.objects.filter(user=self.student, quiz=self.quiz).update(deadline=deadline)
+        cache.clear()
+
+    def submit(self, answer):
+        return self.client.post(
+            reverse('quiz-submit', args=[self.quiz.id]),
+            {'responses': [{'question_id': self.question.id, 'answer': answer}]}, format='json',
+        )
+
+    def test_opening_the_quiz_starts_the_clock_once(self):
+        self.client.get(reverse('quiz-questions', args=[self.quiz.id]))
+        attempt = QuizAttempt.objects.get(user=self.student, quiz=self.quiz)
+        self.assertAlmostEqual(
+            (attempt.deadline - attempt.started_at).total_seconds(), 30 * 60, delta=1
+        )
+
+        response = self.start()
+        self.assertEqual(response.data['deadline'], attempt.deadline.timestamp())
+        self.assertLessEqual(response.data['seconds_left'], 30 * 60)
+        self.assertFalse(response.data['submitted'])
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+
+    def test_checks_are_served_from_the_cache(self):
+        self.start()
+        with self.assertNumQueries(0):
+            session = attempt_session(self.student, self.quiz)
+        self.assertIsNotNone(session['deadline'])
+
+    def test_submit_within_grace_period(self):
+        self.start()
+        self.expire(seconds=10)
+        self.assertEqual(self.submit(4).status_code, status.HTTP_200_OK)
+
+    def test_sealed_attempt_cannot_be_resubmitted(self):
+        self.start()
+        self.assertEqual(self.submit(1).status_code, status.HTTP_200_OK)
+        submitted_at = QuizAttempt.objects.get(user=self.student, quiz=self.quiz).submitted_at
+
+        self.assertEqual(self.submit(4).status_code, status.HTTP_409_CONFLICT)
+        saved = QuestionResponse.objects.get(user=self.student, question=self.question)
+        self.assertEqual(saved.selected_option, 1)
+        # a late seal keeps the time of the first
+        seal(self.student, self.quiz)
+        self.assertEqual(
+            QuizAttempt.objects.get(user=self.student, quiz=self.quiz).submitted_at, submitted_at
+        )
+
+    def test_late_submit_keeps_autosaved_answers(self):
+        self.start()
+        with self.settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 0}):
+            self.client.post(
+                reverse('quiz-autosave', args=[self.quiz.id]),
+                {'responses': [{'question_id': self.question.id, 'answer': 2}]}, format='json',
+            )
+        self.expire()
+
+        response = self.submit(4)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        saved = QuestionResponse.objects.get(user=self.student, question=self.question)
+        self.assertEqual(saved.selected_option, 2)
+        self.assertIsNotNone(QuizAttempt.objects.get(user=self.student, quiz=self.quiz).submitted_at)
+
+    def test_late_autosave_is_refused(self):
+        self.start()
+        self.expire()
+        response = self.client.post(
+            reverse('quiz-autosave', args=[self.quiz.id]),
+            {'responses': [{'question_id': self.question.id, 'answer': 2}]}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_no_deadline_without_time_limit(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(time_limit_in_minutes=0)
+        response = self.start()
+        self.assertIsNone(response.data['deadline'])
+        self.assertIsNone(response.data['seconds_left'])
+
+    def test_sweeper_closes_expired_attempts(self):
+        self.start()
+        self.client.force_authenticate(user=self.classmate)
+        self.start()
+        self.expire()
+
+        out = StringIO()
+        call_command('close_expired_attempts', '--batch-size', '1', stdout=out)
+        self.assertIn('Closed 1 expired attempts', out.getvalue())
+        self.assertEqual(
+            set(QuizAttempt.objects.filter(submitted_at__isnull=False).values_list('user', flat=True)),
+            {self.student.id},
+        )
+
+
+class QuizSamplingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='teacher', is_teacher=True)
+        cls.student = User.objects.create_user(username='student')
+        cls.other = User.objects.create_user(username='other')
+        course = Course.objects.create(title="Course", description="", instructor=teacher)
+        for student in (cls.student, cls.other):
+            CourseProgress.objects.create(user=student, course=course)
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=10, course=course,
+            questions_per_bank=2, randomize_question_order=True, shuffle_options=True,
+            show_correct_answers_on_completion=True,
+        )
+        cls.banks, cls.bank_questions = [], []
+        for b in range(3):
+            bank = QuestionBank.objects.create(title=f"Bank {b}", user=teacher)
+            questions = [
+                Question.objects.create(text=f"Why {b}.{n}?", is_open_ended=True)
+                if n % 2 else single_choice(f"Which {b}.{n}?")
+                for n in range(4)
+            ]
+            bank.questions.add(*questions)
+            cls.quiz.question_banks.add(bank)
+            cls.banks.append(bank)
+            cls.bank_questions.extend(questions)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+        self.addCleanup(cache.clear)
+
+    def questions(self, user=None):
+        self.client.force_authenticate(user=user or self.student)
+        return self.client.get(reverse('quiz-questions', args=[self.quiz.id])).data
+
+    def test_draw_is_per_bank_and_stable(self):
+        served = self.questions()
+        self.assertEqual(len(served), 6)
+        banks = bank_question_ids(self.quiz)
+        for ids in banks.values():
+            self.assertEqual(len({q['id'] for q in served} & set(ids)), 2)
+        self.assertEqual(self.questions(), served)
+        self.assertNotEqual(
+            [q['id'] for q in self.questions(self.other)], [q['id'] for q in served]
+        )
+
+    def test_review_and_submit_follow_the_draw(self):
+        served = self.questions()
+        self.client.post(reverse('quiz-submit', args=[self.quiz.id]), {'responses': []}, format='json')
+        self.assertEqual(
+            set(QuestionResponse.objects.filter(user=self.student).values_list('question_id', flat=True)),
+            {q['id'] for q in served},
+        )
+
+        review = self.client.get(reverse('quiz-review', args=[self.quiz.id])).data
+        self.assertEqual([q['id'] for q in review['questions']], [q['id'] for q in served])
+        self.assertEqual(
+            [[o['id'] for o in q.get('options', [])] for q in review['questions']],
+            [[o['id'] for o in q['options'] or []] for q in served],
+        )
+        self.assertEqual(review['total_questions'], 6)
+
+    def test_bank_ids_are_cached_until_the_bank_changes(self):
+        self.questions()
+        with self.assertNumQueries(3):
+            self.questions()
+
+        bank = self.banks[0]
+        added = Question.objects.create(text='New', is_open_ended=True)
+        bank.questions.add(added)
+        self.assertIn(added.id, bank_question_ids(self.quiz)[bank.id])
+        bank.questions.remove(added)
+        self.assertNotIn(added.id, bank_question_ids(self.quiz)[bank.id])
+        # what another worker still holds under the old version is not read
+        added.question_banks.add(bank)
+        self.assertIn(added.id, bank_question_ids(self.quiz)[bank.id])
+
+    def test_draw_survives_bank_changes(self):
+        served = {q['id'] for q in self.questions()}
+        bank = self.banks[0]
+        bank.questions.add(*[
+            Question.objects.create(text=f'New {n}', is_open_ended=True) for n in range(4)
+        ])
+        now_served = {q['id'] for q in self.questions()}
+        self.assertLessEqual(len(served - now_served), 2)
+        others = {id for other in self.banks[1:] for id in bank_question_ids(self.quiz)[other.id]}
+        self.assertEqual(served & others, now_served & others)
+
+    def test_options_keep_their_ids(self):
+        served = self.questions()
+        options = [q['options'] for q in served if q['options']]
+        self.assertTrue(options)
+        for question_options in options:
+            self.assertEqual(sorted(o['id'] for o in question_options), [1, 2, 3, 4])
+        self.assertEqual(
+            shuffled_options([1, 2, 3, 4], 7, 1), shuffled_options([1, 2, 3, 4], 7, 1)
+        )
+
+    def test_shuffle_without_sampling_serves_everything(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(questions_per_bank=None)
+        served = [q['id'] for q in self.questions()]
+        self.assertEqual(sorted(served), sorted(q.id for q in self.bank_questions))
+        self.assertEqual([q['id'] for q in self.questions()], served)
+
+
+class AsyncQuizViewTests(TestCase):
+    """The async quiz-taking endpoints answer exactly like the DRF ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='teacher', is_teacher=True)
+        cls.student = User.objects.create_user(username='student')
+        course = Course.objects.create(title="Course", description="", instructor=teacher)
+        CourseProgress.objects.create(user=cls.student, course=course)
+        cls.question = single_choice("Which?")
+        bank = QuestionBank.objects.create(title="Bank", user=teacher)
+        bank.questions.add(Question.objects.create(text="Why?", is_open_ended=True), cls.question)
+        cls.quiz = Quiz.objects.create(
+            title="Quiz", description="", time_limit_in_minutes=10, course=course,
+            show_correct_answers_on_completion=True,
+        )
+        cls.quiz.question_banks.add(bank)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.student)}'}
+        self.addCleanup(cache.clear)
+
+    async def test_questions_match_sync_view(self):
+        sync = await sync_to_async(self.client.get)(reverse('quiz-questions', args=[self.quiz.id]))
+        response = await self.async_client.get(
+            reverse('async-quiz-questions', args=[self.quiz.id]), headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), json.loads(sync.content))
+
+    @override_settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 0})
+    async def test_submit_upserts_and_review_matches_sync_view(self):
+        question = self.question
+        for name, answer in (('async-quiz-autosave', 2), ('async-quiz-submit', 3), ('async-quiz-submit', 4)):
+            response = await self.async_client.post(
+                reverse(name, args=[self.quiz.id]),
+                {'responses': [{'question_id': question.id, 'answer': answer}]},
+                content_type='application/json', headers=self.headers,
+            )
+        # a sealed attempt cannot be submitted again
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        saved = QuestionResponse.objects.filter(user=self.student, question=question)
+        self.assertEqual(await saved.acount(), 1)
+        self.assertEqual((await saved.aget()).selected_option, 3)
+
+        sync = await sync_to_async(self.client.get)(reverse('quiz-review', args=[self.quiz.id]))
+        response = await self.async_client.get(
+            reverse('async-quiz-review', args=[self.quiz.id]), headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), json.loads(sync.content))
+
+    async def test_review_requires_submission(self):
+        await QuestionResponse.objects.filter(user=self.student).adelete()
+        response = await self.async_client.get(
+            reverse('async-quiz-review', args=[self.quiz.id]), headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(QUIZ_AUTOSAVE={'FLUSH_INTERVAL': 0})
+    async def test_autosave_then_submit(self):
+        question = self.question
+        await QuestionResponse.objects.filter(user=self.student).adelete()
+        url = reverse('async-quiz-autosave', args=[self.quiz.id])
+        response = await self.async_client.post(
+            url, {'responses': [{'question_id': question.id, 'answer': 2}]},
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        review_url = reverse('async-quiz-review', args=[self.quiz.id])
+        response = await self.async_client.get(review_url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        await self.async_client.post(
+            reverse('async-quiz-submit', args=[self.quiz.id]), {},
+            content_type='application/json', headers=self.headers,
+        )
+        response = await self.async_client.get(review_url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['responses'][0]['selected_option_id'], 2)
+        response = await self.async_client.post(
+            url, {'responses': [{'question_id': question.id, 'answer': 3}]},
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    async def test_requires_token(self):
+        url = reverse('async-quiz-questions', args=[self.quiz.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(url, headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_hidden_quiz_is_not_found(self):
+        outsider = await User.objects.acreate(username='outsider')
+        response = await self.async_client.get(
+            reverse('async-quiz-questions', args=[self.quiz.id]),
+            headers={'Authorization': f'Bearer {AccessToken.for_user(outsider)}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
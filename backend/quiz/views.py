@@ -1,13 +1,51 @@
+from django.db.models import Q
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from common.swagger_utils import swagger_tags
+from .attempts import attempt_session, expired, seal, seconds_left
+from .autosave import buffer as autosave_buffer
 from .models import Quiz
+from .responses import UPSERT, build_responses
+from .sampling import in_order, option_seed, served_question_ids
+from .scoring import quiz_finished, quiz_question_ids, quiz_questions, quiz_submissions, review_data
 from .serializers import QuizSerializer, QuestionSerializer
 from question.models import Question
 from questionresponse.models import QuestionResponse
-import random
+
+SUBMISSION_ORDERING = {
+    'name': ['user__surname', 'user__name'],
+    'email': ['user__email'],
+    'score': ['score'],
+    'answered': ['answered'],
+    'last_activity': ['last_activity'],
+}
+
+
+def visible_quizzes(user):
+    queryset = Quiz.objects.all()
+
+    # Teachers see quizzes for their courses
+    # Students see quizzes for courses they are enrolled in
+    if user.is_staff:
+        pass # Staff (admins) can see all quizzes
+    elif getattr(user, 'is_teacher', False):
+        queryset = queryset.filter(course__instructor=user)
+    else:
+        # For students, we need to filter by enrollment
+        queryset = queryset.filter(course__courseprogress__user=user)
+    return queryset
+
+
+class SubmissionPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 
 @swagger_tags(tags=["quizzes"])
 class QuizViewSet(viewsets.ModelViewSet):
@@ -21,44 +59,47 @@ class QuizViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Quiz.objects.none()
         
-        queryset = Quiz.objects.all()
-
-        # Teachers see quizzes for their courses
-        # Students see quizzes for courses they are enrolled in
-        if user.is_staff:
-            pass # Staff (admins) can see all quizzes
-        elif getattr(user, 'is_teacher', False):
-             queryset = queryset.filter(course__instructor=user)
-        else:
-             # For students, we need to filter by enrollment
-             queryset = queryset.filter(course__courseprogress__user=user)
+        queryset = visible_quizzes(user)
 
         course_id = self.request.query_params.get('course_id')
         if course_id:
             queryset = queryset.filter(course_id=course_id)
-            
+
+        if self.action in ('list', 'retrieve'):
+            # Everything QuizSerializer reports, without a query per quiz
+            queryset = queryset.prefetch_related('question_banks').annotate(
+                finished=quiz_finished(user)
+            )
         return queryset
 
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """
+        Start the quiz, or look up the attempt already started: the clock
+        runs from the first time the student opens the quiz.
+        """
+        quiz = self.get_object()
+        session = attempt_session(request.user, quiz)
+        return Response({
+            'started_at': session['started_at'],
+            'deadline': session['deadline'],
+            'seconds_left': seconds_left(session),
+            'submitted': session['submitted'],
+        })
+
     @action(detail=True, methods=['get'])
     def questions(self, request, pk=None):
         quiz = self.get_object()
-        questions = []
-        for bank in quiz.question_banks.all():
-            # Polymorphic query if possible, or just Question objects
-            # To get specific types (MultipleChoice), we iterate
-            qs = bank.questions.all()
-            for q in qs:
-                # Basic select_related/prefetch might be needed for optimization
-                # But for now simple loop
-                if hasattr(q, 'multiplechoiceoption'):
-                    questions.append(q.multiplechoiceoption)
-                else:
-                    questions.append(q)
-        
-        if quiz.randomize_question_order:
-            random.shuffle(questions)
-            
-        serializer = QuestionSerializer(questions, many=True)
+        user = request.user
+        if not (user.is_staff or getattr(user, 'is_teacher', False)):
+            # Seeing the questions starts the clock
+            attempt_session(user, quiz)
+        # The serializer reads the multiple choice part through the
+        # select_related cache, so this is a single query.
+        ids = served_question_ids(quiz, user)
+        questions = in_order(list(quiz_questions(quiz, ids)), ids)
+
+        serializer = QuestionSerializer(questions, many=True, context={'option_seed': option_seed(quiz, user)})
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -68,38 +109,56 @@ class QuizViewSet(viewsets.ModelViewSet):
         # responses: list of {question_id: int, answer: string/int/list[int]}
         
         user = request.user
-        
-        all_questions = []
-        for bank in quiz.question_banks.all():
-            all_questions.extend(bank.questions.all())
 
-        # Map provided responses by question_id
-        submission_map = {r.get('question_id'): r.get('answer') for r in responses}
+        session = attempt_session(user, quiz)
+        if session['submitted']:
+            return Response({"error": "Quiz already submitted."}, status=status.HTTP_409_CONFLICT)
+        if expired(session):
+            # Answers autosaved in time stand; late ones are refused.
+            seal(user, quiz)
+            return Response({"error": "Time limit exceeded."}, status=status.HTTP_403_FORBIDDEN)
 
-        for question in all_questions:
-            val = submission_map.get(question.id)
-            
-            # Determine defaults based on input type and value
-            defaults = {}
-            if question.is_open_ended:
-                defaults['response_text'] = str(val) if val is not None else ""
-            else:
-                 # Check if it's a multiple-select question
-                if isinstance(val, list):
-                    defaults['selected_options'] = val
-                    defaults['selected_option'] = None
-                else:
-                    # Single select
-                    defaults['selected_option'] = int(val) if val is not None else None
-                    defaults['selected_options'] = []
-
-            QuestionResponse.objects.update_or_create(
-                question=question, user=user,
-                defaults=defaults
-            )
+        # Without 'responses' the autosaved answers are what gets submitted
+        if 'responses' in request.data:
+            ids = served_question_ids(quiz, user)
+            all_questions = Question.objects.filter(id__in=quiz_question_ids(quiz) if ids is None else ids).only('id', 'is_open_ended')
+            QuestionResponse.objects.bulk_create(build_responses(user, all_questions, responses), **UPSERT)
+        seal(user, quiz)
 
         return Response({'status': 'submitted'}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'])
+    def autosave(self, request, pk=None):
+        """
+        Save answers of a quiz in progress, only the ones that changed:
+        {responses: [{question_id, answer}]} as for submit. They are written
+        shortly after, later edits of a question replacing earlier ones.
+        """
+        quiz = self.get_object()
+        user = request.user
+        answers = request.data.get('responses', [])
+
+        question_ids = {answer.get('question_id') for answer in answers}
+        if not all(type(question_id) is int for question_id in question_ids):
+            return Response({"error": "question_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        ids = served_question_ids(quiz, user)
+        questions = list(
+            Question.objects.filter(id__in=quiz_question_ids(quiz) if ids is None else ids)
+            .filter(id__in=question_ids)
+            .only('id', 'is_open_ended')
+        )
+        if len(questions) != len(question_ids):
+            return Response({"error": "Question not in this quiz."}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = attempt_session(user, quiz)
+        if session['submitted']:
+            return Response({"error": "Quiz already submitted."}, status=status.HTTP_409_CONFLICT)
+        if expired(session):
+            return Response({"error": "Time limit exceeded."}, status=status.HTTP_403_FORBIDDEN)
+
+        autosave_buffer.add(quiz.id, build_responses(user, questions, answers))
+        return Response({'status': 'saved', 'saved': len(questions)}, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['get'])
     def review(self, request, pk=None):
         quiz = self.get_object()
@@ -110,121 +169,48 @@ class QuizViewSet(viewsets.ModelViewSet):
         # Check permissions logic
         if not is_instructor:
              # Student logic
-             question_ids = set()
-             for bank in quiz.question_banks.all():
-                 question_ids.update(bank.questions.values_list('id', flat=True))
-             
-             if not question_ids:
+             question_ids = quiz_question_ids(quiz)
+
+             if not question_ids.exists():
                  return Response({"error": "Quiz has no questions."}, status=404)
-                 
-             has_responses = QuestionResponse.objects.filter(user=user, question_id__in=question_ids).exists()
+
+             finished = Quiz.objects.filter(pk=quiz.pk).filter(quiz_finished(user)).exists()
              
-             if not has_responses:
+             if not finished:
                  return Response({"error": "You must complete the quiz first."}, status=status.HTTP_403_FORBIDDEN)
                  
              if not quiz.show_correct_answers_on_completion:
                  return Response({"error": "Review not allowed for this quiz."}, status=status.HTTP_403_FORBIDDEN)
         
-        # Collect data
-        # Questions
-        questions = []
-        for bank in quiz.question_banks.all():
-            questions.extend(bank.questions.all())
-            
-        # Responses
-        # We need to fetch all responses for these questions for this user
+        ids = served_question_ids(quiz, user)
+        questions = in_order(list(quiz_questions(quiz, ids)), ids)
         question_ids = [q.id for q in questions]
         responses_qs = QuestionResponse.objects.filter(user=user, question_id__in=question_ids)
         responses_map = {r.question_id: r for r in responses_qs}
-        
-        questions_data = []
-        user_responses_data = []
-        score = 0
-        total_questions = len(questions)
-        
-        for q in questions:
-            # Build Question Data
-            # Determine type matching QuestionSerializer logic
-            q_type = 'open'
-            if hasattr(q, 'multiplechoiceoption'):
-                if q.multiplechoiceoption.is_multiple_choice:
-                    q_type = 'multiple_choice'
-                else:
-                    q_type = 'single_choice'
 
-            q_data = {
-                'id': q.id,
-                'text': q.text,
-                'type': q_type,
-            }
-            if hasattr(q, 'multiplechoiceoption'):
-                 mc = q.multiplechoiceoption
-                 is_mc = mc.is_multiple_choice
-                 def check_correct(idx):
-                     if is_mc and mc.correct_options:
-                         return idx in mc.correct_options
-                     return mc.correct_option == idx
+        return Response(review_data(quiz, user, questions, responses_map))
 
-                 q_data['options'] = [
-                    {'id': 1, 'text': mc.option1, 'is_correct': check_correct(1)},
-                    {'id': 2, 'text': mc.option2, 'is_correct': check_correct(2)},
-                    {'id': 3, 'text': mc.option3, 'is_correct': check_correct(3)},
-                    {'id': 4, 'text': mc.option4, 'is_correct': check_correct(4)},
-                 ]
-            else:
-                # Open ended - might not have "correct answer" easily checkable automatically without more fields
-                # Assuming no auto-check for open ended yet in this scope unless generic "completed" is enough
-                q_data['correct_answer'] = "To do: model override" 
-            
-            questions_data.append(q_data)
-            
-            # Build Response Data
-            resp = responses_map.get(q.id)
-            is_correct = False
-            if resp:
-                if hasattr(q, 'multiplechoiceoption'):
-                    if q.multiplechoiceoption.is_multiple_choice:
-                        # Compare sets of indices
-                        user_selected = set(resp.selected_options) if resp.selected_options else set()
-                        correct_selected = set(q.multiplechoiceoption.correct_options) if q.multiplechoiceoption.correct_options else set()
-                        is_correct = (user_selected == correct_selected)
-                    else:
-                        is_correct = (resp.selected_option == q.multiplechoiceoption.correct_option)
-                else:
-                    # Logic for open ended? For now always false or manual
-                    pass
-                
-                # Basic auto-grading if points not set manually
-                points = resp.points
-                if points == 0 and is_correct:
-                    points = 1
-                
-                score += points
-                
-                user_responses_data.append({
-                    'response_id': resp.id,
-                    'question_id': q.id,
-                    'selected_option_id': resp.selected_option,
-                    'selected_options': resp.selected_options,
-                    'text_response': resp.response_text,
-                    'is_correct': is_correct,
-                    'points': points,
-                    'instructor_comment': resp.instructor_comment
-                })
-        
-        return Response({
-            'quiz_title': quiz.title,
-            'student_name': f"{user.name} {user.surname}",
-            'score': score,
-            'total_questions': total_questions,
-            'questions': questions_data,
-            'responses': user_responses_data
-        })
     @action(detail=True, methods=['get'])
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'search',
+                openapi.IN_QUERY,
+                description="Substring of the student's name, surname or email",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'ordering',
+                openapi.IN_QUERY,
+                description="name, email, score, answered or last_activity; prefix with '-' for descending",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
     def submissions(self, request, pk=None):
         """
-        Get list of students who have submitted answers for this quiz.
-        Returns: [ {user_id, name, email, submission_date (if tracked), score (auto)} ]
+        Get list of students who have submitted answers for this quiz (paginated).
+        Returns: [ {user_id, name, email, answered, score (auto), last_activity} ]
         """
         quiz = self.get_object()
         user = request.user
@@ -233,30 +219,37 @@ class QuizViewSet(viewsets.ModelViewSet):
         is_instructor = user.is_staff or getattr(user, 'is_teacher', False)
         if not is_instructor:
              return Response({"error": "Only instructors can view submissions."}, status=status.HTTP_403_FORBIDDEN)
-             
-        # Get all question IDs in this quiz
-        question_ids = set()
-        for bank in quiz.question_banks.all():
-            question_ids.update(bank.questions.values_list('id', flat=True))
-            
-        if not question_ids:
-            return Response([])
 
-        # Find all responses for these questions
-        responses = QuestionResponse.objects.filter(question_id__in=question_ids).select_related('user')
-        
-        # Group by user
-        users_map = {}
-        for r in responses:
-            if r.user_id not in users_map:
-                users_map[r.user_id] = {
-                    'user_id': r.user.id,
-                    'name': f"{r.user.name} {r.user.surname}",
-                    'email': r.user.email,
-                    # We could calculate preliminary score here
-                }
-        
-        return Response(list(users_map.values()))
+        # One grouped row per student, scored in the database
+        rows = quiz_submissions(quiz)
+
+        search = request.query_params.get('search', '').strip()
+        if search:
+            rows = rows.filter(
+                Q(user__name__icontains=search)
+                | Q(user__surname__icontains=search)
+                | Q(user__email__icontains=search)
+            )
+
+        ordering = request.query_params.get('ordering', 'name')
+        fields = SUBMISSION_ORDERING.get(ordering.lstrip('-'), SUBMISSION_ORDERING['name'])
+        if ordering.startswith('-'):
+            fields = [f'-{field}' for field in fields]
+        rows = rows.order_by(*fields, 'user_id')
+
+        paginator = SubmissionPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response([
+            {
+                'user_id': row['user_id'],
+                'name': f"{row['user__name']} {row['user__surname']}",
+                'email': row['user__email'],
+                'answered': row['answered'],
+                'score': row['score'],
+                'last_activity': row['last_activity'],
+            }
+            for row in page
+        ])
 
     @action(detail=True, methods=['get'], url_path='submissions/(?P<user_id>[^/.]+)')
     def student_submission(self, request, pk=None, user_id=None):
@@ -278,14 +271,24 @@ class QuizViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
              return Response({"error": "User not found"}, status=404)
 
-        # Collect data (similar to review)
-        questions = []
-        for bank in quiz.question_banks.all():
-            questions.extend(bank.questions.all())
-            
+        # Collect data (similar to review), for the questions drawn for them
+        ids = served_question_ids(quiz, target_user)
+        questions = in_order(list(quiz_questions(quiz, ids)), ids)
+
         question_ids = [q.id for q in questions]
         responses_qs = QuestionResponse.objects.filter(user=target_user, question_id__in=question_ids)
         responses_map = {r.question_id: r for r in responses_qs}
+
+        # If responses are missing (e.g. skipped or old submission logic), create empty ones so they can be graded
+        missing = [
+            QuestionResponse(question=q, user=target_user)
+            for q in questions
+            if q.id not in responses_map
+        ]
+        QuestionResponse.objects.bulk_create(missing, ignore_conflicts=True)
+        if missing:
+            responses_qs = QuestionResponse.objects.filter(user=target_user, question_id__in=question_ids)
+            responses_map = {r.question_id: r for r in responses_qs}
         
         questions_data = []
         user_responses_data = []
@@ -295,8 +298,8 @@ class QuizViewSet(viewsets.ModelViewSet):
         for q in questions:
             # Determine type matching QuestionSerializer logic
             q_type = 'open'
-            if hasattr(q, 'multiplechoiceoption'):
-                if q.multiplechoiceoption.is_multiple_choice:
+            if hasattr(q, 'mcq'):
+                if q.mcq.is_multiple_choice:
                     q_type = 'multiple_choice'
                 else:
                     q_type = 'single_choice'
@@ -306,8 +309,8 @@ class QuizViewSet(viewsets.ModelViewSet):
                 'text': q.text,
                 'type': q_type,
             }
-            if hasattr(q, 'multiplechoiceoption'):
-                 mc = q.multiplechoiceoption
+            if hasattr(q, 'mcq'):
+                 mc = q.mcq
                  is_mc = mc.is_multiple_choice
                  def check_correct(idx):
                      if is_mc and mc.correct_options:
@@ -326,10 +329,6 @@ class QuizViewSet(viewsets.ModelViewSet):
             questions_data.append(q_data)
             
             resp = responses_map.get(q.id)
-            
-            # If response is missing (e.g. skipped or old submission logic), create an empty one so it can be graded
-            if not resp:
-                resp = QuestionResponse.objects.create(question=q, user=target_user)
 
             is_correct = False
             points = 0
@@ -340,13 +339,13 @@ class QuizViewSet(viewsets.ModelViewSet):
                 points = resp.points
                 instructor_comment = resp.instructor_comment
                 
-                if hasattr(q, 'multiplechoiceoption'):
-                    if q.multiplechoiceoption.is_multiple_choice:
+                if hasattr(q, 'mcq'):
+                    if q.mcq.is_multiple_choice:
                         user_selected = set(resp.selected_options) if resp.selected_options else set()
-                        correct_selected = set(q.multiplechoiceoption.correct_options) if q.multiplechoiceoption.correct_options else set()
+                        correct_selected = set(q.mcq.correct_options) if q.mcq.correct_options else set()
                         is_correct_calc = (user_selected == correct_selected)
                     else:
-                        is_correct_calc = (resp.selected_option == q.multiplechoiceoption.correct_option)
+                        is_correct_calc = (resp.selected_option == q.mcq.correct_option)
                     # If points are 0 and it's correct, maybe we should auto-calc visual "is_correct" flag?
                     # The teacher can override points.
                     is_correct = is_correct_calc
@@ -1,4 +1,7 @@
 #!/bin/bash
-python manage.py makemigrations
-python manage.py migrate
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# Container entrypoint: migrate once across all tasks, then hand the process
+# over to gunicorn (exec) so it receives ECS's SIGTERM and shuts down
+# gracefully. Settings live in gunicorn.conf.py.
+set -e
+python manage.py migrate_once
+exec gunicorn -c gunicorn.conf.py
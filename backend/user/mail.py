@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+
+def validation_link(user):
+    return f"http://localhost:5173/verify-email?email={user.email}&code={user.validation_code}"
+
+
+def validation_email(user):
+    """
+    Unsaved outbox row carrying the account validation link for `user`.
+    Save it inside the caller's transaction so the mail exists iff the
+    account is committed.
+    """
+    body = f"""Your validation link:
+
+        {validation_link(user)}
+        """
+    return OutgoingEmail(
+        subject="Email Validation",
+        body=body,
+        from_email="from@example.com",
+        recipients=[user.email],
+    )
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        # closing a dropped connection can fail too; it is discarded anyway
+        pass
+
+
+def send_queued_mail(batch_size=100, max_attempts=MAX_ATTEMPTS, connection=None):
+    """
+    Deliver one batch of due outbox rows over a single backend connection.
+
+    Rows are claimed with SKIP LOCKED in a short transaction that counts
+    the attempt and moves them to their retry time, so other senders skip
+    them while they are sent outside it. A failed message keeps that
+    exponential backoff and is given up on after `max_attempts`; after a
+    failure the connection is reopened for the rest of the batch, and if it
+    cannot be opened the rest fails alike. Returns (sent, failed).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                sent_at__isnull=True,
+                attempts__lt=max_attempts,
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + RETRY_BASE_DELAY * 2 ** (email.attempts - 1)
+        OutgoingEmail.objects.bulk_update(batch, ["attempts", "next_attempt_at"])
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    is_open = False
+    for email in batch:
+        if not is_open:
+            try:
+                connection.open()
+            except Exception as e:
+                # no connection for the rest of the batch either
+                for unsent in batch[sent + failed :]:
+                    unsent.last_error = str(e)
+                failed = len(batch) - sent
+                break
+            is_open = True
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email,
+            to=email.recipients,
+            connection=connection,
+        )
+        try:
+            connection.send_messages([message])
+        except Exception as e:
+            email.last_error = str(e)
+            failed += 1
+            # the connection may have died with the message
+            _close(connection)
+            is_open = False
+        else:
+            email.sent_at = timezone.now()
+            email.last_error = ""
+            sent += 1
+    if is_open:
+        _close(connection)
+
+    OutgoingEmail.objects.bulk_update(batch, ["last_error", "sent_at"])
+    return sent, failed
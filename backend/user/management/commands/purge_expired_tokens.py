@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from user.tokens import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding/blacklisted JWTs in small batches. "
+        "Meant to run periodically (cron, scheduled task) next to the app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to limit database load.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(
+            batch_size=options["batch_size"], pause=options["pause"]
+        )
+        self.stdout.write(f"Purged {deleted} expired tokens")
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.mail import MAX_ATTEMPTS, send_queued_mail
+
+
+class Command(BaseCommand):
+    help = "Delivers queued outbox emails in batches over one backend connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep draining the outbox instead of sending one batch.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait when the outbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+            if not options["loop"]:
+                return
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -1,5 +1,11 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+# Users that can be enrolled in courses; mirrored by a partial index below.
+ACTIVE_STUDENT = models.Q(is_active=True, is_staff=False, is_teacher=False)
 
 
 class User(AbstractUser):
@@ -7,3 +13,47 @@ class User(AbstractUser):
     surname = models.CharField(max_length=30, blank=True)
     is_teacher = models.BooleanField(default=False)
     validation_code = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=["surname", "name", "id"],
+                condition=ACTIVE_STUDENT,
+                name="user_active_student_idx",
+            ),
+            # icontains compiles to UPPER(col) LIKE UPPER(%s), so the trigram
+            # index has to be built over the same expressions.
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                OpClass(Upper("surname"), name="gin_trgm_ops"),
+                OpClass(Upper("email"), name="gin_trgm_ops"),
+                condition=ACTIVE_STUDENT,
+                name="user_student_search_trgm_idx",
+            ),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """
+    Outbox row written in the same transaction as the change that triggers
+    the mail; delivered later by `send_queued_mail`.
+    """
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(sent_at__isnull=True),
+                name="outgoingemail_pending_idx",
+            )
+        ]
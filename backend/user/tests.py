@@ -1,3 +1,193 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPException, SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from .mail import send_queued_mail
+from .models import OutgoingEmail, User
+from .tokens import BloomFilter, RevokedTokenCache, purge_expired_tokens
+
+
+class TokenBlacklistTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="student", email="student@test.com", password="studentpass"
+        )
+
+    def obtain_refresh(self):
+        response = self.client.post(
+            "/accounts/token/",
+            {"username": "student", "password": "studentpass"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["refresh"]
+
+    def test_refresh_after_logout_rejected(self):
+        refresh = self.obtain_refresh()
+        response = self.client.post("/accounts/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post("/accounts/logout/", {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post("/accounts/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_picks_up_rows_from_other_workers(self):
+        cache = RevokedTokenCache(refresh_interval=60)
+        token = RefreshToken.for_user(self.user)
+        jti = token["jti"]
+        cache.sync(force=True)
+        with self.assertNumQueries(0):
+            self.assertNotIn(jti, cache)
+
+        token.blacklist()
+        with self.assertNumQueries(0):
+            # still within refresh_interval
+            self.assertNotIn(jti, cache)
+        cache.sync(force=True)
+        with self.assertNumQueries(0):
+            self.assertIn(jti, cache)
+
+    def test_bloom_filter_cache_confirms_hits(self):
+        cache = RevokedTokenCache(bloom_filter=True, bloom_capacity=1000)
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+        cache.sync(force=True)
+        with self.assertNumQueries(1):
+            self.assertIn(token["jti"], cache)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=500, error_rate=0.01)
+        values = [f"jti-{i}" for i in range(500)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"other-{i}" in bloom for i in range(5000))
+        self.assertLess(false_positives, 150)
+
+    def test_purge_expired_tokens_in_batches(self):
+        expired = [RefreshToken.for_user(self.user) for _ in range(5)]
+        fresh = RefreshToken.for_user(self.user)
+        expired[0].blacklist()
+        OutstandingToken.objects.filter(
+            jti__in=[token["jti"] for token in expired]
+        ).update(expires_at=aware_utcnow() - timedelta(minutes=1))
+
+        self.assertEqual(purge_expired_tokens(batch_size=2), 5)
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list("jti", flat=True)),
+            [fresh["jti"]],
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class EmailOutboxTests(APITestCase):
+    def register(self, email):
+        return self.client.post(
+            "/accounts/register/",
+            {
+                "email": email,
+                "password": "secretpass",
+                "name": "Jan",
+                "surname": "Kowalski",
+                "is_teacher": False,
+            },
+        )
+
+    def test_registration_queues_mail_instead_of_sending(self):
+        response = self.register("new@test.com")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual(queued.recipients, ["new@test.com"])
+        self.assertIn(User.objects.get().validation_code, queued.body)
+
+    def test_send_queued_mail_delivers_batch(self):
+        for i in range(3):
+            self.register(f"student{i}@test.com")
+
+        self.assertEqual(send_queued_mail(batch_size=2), (2, 0))
+        self.assertEqual(send_queued_mail(batch_size=2), (1, 0))
+        self.assertEqual(send_queued_mail(batch_size=2), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutgoingEmail.objects.filter(sent_at__isnull=True).exists())
+
+    def test_failed_mail_is_retried_with_backoff(self):
+        self.register("flaky@test.com")
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=SMTPException("relay down"),
+        ):
+            self.assertEqual(send_queued_mail(), (0, 1))
+
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.last_error, "relay down")
+        self.assertGreater(queued.next_attempt_at, queued.created_at)
+        # not due yet
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutgoingEmail.objects.update(next_attempt_at=queued.created_at)
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_unreachable_server_fails_the_batch(self):
+        for i in range(2):
+            self.register(f"student{i}@test.com")
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.open",
+            side_effect=ConnectionRefusedError("connection refused"),
+        ):
+            self.assertEqual(send_queued_mail(), (0, 2))
+        for queued in OutgoingEmail.objects.all():
+            self.assertEqual(queued.attempts, 1)
+            self.assertEqual(queued.last_error, "connection refused")
+            self.assertGreater(queued.next_attempt_at, queued.created_at)
+
+    def test_connection_reopened_after_failure(self):
+        for i in range(3):
+            self.register(f"student{i}@test.com")
+        with (
+            mock.patch(
+                "django.core.mail.backends.locmem.EmailBackend.send_messages",
+                side_effect=[1, SMTPServerDisconnected("dropped"), 1],
+            ),
+            mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as opened,
+        ):
+            self.assertEqual(send_queued_mail(), (2, 1))
+        self.assertEqual(opened.call_count, 2)
+        self.assertEqual(
+            list(
+                OutgoingEmail.objects.order_by("id").values_list(
+                    "last_error", flat=True
+                )
+            ),
+            ["", "dropped", ""],
+        )
+
+    def test_rows_in_flight_are_not_claimed_twice(self):
+        self.register("new@test.com")
+        concurrent = []
+
+        def send_messages(messages):
+            # another sender polling while this one talks to the server
+            concurrent.append(send_queued_mail())
+            return len(messages)
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=send_messages,
+        ):
+            self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(concurrent, [(0, 0)])
@@ -0,0 +1,199 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from common.metrics import record_cache
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Never gives false negatives,
+    false positives happen at roughly `error_rate` once `capacity` is reached.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value)
+        )
+
+
+class RevokedTokenCache:
+    """
+    Process-local copy of the blacklisted JTIs.
+
+    Every `refresh_interval` seconds the cache pulls only the BlacklistedToken
+    rows added since the last sync (by primary key), so each worker converges
+    on the shared blacklist without a query per token check. A full reload
+    every `full_reload_interval` seconds drops JTIs purged from the database.
+    With `bloom_filter` enabled memory stays fixed and only Bloom hits are
+    confirmed against the database.
+    """
+
+    # Sequence values are allocated before commit, so a slow transaction can
+    # land below the high-water mark; re-read a short tail on every sync.
+    SYNC_LOOKBACK = 100
+
+    def __init__(
+        self,
+        refresh_interval=5,
+        full_reload_interval=3600,
+        bloom_filter=False,
+        bloom_capacity=100_000,
+        bloom_error_rate=0.001,
+        clock=time.monotonic,
+    ):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.bloom_filter = bloom_filter
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jtis = self._empty()
+        self._last_id = 0
+        self._loaded_at = None
+        self._synced_at = None
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, "TOKEN_BLACKLIST_CACHE", {})
+        return cls(
+            refresh_interval=config.get("REFRESH_INTERVAL", 5),
+            full_reload_interval=config.get("FULL_RELOAD_INTERVAL", 3600),
+            bloom_filter=config.get("BLOOM_FILTER", False),
+            bloom_capacity=config.get("BLOOM_CAPACITY", 100_000),
+            bloom_error_rate=config.get("BLOOM_ERROR_RATE", 0.001),
+        )
+
+    def _empty(self):
+        if self.bloom_filter:
+            return BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        return set()
+
+    def sync(self, force=False):
+        now = self._clock()
+        if (
+            not force
+            and self._synced_at is not None
+            and now - self._synced_at < self.refresh_interval
+        ):
+            return
+        with self._lock:
+            if (
+                self._loaded_at is None
+                or now - self._loaded_at >= self.full_reload_interval
+            ):
+                jtis, last_id = self._empty(), 0
+                self._loaded_at = now
+            else:
+                jtis, last_id = self._jtis, self._last_id
+            rows = (
+                BlacklistedToken.objects.filter(
+                    id__gt=max(0, last_id - self.SYNC_LOOKBACK)
+                )
+                .order_by("id")
+                .values_list("id", "token__jti")
+            )
+            for row_id, jti in rows.iterator():
+                jtis.add(jti)
+                last_id = max(last_id, row_id)
+            self._jtis, self._last_id = jtis, last_id
+            self._synced_at = now
+
+    def add(self, jti):
+        with self._lock:
+            self._jtis.add(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        # A hit is a check answered without a database round trip.
+        if jti not in self._jtis:
+            record_cache("revoked_tokens", hit=True)
+            return False
+        if not self.bloom_filter:
+            record_cache("revoked_tokens", hit=True)
+            return True
+        record_cache("revoked_tokens", hit=False)
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+revoked_tokens = RevokedTokenCache.from_settings()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check is answered by `revoked_tokens`
+    instead of a BlacklistedToken lookup per request.
+    """
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revoked_tokens:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        revoked_tokens.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+
+class CachedTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+
+def purge_expired_tokens(batch_size=1000, pause=0.0, now=None):
+    """
+    Delete expired outstanding tokens (and their blacklist entries) in
+    primary-key ordered batches, so no single statement holds locks on the
+    whole table. Returns the number of outstanding tokens removed.
+    """
+    now = now or aware_utcnow()
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
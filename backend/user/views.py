@@ -1,7 +1,7 @@
 import secrets
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -13,6 +13,7 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from .mail import validation_email, validation_link
 from .models import User
 
 
@@ -45,6 +46,7 @@ class RegisterSerializer(ModelSerializer):
         fields = ("email", "password", "name", "surname", "is_teacher")
         extra_kwargs = {"password": {"write_only": True}}
 
+    @transaction.atomic
     def create(self, validated_data):
         user = User.objects.create_user(
             username=validated_data["email"],
@@ -56,23 +58,12 @@ class RegisterSerializer(ModelSerializer):
             is_active=False,
             validation_code=secrets.token_hex(32),
         )
-        link = f"http://localhost:5173/verify-email?email={user.email}&code={user.validation_code}"
-        body = f"""Your validation link:
-
-        {link}
-        """
-
-        send_mail(
-            subject="Email Validation",
-            message=body,
-            from_email="from@example.com",
-            recipient_list=[user.email],
-        )
+        validation_email(user).save()
         if not settings.PRODUCTION:
             print(
                 "Copy link from here cause of some stuff how console email backend prints emails"
             )
-            print(link)
+            print(validation_link(user))
         return user
 
 
@@ -9,7 +9,8 @@ import { useAuth } from '../../contexts/AuthContext';
 interface Module {
     id: number;
     name: string;
-    content: string;
+    excerpt: string;
+    revision: number;
     photo_url?: string;
     completed: boolean;
 }
@@ -39,6 +40,9 @@ export const CourseDetailsPage = () => {
     const [quizzes, setQuizzes] = useState<Quiz[]>([]);
     const [course, setCourse] = useState<Course | null>(null);
     const [loading, setLoading] = useState(true);
+    // full module content, fetched when a module is first expanded
+    const [contents, setContents] = useState<Record<number, string>>({});
+    const [expanded, setExpanded] = useState<number | null>(null);
 
     useEffect(() => {
         const fetchData = async () => {
@@ -64,6 +68,23 @@ export const CourseDetailsPage = () => {
 
     const isStudent = user?.role === 'student';
 
+    const toggleContent = async (moduleId: number) => {
+        if (expanded === moduleId) {
+            setExpanded(null);
+            return;
+        }
+        if (contents[moduleId] === undefined) {
+            try {
+                const res = await api.get(`/api/courses/${id}/modules/${moduleId}/content/`, { responseType: 'text' });
+                setContents(prev => ({ ...prev, [moduleId]: res.data }));
+            } catch (error) {
+                console.error("Failed to load module content", error);
+                return;
+            }
+        }
+        setExpanded(moduleId);
+    };
+
     return (
         <div className="space-y-6 animate-fade-in max-w-4xl mx-auto pb-10">
             <Button
@@ -123,9 +144,14 @@ export const CourseDetailsPage = () => {
                                                 <p className="text-sm text-slate-500">Moduł</p>
                                             </div>
                                         </div>
-                                        <div className="text-slate-600 prose prose-sm max-w-none">
-                                            {module.content}
+                                        <div className="text-slate-600 prose prose-sm max-w-none whitespace-pre-line">
+                                            {expanded === module.id ? contents[module.id] : module.excerpt}
                                         </div>
+                                        {module.revision > 0 && (
+                                            <Button variant="ghost" size="sm" className="mt-2" onClick={() => toggleContent(module.id)}>
+                                                {expanded === module.id ? 'Zwiń treść' : 'Pokaż całą treść'}
+                                            </Button>
+                                        )}
                                         {isStudent && (
                                             <div className="mt-4 flex justify-end">
                                                 <Button
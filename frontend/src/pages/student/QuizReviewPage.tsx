@@ -3,7 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { Card } from '../../components/Card';
 import { Button } from '../../components/Button';
 import { CheckCircle, XCircle, ArrowLeft } from 'lucide-react';
-import api from '../../services/api';
+import api, { quizTakingUrl } from '../../services/api';
 
 interface QuestionOption {
     id: number;
@@ -44,7 +44,7 @@ export const QuizReviewPage = () => {
     useEffect(() => {
         const fetchReview = async () => {
             try {
-                const response = await api.get(`/api/quizzes/${id}/review/`);
+                const response = await api.get(quizTakingUrl(id!, 'review'));
                 setResult(response.data);
             } catch (error: any) {
                 console.error("Failed to load quiz review", error);
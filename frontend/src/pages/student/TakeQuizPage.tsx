@@ -1,15 +1,21 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { Card } from '../../components/Card';
 import { Button } from '../../components/Button';
 import { Clock, CheckCircle } from 'lucide-react';
-import api from '../../services/api';
+import { isAxiosError } from 'axios';
+import api, { quizTakingUrl } from '../../services/api';
 
 interface QuestionOption {
     id: number;
     text: string;
 }
 
+type Answer = string | number | number[];
+
+// Answers are autosaved once the student pauses for this long.
+const AUTOSAVE_DELAY_MS = 1000;
+
 interface Question {
     id: number;
     text: string;
@@ -23,7 +29,9 @@ export const TakeQuizPage = () => {
     const navigate = useNavigate();
     const [questions, setQuestions] = useState<Question[]>([]);
     // Update answers state to allow storing arrays for multiple choice
-    const [answers, setAnswers] = useState<Record<number, string | number | number[]>>({});
+    const [answers, setAnswers] = useState<Record<number, Answer>>({});
+    // What the server already has, so autosave only sends the changes
+    const savedAnswers = useRef<Record<number, Answer>>({});
     const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
     const [loading, setLoading] = useState(true);
     const [submitting, setSubmitting] = useState(false);
@@ -42,16 +50,18 @@ export const TakeQuizPage = () => {
     useEffect(() => {
         const fetchQuiz = async () => {
             try {
+                // Starting first: the server's clock runs from here
+                const startRes = await api.post(`/api/quizzes/${id}/start/`);
                 const [questionsRes, quizRes] = await Promise.all([
-                    api.get(`/api/quizzes/${id}/questions/`),
+                    api.get(quizTakingUrl(id!, 'questions')),
                     api.get(`/api/quizzes/${id}/`)
                 ]);
                 setQuestions(questionsRes.data);
                 setQuizDetails(quizRes.data);
 
-                // Initialize timer
-                if (quizRes.data.time_limit_in_minutes) {
-                    setTimeLeft(quizRes.data.time_limit_in_minutes * 60);
+                // Initialize timer from the server, so reloading the page does not reset it
+                if (startRes.data.seconds_left !== null) {
+                    setTimeLeft(Math.floor(startRes.data.seconds_left));
                 }
             } catch (error) {
                 console.error("Failed to load quiz", error);
@@ -78,6 +88,27 @@ export const TakeQuizPage = () => {
         return () => clearInterval(timerId);
     }, [timeLeft, submitted]);
 
+    useEffect(() => {
+        if (submitting || submitted) return;
+
+        const timerId = setTimeout(() => {
+            const changed = Object.entries(answers).filter(
+                ([qId, val]) => savedAnswers.current[parseInt(qId)] !== val
+            );
+            if (changed.length === 0) return;
+
+            api.post(quizTakingUrl(id!, 'autosave'), {
+                responses: changed.map(([qId, val]) => ({ question_id: parseInt(qId), answer: val }))
+            })
+                .then(() => {
+                    savedAnswers.current = { ...savedAnswers.current, ...Object.fromEntries(changed) };
+                })
+                .catch(error => console.error("Autosave failed", error));
+        }, AUTOSAVE_DELAY_MS);
+
+        return () => clearTimeout(timerId);
+    }, [answers, submitting, submitted]);
+
     const formatTime = (seconds: number) => {
         const m = Math.floor(seconds / 60);
         const s = seconds % 60;
@@ -129,11 +160,17 @@ export const TakeQuizPage = () => {
                 answer: val
             }));
 
-            await api.post(`/api/quizzes/${id}/submit/`, {
+            await api.post(quizTakingUrl(id!, 'submit'), {
                 responses: formattedResponses
             });
             setSubmitted(true);
         } catch (error) {
+            if (isAxiosError(error) && error.response?.status === 403) {
+                // Too late: the server submitted what was autosaved in time
+                setTimeExpired(true);
+                setSubmitted(true);
+                return;
+            }
             console.error("Failed to submit quiz", error);
             if (!auto) alert("Failed to submit quiz. Please try again.");
         } finally {
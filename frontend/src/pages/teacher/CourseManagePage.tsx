@@ -16,7 +16,7 @@ interface Course {
 interface Module {
     id: number;
     name: string;
-    content: string;
+    excerpt: string;
     photo_url?: string;
 }
 
@@ -56,6 +56,7 @@ export const CourseManagePage = () => {
 
     // Students State
     const [enrolledStudents, setEnrolledStudents] = useState<CourseProgress[]>([]);
+    const [enrolledNext, setEnrolledNext] = useState<string | null>(null);
     const [eligibleStudents, setEligibleStudents] = useState<Student[]>([]);
     const [studentSearch, setStudentSearch] = useState('');
 
@@ -82,21 +83,20 @@ export const CourseManagePage = () => {
         const fetchData = async () => {
             if (!id) return;
             try {
-                const [courseRes, modulesRes, quizzesRes, banksRes, enrolledRes, eligibleRes] = await Promise.all([
+                const [courseRes, modulesRes, quizzesRes, banksRes, enrolledRes] = await Promise.all([
                     api.get(`/api/courses/${id}`),
                     api.get(`/api/courses/${id}/modules/`),
                     api.get(`/api/quizzes/?course_id=${id}`),
                     api.get('/api/question_banks/'),
-                    api.get(`/api/courses/${id}/enrolled-students/`),
-                    api.get(`/api/courses/${id}/eligible-students/`)
+                    api.get(`/api/courses/${id}/enrolled-students/`)
                 ]);
 
                 setCourse(courseRes.data);
                 setModules(modulesRes.data);
                 setQuizzes(quizzesRes.data);
                 setQuestionBanks(banksRes.data);
-                setEnrolledStudents(enrolledRes.data);
-                setEligibleStudents(eligibleRes.data);
+                setEnrolledStudents(enrolledRes.data.results);
+                setEnrolledNext(enrolledRes.data.next);
             } catch (error) {
                 console.error("Failed to fetch course data", error);
             } finally {
@@ -106,6 +106,33 @@ export const CourseManagePage = () => {
         fetchData();
     }, [id]);
 
+    // Eligible students are searched and paginated server-side
+    useEffect(() => {
+        if (!id || !isStudentModalOpen) return;
+        const timeout = setTimeout(async () => {
+            try {
+                const response = await api.get(`/api/courses/${id}/eligible-students/`, {
+                    params: { search: studentSearch }
+                });
+                setEligibleStudents(response.data.results);
+            } catch (error) {
+                console.error("Failed to fetch eligible students", error);
+            }
+        }, 300);
+        return () => clearTimeout(timeout);
+    }, [id, isStudentModalOpen, studentSearch]);
+
+    const handleLoadMoreEnrolled = async () => {
+        if (!enrolledNext) return;
+        try {
+            const response = await api.get(enrolledNext);
+            setEnrolledStudents([...enrolledStudents, ...response.data.results]);
+            setEnrolledNext(response.data.next);
+        } catch (error) {
+            console.error("Failed to fetch enrolled students", error);
+        }
+    };
+
     const handleCreateModule = async () => {
         if (!id) return;
         try {
@@ -450,7 +477,7 @@ export const CourseManagePage = () => {
                                                 )}
                                                 <div>
                                                     <h3 className="text-lg font-semibold text-slate-900 group-hover:text-indigo-600 transition-colors">{module.name}</h3>
-                                                    <p className="text-slate-500 mt-1 line-clamp-2">{module.content}</p>
+                                                    <p className="text-slate-500 mt-1 line-clamp-2">{module.excerpt}</p>
                                                 </div>
                                             </div>
                                             <Button
@@ -580,6 +607,13 @@ export const CourseManagePage = () => {
                                 </Card>
                             ))
                         )}
+                        {enrolledNext && (
+                            <div className="col-span-full flex justify-center">
+                                <Button variant="ghost" size="sm" onClick={handleLoadMoreEnrolled}>
+                                    Pokaż więcej
+                                </Button>
+                            </div>
+                        )}
                     </div>
                 </div>
 
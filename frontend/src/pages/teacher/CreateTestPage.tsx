@@ -28,6 +28,8 @@ export const CreateTestPage = () => {
         description: '',
         time_limit_in_minutes: 60,
         randomize_question_order: false,
+        questions_per_bank: '',
+        shuffle_options: false,
         show_correct_answers_on_completion: false,
         course: '',
         question_banks: [] as string[] // Selected IDs
@@ -56,6 +58,7 @@ export const CreateTestPage = () => {
             await api.post('/api/quizzes/', {
                 ...formData,
                 course: parseInt(formData.course),
+                questions_per_bank: formData.questions_per_bank ? parseInt(formData.questions_per_bank) : null,
                 question_banks: formData.question_banks.map(id => parseInt(id))
             });
             navigate('/dashboard');
@@ -147,6 +150,22 @@ export const CreateTestPage = () => {
                                         />
                                         Losuj kolejność pytań
                                     </label>
+                                    <label className="flex items-center text-slate-700 cursor-pointer select-none">
+                                        <input
+                                            type="checkbox"
+                                            className="mr-2 rounded border-slate-300 text-indigo-600 focus:ring-indigo-600"
+                                            checked={formData.shuffle_options}
+                                            onChange={e => setFormData({ ...formData, shuffle_options: e.target.checked })}
+                                        />
+                                        Losuj kolejność odpowiedzi
+                                    </label>
+                                    <Input
+                                        label="Pytań losowanych z każdej bazy (puste = wszystkie)"
+                                        type="number"
+                                        min={1}
+                                        value={formData.questions_per_bank}
+                                        onChange={e => setFormData({ ...formData, questions_per_bank: e.target.value })}
+                                    />
                                     <label className="flex items-center text-slate-700 cursor-pointer select-none">
                                         <input
                                             type="checkbox"
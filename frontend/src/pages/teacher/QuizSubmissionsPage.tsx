@@ -9,6 +9,9 @@ interface Submission {
     user_id: number;
     name: string;
     email: string;
+    answered: number;
+    score: number;
+    last_activity: string | null;
 }
 
 export const QuizSubmissionsPage = () => {
@@ -17,25 +20,36 @@ export const QuizSubmissionsPage = () => {
     const [submissions, setSubmissions] = useState<Submission[]>([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState("");
+    const [nextPage, setNextPage] = useState<string | null>(null);
 
+    // Search, scoring and pagination happen server-side
     useEffect(() => {
-        const fetchSubmissions = async () => {
+        const timeout = setTimeout(async () => {
             try {
-                const response = await api.get(`/api/quizzes/${id}/submissions/`);
-                setSubmissions(response.data);
+                const response = await api.get(`/api/quizzes/${id}/submissions/`, {
+                    params: { search: searchTerm }
+                });
+                setSubmissions(response.data.results);
+                setNextPage(response.data.next);
             } catch (error) {
                 console.error("Failed to fetch submissions", error);
             } finally {
                 setLoading(false);
             }
-        };
-        fetchSubmissions();
-    }, [id]);
+        }, 300);
+        return () => clearTimeout(timeout);
+    }, [id, searchTerm]);
 
-    const filteredSubmissions = submissions.filter(sub =>
-        sub.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        sub.email.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    const handleLoadMore = async () => {
+        if (!nextPage) return;
+        try {
+            const response = await api.get(nextPage);
+            setSubmissions([...submissions, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (error) {
+            console.error("Failed to fetch submissions", error);
+        }
+    };
 
     if (loading) return <div className="text-center mt-10 text-slate-500">Wczytywanie przesłanych prac...</div>;
 
@@ -68,7 +82,7 @@ export const QuizSubmissionsPage = () => {
                 </div>
             </div>
 
-            {submissions.length === 0 ? (
+            {submissions.length === 0 && !searchTerm ? (
                 <Card className="text-center py-12">
                     <FileSignature className="w-12 h-12 text-slate-300 mx-auto mb-4" />
                     <h3 className="text-lg font-medium text-slate-900 mb-2">Brak przesłanych prac</h3>
@@ -76,7 +90,7 @@ export const QuizSubmissionsPage = () => {
                 </Card>
             ) : (
                 <div className="grid grid-cols-1 gap-4">
-                    {filteredSubmissions.map((sub) => (
+                    {submissions.map((sub) => (
                         <Card
                             key={sub.user_id}
                             className="flex items-center justify-between hover:border-indigo-300 transition-colors cursor-pointer group"
@@ -92,6 +106,8 @@ export const QuizSubmissionsPage = () => {
                                         <span className="flex items-center gap-1">
                                             <Mail className="w-3 h-3" /> {sub.email}
                                         </span>
+                                        <span>Odpowiedzi: {sub.answered}</span>
+                                        <span>Wynik wstępny: {sub.score}</span>
                                         {/* <span className="flex items-center gap-1">
                                             <Hash className="w-3 h-3" /> ID: {sub.user_id}
                                         </span> */}
@@ -103,6 +119,13 @@ export const QuizSubmissionsPage = () => {
                             </Button>
                         </Card>
                     ))}
+                    {nextPage && (
+                        <div className="flex justify-center">
+                            <Button variant="ghost" size="sm" onClick={handleLoadMore}>
+                                Pokaż więcej
+                            </Button>
+                        </div>
+                    )}
                 </div>
             )}
         </div>
@@ -8,6 +8,43 @@ export const API_URL =
   'http://localhost:8000';   // ← dev safety net
 
 
+// Share of requests the backend should trace (W3C traceparent "sampled" flag).
+const TRACE_SAMPLE_RATE = Number(
+    (window as any)?.RUNTIME_CONFIG?.TRACE_SAMPLE_RATE ??
+        import.meta.env.VITE_TRACE_SAMPLE_RATE ??
+        0
+);
+
+// Quiz-taking endpoints (questions, submit, review) served by the async views,
+// for backends running under an ASGI server.
+const ASYNC_QUIZ_API = String(
+    (window as any)?.RUNTIME_CONFIG?.ASYNC_QUIZ_API ??
+        import.meta.env.VITE_ASYNC_QUIZ_API ??
+        false
+) === 'true';
+
+export const quizTakingUrl = (id: string | number, action: 'questions' | 'autosave' | 'submit' | 'review') =>
+    `${ASYNC_QUIZ_API ? '/api/async/quizzes' : '/api/quizzes'}/${id}/${action}/`;
+
+const randomHex = (bytes: number) =>
+    Array.from(crypto.getRandomValues(new Uint8Array(bytes)), (b) =>
+        b.toString(16).padStart(2, '0')
+    ).join('');
+
+export const traceparent = () =>
+    `00-${randomHex(16)}-${randomHex(8)}-${Math.random() < TRACE_SAMPLE_RATE ? '01' : '00'}`;
+
+// After a write the backend answers with X-Primary-Until; sending it back
+// keeps our reads on the primary database until the replica has caught up.
+const PRIMARY_UNTIL = 'primaryUntil';
+
+const rememberPrimaryUntil = (headers: any) => {
+    const until = headers?.['x-primary-until'];
+    if (until) {
+        sessionStorage.setItem(PRIMARY_UNTIL, until);
+    }
+};
+
 const api = axios.create({
     baseURL: API_URL,
     headers: {
@@ -21,14 +58,23 @@ api.interceptors.request.use(
         if (token) {
             config.headers.Authorization = `Bearer ${token}`;
         }
+        config.headers.traceparent = traceparent();
+        const primaryUntil = sessionStorage.getItem(PRIMARY_UNTIL);
+        if (primaryUntil && Number(primaryUntil) * 1000 > Date.now()) {
+            config.headers['X-Primary-Until'] = primaryUntil;
+        }
         return config;
     },
     (error) => Promise.reject(error)
 );
 
 api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+        rememberPrimaryUntil(response.headers);
+        return response;
+    },
     async (error) => {
+        rememberPrimaryUntil(error.response?.headers);
         const originalRequest = error.config;
         if (error.response?.status === 401 && !originalRequest._retry) {
             originalRequest._retry = true;
@@ -224,6 +224,18 @@ resource "aws_lb_listener" "frontend" {
 ############################
 # TASK DEFINITIONS
 ############################
+# Shared by every task running the backend image.
+locals {
+  backend_environment = [
+    { name = "DB_HOST", value = aws_db_instance.postgres.address },
+    { name = "DB_NAME", value = "postgres" },
+    { name = "DB_USER", value = "postgres" },
+    { name = "DB_PASSWORD", value = "postgres123" },
+    { name = "AWS_STORAGE_BUCKET_NAME", value = aws_s3_bucket.files.bucket },
+    { name = "AWS_REGION", value = "eu-central-1" }
+  ]
+}
+
 resource "aws_ecs_task_definition" "backend" {
   family                   = "studia-backend"
   requires_compatibilities = ["FARGATE"]
@@ -238,15 +250,10 @@ resource "aws_ecs_task_definition" "backend" {
     name  = "backend"
     image = aws_ecr_repository.backend.repository_url
     portMappings = [{ containerPort = 8000 }]
+    # gunicorn's graceful_timeout (25 s) fits inside it
+    stopTimeout  = 30
 
-    environment = [
-      { name = "DB_HOST", value = aws_db_instance.postgres.address },
-      { name = "DB_NAME", value = "postgres" },
-      { name = "DB_USER", value = "postgres" },
-      { name = "DB_PASSWORD", value = "postgres123" },
-      { name = "AWS_STORAGE_BUCKET_NAME", value = aws_s3_bucket.files.bucket },
-      { name = "AWS_REGION", value = "eu-central-1" }
-    ]
+    environment = local.backend_environment
 
     logConfiguration = {
       logDriver = "awslogs"
@@ -259,6 +266,64 @@ resource "aws_ecs_task_definition" "backend" {
   }])
 }
 
+# Delivers the outbox (user/mail.py); SKIP LOCKED lets several run at once.
+resource "aws_ecs_task_definition" "mailer" {
+  family                   = "studia-mailer"
+  requires_compatibilities = ["FARGATE"]
+  network_mode             = "awsvpc"
+  cpu    = 256
+  memory = 512
+
+  execution_role_arn = aws_iam_role.ecs.arn
+  task_role_arn      = aws_iam_role.ecs.arn
+
+  container_definitions = jsonencode([{
+    name    = "mailer"
+    image   = aws_ecr_repository.backend.repository_url
+    command = ["python", "manage.py", "send_queued_mail", "--loop"]
+
+    environment = local.backend_environment
+
+    logConfiguration = {
+      logDriver = "awslogs"
+      options = {
+        awslogs-group         = aws_cloudwatch_log_group.ecs.name
+        awslogs-region        = "eu-central-1"
+        awslogs-stream-prefix = "mailer"
+      }
+    }
+  }])
+}
+
+# Seals the quiz attempts nobody submitted before their deadline (quiz/attempts.py).
+resource "aws_ecs_task_definition" "attempt_sweeper" {
+  family                   = "studia-attempt-sweeper"
+  requires_compatibilities = ["FARGATE"]
+  network_mode             = "awsvpc"
+  cpu    = 256
+  memory = 512
+
+  execution_role_arn = aws_iam_role.ecs.arn
+  task_role_arn      = aws_iam_role.ecs.arn
+
+  container_definitions = jsonencode([{
+    name    = "attempt-sweeper"
+    image   = aws_ecr_repository.backend.repository_url
+    command = ["python", "manage.py", "close_expired_attempts", "--loop"]
+
+    environment = local.backend_environment
+
+    logConfiguration = {
+      logDriver = "awslogs"
+      options = {
+        awslogs-group         = aws_cloudwatch_log_group.ecs.name
+        awslogs-region        = "eu-central-1"
+        awslogs-stream-prefix = "attempt-sweeper"
+      }
+    }
+  }])
+}
+
 resource "aws_ecs_task_definition" "frontend" {
   family                   = "studia-frontend"
   requires_compatibilities = ["FARGATE"]
@@ -311,6 +376,34 @@ resource "aws_ecs_service" "backend" {
   }
 }
 
+resource "aws_ecs_service" "mailer" {
+  name            = "mailer"
+  cluster         = aws_ecs_cluster.this.id
+  task_definition = aws_ecs_task_definition.mailer.arn
+  desired_count   = 1
+  launch_type     = "FARGATE"
+
+  network_configuration {
+    subnets         = data.aws_subnets.default.ids
+    security_groups = [aws_security_group.ecs.id]
+    assign_public_ip = true
+  }
+}
+
+resource "aws_ecs_service" "attempt_sweeper" {
+  name            = "attempt-sweeper"
+  cluster         = aws_ecs_cluster.this.id
+  task_definition = aws_ecs_task_definition.attempt_sweeper.arn
+  desired_count   = 1
+  launch_type     = "FARGATE"
+
+  network_configuration {
+    subnets         = data.aws_subnets.default.ids
+    security_groups = [aws_security_group.ecs.id]
+    assign_public_ip = true
+  }
+}
+
 resource "aws_ecs_service" "frontend" {
   name            = "frontend"
   cluster         = aws_ecs_cluster.this.id